@@ -47,6 +47,10 @@ class DirectoryPickerApp:
         tk.Button(frame, text="Browse...", command=self.browse_diff) \
             .grid(row=2, column=2, padx=(8, 0), pady=(8, 0))
 
+        self.incremental_var = tk.BooleanVar(value=bool(getattr(Config, "incremental_assessment", False)))
+        tk.Checkbutton(frame, text="Incremental", variable=self.incremental_var) \
+            .grid(row=2, column=3, padx=(10, 0), sticky="w", pady=(8, 0))
+
         # --- Row 3: Project Name ---
         tk.Label(frame, text="Project Name:").grid(row=3, column=0, sticky="w", padx=(0, 8), pady=(10, 0))
 
@@ -148,6 +152,7 @@ class DirectoryPickerApp:
 
         # Set overwrite flags
         Config.overwrite_dest = bool(self.overwrite_dest_var.get())
+        Config.incremental_assessment = bool(diff_file) and bool(self.incremental_var.get())
 
         self.root.quit()
         self.root.destroy()
@@ -169,3 +174,4 @@ if __name__ == "__main__":
     print("Config.PROJECT_NAME      =", getattr(Config, "source_project_name", ""))
     print("Config.ASSESSMENT_NAME   =", getattr(Config, "assessment_name", ""))
     print("Config.OVERWRITE_DEST    =", getattr(Config, "overwrite_dest", None))
+    print("Config.INCREMENTAL       =", getattr(Config, "incremental_assessment", None))
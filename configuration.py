@@ -1,4 +1,4 @@
-from property_reader import load_properties
+from property_reader import load_properties, get_int, get_bool
 from root import get_project_root
 import utils
 from pathlib import Path
@@ -28,22 +28,76 @@ class Configuration:
     dest_dir_is_network = props["DEST_DIR_IS_NETWORK"]
     source_project_dir = utils.get_source_project_dir(source_dir, source_project_name, source_dir_is_network)
     dest_assessment_dir = utils.get_dest_assessment_dir(dest_dir, assessment_name, dest_dir_is_network)
+    # Fuzzy search worker processes (1 = in-process, 0 = one per CPU)
+    fuzzy_search_workers = get_int(props, "FUZZY_SEARCH_WORKERS", 0)
+    # Reader normalization worker processes (1 = in the reader threads, 0 = one per CPU)
+    reader_normalize_workers = get_int(props, "READER_NORMALIZE_WORKERS", 0)
+    # Archive extraction worker threads (0 = based on CPU count)
+    extraction_workers = get_int(props, "EXTRACTION_WORKERS", 0)
+    # Treat docker-save/OCI image tars as images: apply layers and whiteouts, keep the final filesystem
+    image_layer_aware = get_bool(props, "IMAGE_LAYER_AWARE", False)
+    # With IMAGE_LAYER_AWARE, also extract every layer as is next to the final filesystem
+    image_layer_view = get_bool(props, "IMAGE_LAYER_VIEW", False)
+    # Journal finished archives next to the assessment so an interrupted extraction resumes where it stopped
+    resumable_extraction = get_bool(props, "RESUMABLE_EXTRACTION", True)
+    # Store each unique extracted file once under DEST_DIR/.content_store and hardlink it into the assessment
+    content_addressed_extraction = get_bool(props, "CONTENT_ADDRESSED_EXTRACTION", False)
+    # Read archives in place instead of extracting them to DEST_DIR
+    scan_archives_in_place = get_bool(props, "SCAN_ARCHIVES_IN_PLACE", False)
+    # Nested archives up to this size are read into memory when scanning in place
+    archive_memory_limit_mb = get_int(props, "ARCHIVE_MEMORY_LIMIT_MB", 64)
+    # Reuse search results of file contents analyzed in earlier runs
+    use_analysis_cache = get_bool(props, "USE_ANALYSIS_CACHE", True)
+    # Analyze each file end to end instead of stage by stage over the whole assessment
+    streaming_pipeline = get_bool(props, "STREAMING_PIPELINE", False)
+    # Streaming pipeline worker processes (1 = in-process, 0 = one per CPU)
+    streaming_pipeline_workers = get_int(props, "STREAMING_PIPELINE_WORKERS", 0)
+    # Locate each chosen fuzzy license match in the original file (byte span and lines) and store that with it
+    offset_maps = get_bool(props, "OFFSET_MAPS", True)
+    # Sniff file types: read binaries as their printable strings only
+    binary_file_triage = get_bool(props, "BINARY_FILE_TRIAGE", True)
+    # Shortest printable run kept from a binary file
+    binary_strings_min_length = get_int(props, "BINARY_STRINGS_MIN_LENGTH", 6)
+    # With BINARY_FILE_TRIAGE, don't read images and fonts at all
+    skip_no_license_file_types = get_bool(props, "SKIP_NO_LICENSE_FILE_TYPES", True)
+    # Fuzzy search only a head and tail window of files with these extensions (LICENSE/COPYING/NOTICE-like names always in full)
+    fuzzy_header_window = get_bool(props, "FUZZY_HEADER_WINDOW", False)
+    # Tokens searched at the start and at the end of a windowed file
+    fuzzy_header_window_head_tokens = get_int(props, "FUZZY_HEADER_WINDOW_HEAD_TOKENS", 2000)
+    fuzzy_header_window_tail_tokens = get_int(props, "FUZZY_HEADER_WINDOW_TAIL_TOKENS", 300)
+    # Extensions of windowed files
+    fuzzy_header_window_extensions = frozenset(
+        part.strip().lower() for part in props.get("FUZZY_HEADER_WINDOW_EXTENSIONS", "").split(",") if part.strip()
+    )
+    # Read the licenses of SPDX-License-Identifier tags straight from the file bytes (match strength SPDX-TAG)
+    spdx_tag_scan = get_bool(props, "SPDX_TAG_SCAN", True)
+    # Skip the fuzzy header search for files with an SPDX-License-Identifier tag
+    spdx_tag_skips_fuzzy = get_bool(props, "SPDX_TAG_SKIPS_FUZZY", False)
 
     # Global instance of file data manager
     file_data_manager = None
     # Global instance of loaded file data manager
     loaded_file_data_manager = None
+    # File data grouped by file hash, first entry of each group is analyzed
+    file_data_groups = None
     # Indexed assessment file content
     file_indexes = None
     # Indexed license content
     license_indexes = None
     # Indexed license header content
     license_header_indexes = None
+    # Inverted anchor index over all license headers
+    license_header_postings = None
+    # License corpus checksum and analysis engine version of this run's search results
+    license_corpus_checksum = None
+    analysis_engine_version = None
     # Total assessment file count
     assessment_file_count = 0
     # Total released file count
     released_file_count = 0
     # File data for diff compare
     diff_file_data = None
+    # Only analyze files that are new or changed since diff_file_data, carry the rest forward
+    incremental_assessment = False
     # Flag to overwrite dest directory if it already exists
     overwrite_dest = False
\ No newline at end of file
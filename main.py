@@ -6,10 +6,11 @@ from models.FileData import FileDataManager
 from loggers.main_logger import main_logger as logger
 from search import fuzzy_license_search
 from optimized import keyword_search_optimized, full_license_search_optimized, file_hash_assessor_optimized, \
-    file_content_indexer_optimized, assessment_reader_optimized
+    file_content_indexer_optimized, assessment_reader_optimized, license_corpus_cache, analysis_result_cache, \
+    streaming_pipeline, archive_reader_optimized, spdx_tag_scanner
 from timer import Timer
 from tools import file_content_indexer, fuzzy_matches_evaluator, assessment_data_generator, file_content_cleaner_and_normalizer, \
-    assessment_extractor, assessment_compare
+    assessment_extractor, assessment_compare, file_hash_deduplicator, extraction_manifest
 from pathlib import Path
 
 p = Path(__file__).resolve()
@@ -22,19 +23,77 @@ Config.file_data_manager = FileDataManager()
 # Global instance of loaded file data manager
 Config.loaded_file_data_manager = FileDataManager()
 
+def write_assessment_outputs() -> None:
+    # GENERATE CSV OF ASSESSMENT DATA
+    print("Begin csv gen")
+    csv_gen_timer = Timer()
+    csv_gen_timer.start("starting csv gen timer")
+    assessment_data_generator.write_license_data_to_csv("".join([Config.assessment_name, "_data", ".csv"]))
+    csv_gen_timer.stop("stopping csv gen timer")
+    print(logger.info(csv_gen_timer.elapsed("Elapsed time for csv gen: ")))
+
+    # SAVE FILE DATA TO JSON
+    print("Begin save file data to json")
+    file_data_to_json_timer = Timer()
+    file_data_to_json_timer.start("starting file data to json timer")
+    Config.file_data_manager.save_to_json()
+    file_data_to_json_timer.stop("stopping file data to json timer")
+    print(logger.info(file_data_to_json_timer.elapsed("Elapsed time for file data to json: ")))
+
+
+def run_streaming_pipeline() -> None:
+    # LOAD THE PRECOMPILED LICENSE CORPUS ONCE, WORKERS LOAD IT FROM THE CACHE
+    license_corpus_timer = Timer()
+    license_corpus_timer.start("starting license corpus timer")
+    license_corpus = license_corpus_cache.load_or_build_license_corpus()
+    Config.license_corpus_checksum = license_corpus.checksum
+    Config.analysis_engine_version = analysis_result_cache.get_engine_version()
+    license_corpus_timer.stop("stopping license corpus timer")
+    print(logger.info(license_corpus_timer.elapsed("Elapsed time for license corpus: ")))
+
+    # READ, INDEX AND SEARCH EACH FILE END TO END, KEEPING ONLY ITS RESULTS
+    print("Begin streaming pipeline")
+    streaming_pipeline_timer = Timer()
+    streaming_pipeline_timer.start("starting streaming pipeline timer")
+    analysis_cache = None
+    if Config.use_analysis_cache:
+        analysis_cache = analysis_result_cache.AnalysisResultCache(license_corpus.checksum)
+    streaming_pipeline.run_streaming_assessment(Config.dest_assessment_dir, license_corpus, analysis_cache=analysis_cache)
+    if analysis_cache is not None:
+        analysis_cache.close()
+    streaming_pipeline_timer.stop("stopping streaming pipeline timer")
+    print(logger.info(streaming_pipeline_timer.elapsed("Elapsed time for streaming pipeline: ")))
+
+    write_assessment_outputs()
+
+
 def main(assessment_created=False) -> None:
 
-    if not Config.dest_assessment_dir.exists() or Config.overwrite_dest:
+    if Config.streaming_pipeline:
+        # Fail before extracting anything if other options need the stage by stage run
+        streaming_pipeline.check_streaming_options()
+
+    # Archives scanned in place are never extracted. An existing destination is
+    # only reused if its extraction finished; an interrupted one resumes
+    if not Config.scan_archives_in_place and (not Config.dest_assessment_dir.exists() or Config.overwrite_dest
+                                              or extraction_manifest.is_extraction_incomplete(Config.dest_assessment_dir)):
         assessment_extractor_timer = Timer()
         assessment_extractor_timer.start("starting assessment extractor")
         assessment_extractor.create_assessment_from_source(Config.source_project_dir, Config.dest_assessment_dir)
         assessment_extractor_timer.stop("stopping assessment extractor")
         print(logger.info(assessment_extractor_timer.elapsed("Elapsed time for assessment extractor: ")))
 
+    if Config.streaming_pipeline:
+        run_streaming_pipeline()
+        return
+
     # CREATES A FILE DATA OBJECT FOR EACH FILE IN THE ASSESSMENT
     assessment_reader_timer = Timer()
     assessment_reader_timer.start("starting assessment reader timer")
-    assessment_reader_optimized.read_all_assessment_files(Config.dest_assessment_dir)
+    if Config.scan_archives_in_place:
+        archive_reader_optimized.read_all_assessment_files_from_source(Config.source_project_dir)
+    else:
+        assessment_reader_optimized.read_all_assessment_files(Config.dest_assessment_dir)
     assessment_reader_timer.stop("stopping assessment reader timer")
     print(logger.info(assessment_reader_timer.elapsed("Elapsed time for assessment reader: ")))
 
@@ -49,11 +108,26 @@ def main(assessment_created=False) -> None:
     # # CLEAN DECODED BINARY TEXT
     # file_content_cleaner_and_normalizer.clean_and_normalize_assessment_files_content()
 
+    # LOAD THE PRECOMPILED LICENSE CORPUS (NORMALIZED TEXTS, INDEXES, MATCHER), REBUILT ONLY WHEN LICENSES CHANGE
+    license_corpus_timer = Timer()
+    license_corpus_timer.start("starting license corpus timer")
+    license_corpus = license_corpus_cache.load_or_build_license_corpus()
+    Config.license_header_indexes = license_corpus.license_header_indexes
+    Config.license_header_postings = license_corpus.license_header_postings
+    # Recorded with the results, prior results only carry forward against the same corpus and engine
+    Config.license_corpus_checksum = license_corpus.checksum
+    Config.analysis_engine_version = analysis_result_cache.get_engine_version()
+    license_corpus_timer.stop("stopping license corpus timer")
+    print(logger.info(license_corpus_timer.elapsed("Elapsed time for license corpus: ")))
+
+    # FILES THAT GO THROUGH INDEXING AND THE SEARCH STAGES
+    files_to_analyze = Config.file_data_manager.get_all_file_data()
+
     if Config.diff_file_data:
         # LOAD PRE-EXISTING FILE DATA FROM JSON
         file_data_load_timer = Timer()
         file_data_load_timer.start("starting file data load")
-        Config.loaded_file_data_manager = FileDataManager.load_from_json()
+        Config.loaded_file_data_manager = FileDataManager.load_from_json(Path(Config.diff_file_data))
         file_data_load_timer.stop("stopping file data load")
         print(logger.info(file_data_load_timer.elapsed("Elapsed time for file data load: ")))
 
@@ -62,43 +136,49 @@ def main(assessment_created=False) -> None:
         assessment_compare_timer.start("starting assessment compare timer")
         old_file_data = Config.loaded_file_data_manager.get_all_file_data()
         new_file_data = Config.file_data_manager.get_all_file_data()
-        assessment_compare.find_new_or_changed_files(old_file_data, new_file_data)
-        assessment_compare.find_removed_files(old_file_data, new_file_data)
+        new_or_changed_files = assessment_compare.find_new_or_changed_files(old_file_data, new_file_data)
+        removed_files = assessment_compare.find_removed_files(old_file_data, new_file_data)
+        print(logger.info(f"New or changed files: {len(new_or_changed_files)} removed files: {len(removed_files)}"))
+
+        # INCREMENTAL MODE: CARRY FORWARD RESULTS OF UNCHANGED FILES, ONLY ANALYZE NEW OR CHANGED ONES
+        if Config.incremental_assessment:
+            files_to_analyze = assessment_compare.carry_forward_unchanged_results(old_file_data, new_file_data,
+                                                                                  Config.license_corpus_checksum,
+                                                                                  Config.analysis_engine_version)
+            print(logger.info(f"Carried forward results for files: {len(new_file_data) - len(files_to_analyze)}"))
         assessment_compare_timer.stop("stopping assessment compare timer")
         print(logger.info(assessment_compare_timer.elapsed("Elapsed time for assessment compare: ")))
 
-    # READ/LOAD/NORMALIZE CONTENT OF LICENSES
-    license_header_reader_timer = Timer()
-    license_header_reader_timer.start("starting license header reader timer")
-    license_headers_normalized = utils.read_and_normalize_licenses(Config.all_license_headers_dir)
-    license_header_reader_timer.stop("stopping license header reader timer")
-    print(logger.info(license_header_reader_timer.elapsed("Elapsed time for license header reader: ")))
+    # GROUP IDENTICAL FILES BY HASH SO EACH UNIQUE CONTENT IS ANALYZED ONCE
+    Config.file_data_groups = file_hash_deduplicator.group_file_data_by_hash(files_to_analyze)
+    unique_file_data = file_hash_deduplicator.get_unique_file_data(Config.file_data_groups)
+    print(logger.info(f"Unique file contents: {len(unique_file_data)}"))
 
-    license_reader_timer = Timer()
-    license_reader_timer.start("starting license reader timer")
-    licenses_normalized = utils.read_and_normalize_licenses(Config.all_licenses_dir)
-    license_reader_timer.stop("stopping license reader timer")
-    print(logger.info(license_reader_timer.elapsed("Elapsed time for license reader: ")))
+    # REUSE RESULTS OF CONTENT ANALYZED IN EARLIER RUNS AGAINST THE SAME CORPUS AND ENGINE
+    analysis_cache = None
+    if Config.use_analysis_cache:
+        analysis_cache = analysis_result_cache.AnalysisResultCache(license_corpus.checksum)
+        unique_file_data = analysis_cache.fill_cached_results(unique_file_data)
+        print(logger.info(f"Unique file contents to analyze after analysis cache: {len(unique_file_data)}"))
 
     # BREAK LICENSE AND FILE STRING INDEXING OUT INTO THEIR OWN MODULES
     file_indexing_timer = Timer()
     file_indexing_timer.start("starting file indexing timer")
-    Config.file_indexes = file_content_indexer_optimized.build_file_indexes(Config.file_data_manager.get_all_file_data(), anchor_size=4)
+    Config.file_indexes = file_content_indexer_optimized.build_file_indexes(unique_file_data, anchor_size=4)
     file_indexing_timer.stop("stopping file indexing timer")
     print(logger.info(file_indexing_timer.elapsed("Elapsed time for file indexing: ")))
 
-    license_indexing_timer = Timer()
-    license_indexing_timer.start("starting license indexing timer")
-    Config.license_header_indexes = file_content_indexer.build_pattern_indexes_from_dict(license_headers_normalized, anchor_size=4)
-    license_indexing_timer.stop("stopping license indexing timer")
-    print(logger.info(license_indexing_timer.elapsed("Elapsed time for license indexing: ")))
+    # LICENSES DECLARED BY SPDX-LICENSE-IDENTIFIER TAGS, FILES WITH ONE MAY SKIP THE FUZZY SEARCH
+    tagged_count, fuzzy_skipped_count = spdx_tag_scanner.search_assessment_files_for_spdx_tags(unique_file_data)
+    print(logger.info(f"Files with SPDX license tags: {tagged_count} skipping fuzzy search: {fuzzy_skipped_count}"))
 
     # SCAN ALL ASSESSMENT FILES FOR FULL LICENSE MATCHES
     print("Begin full license search")
     full_license_search_timer = Timer()
     full_license_search_timer.start("starting full license search timer")
-    license_metadata = full_license_search_optimized.build_license_metadata(licenses_normalized)
-    full_license_search_optimized.search_assessment_files_for_full_licenses(license_metadata, Config.file_indexes)
+    full_license_search_optimized.search_assessment_files_for_full_licenses(license_corpus.license_metadata,
+                                                                            Config.file_indexes,
+                                                                            license_corpus.full_license_matcher)
     full_license_search_timer.stop("stopping full license search timer")
     print(logger.info(full_license_search_timer.elapsed("Elapsed time for full license search: ")))
 
@@ -106,7 +186,8 @@ def main(assessment_created=False) -> None:
     print("Begin fuzzy license search")
     fuzzy_license_search_timer = Timer()
     fuzzy_license_search_timer.start("starting fuzzy license search timer")
-    fuzzy_license_search.fuzzy_match_licenses_in_assessment_files(Config.license_header_indexes)
+    fuzzy_license_search.fuzzy_match_licenses_in_assessment_files(Config.license_header_indexes,
+                                                                  Config.license_header_postings)
     fuzzy_license_search_timer.stop("stopping fuzzy license search timer")
     print(logger.info(fuzzy_license_search_timer.elapsed("Elapsed time for fuzzy license search: ")))
 
@@ -114,7 +195,7 @@ def main(assessment_created=False) -> None:
     print("Begin fuzzy license evaluator")
     fuzzy_evaluator_timer = Timer()
     fuzzy_evaluator_timer.start("starting fuzzy evaluator timer")
-    fuzzy_matches_evaluator.determine_best_fuzzy_matches_from_file_data()
+    fuzzy_matches_evaluator.determine_best_fuzzy_matches_from_file_data(unique_file_data)
     fuzzy_evaluator_timer.stop("stopping fuzzy evaluator timer")
     print(logger.info(fuzzy_evaluator_timer.elapsed("Elapsed time for fuzzy evaluator: ")))
 
@@ -122,25 +203,19 @@ def main(assessment_created=False) -> None:
     print("Begin keyword search")
     keyword_search_timer = Timer()
     keyword_search_timer.start("starting keyword search timer")
-    keyword_search_optimized.search_all_assessment_files_for_keyword_matches()
+    keyword_search_optimized.search_all_assessment_files_for_keyword_matches(license_corpus.keyword_matcher)
     keyword_search_timer.stop("stopping keyword search timer")
     print(logger.info(keyword_search_timer.elapsed("Elapsed time for keyword search: ")))
 
-    # GENERATE CSV OF ASSESSMENT DATA
-    print("Begin csv gen")
-    csv_gen_timer = Timer()
-    csv_gen_timer.start("starting csv gen timer")
-    assessment_data_generator.write_license_data_to_csv("".join([Config.assessment_name, "_data", ".csv"]))
-    csv_gen_timer.stop("stopping csv gen timer")
-    print(logger.info(csv_gen_timer.elapsed("Elapsed time for csv gen: ")))
+    if analysis_cache is not None:
+        analysis_cache.store(unique_file_data)
+        analysis_cache.close()
 
-    # SAVE FILE DATA TO JSON
-    print("Begin save file data to json")
-    file_data_to_json_timer = Timer()
-    file_data_to_json_timer.start("starting file data to json timer")
-    Config.file_data_manager.save_to_json()
-    file_data_to_json_timer.stop("stopping file data to json timer")
-    print(logger.info(file_data_to_json_timer.elapsed("Elapsed time for file data to json: ")))
+    # COPY RESULTS OF EACH UNIQUE CONTENT TO ITS DUPLICATES
+    duplicate_count = file_hash_deduplicator.fan_out_analysis_results(Config.file_data_groups)
+    print(logger.info(f"Duplicate files filled from cached results: {duplicate_count}"))
+
+    write_assessment_outputs()
 
 
 
@@ -152,6 +227,8 @@ if __name__ == "__main__":
     # print_utils.print_files_with_full_license_match()
     print_utils.print_files_with_fuzzy_license_matches("output/fuzzy_license_matches.txt")
     print_utils.print_empty_files()
+    if Config.fuzzy_header_window:
+        print_utils.print_fuzzy_windowed_files()
     print(f"Total assessment file count: {Config.assessment_file_count}")
     print(f"Released file count: {Config.released_file_count}")
     print('Done')
@@ -1,10 +1,13 @@
 import json
 import zlib
 import base64
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from pathlib import Path
 from typing import Optional, List, Dict, Union
 from configuration import Configuration as Config
+from tools.file_content_indexer import MatchResult
+from optimized import file_type_triage, offset_map
+import utils
 
 
 
@@ -55,8 +58,21 @@ class FileData:
         self._keyword_combination_matches = None
         self._fuzzy_license_matches = []
         self._fuzzy_license_match = None
+        # Original byte span and lines of fuzzy_license_match, set when the match is chosen
+        self._fuzzy_license_match_location = None
         self._has_full_license = False
+        # Fuzzy header search only looked at a head and tail window of the file
+        self._fuzzy_search_windowed = False
         self._file_is_empty = False
+        # text, binary (content is its printable strings) or skipped (content not read)
+        self._file_type = "text"
+        # Expressions of the file's SPDX-License-Identifier tags
+        self._spdx_license_expressions = []
+        # Compressed content kept when the content itself is dropped (streaming pipeline)
+        self._file_content_b64 = None
+        # License corpus checksum and engine version of loaded search results (None if unknown)
+        self._results_corpus_checksum = None
+        self._results_engine_version = None
         # self._header_data = header_data if header_data is not None else []
         # self._file_entry = file_entry if file_entry is not None else []
         # self._file_search_data = file_search_data if file_search_data is not None else []
@@ -179,6 +195,14 @@ class FileData:
     def fuzzy_license_match(self, fuzzy_license_match):
         self._fuzzy_license_match = fuzzy_license_match
 
+    @property
+    def fuzzy_license_match_location(self):
+        return self._fuzzy_license_match_location
+
+    @fuzzy_license_match_location.setter
+    def fuzzy_license_match_location(self, fuzzy_license_match_location):
+        self._fuzzy_license_match_location = fuzzy_license_match_location
+
     @property
     def has_full_license(self):
         return self._has_full_license
@@ -187,6 +211,14 @@ class FileData:
     def has_full_license(self, has_full_license):
         self._has_full_license = has_full_license
 
+    @property
+    def fuzzy_search_windowed(self):
+        return self._fuzzy_search_windowed
+
+    @fuzzy_search_windowed.setter
+    def fuzzy_search_windowed(self, fuzzy_search_windowed):
+        self._fuzzy_search_windowed = fuzzy_search_windowed
+
     @property
     def file_is_empty(self):
         return self._file_is_empty
@@ -194,6 +226,46 @@ class FileData:
     @file_is_empty.setter
     def file_is_empty(self, file_is_empty):
         self._file_is_empty = file_is_empty
+
+    @property
+    def file_type(self):
+        return self._file_type
+
+    @file_type.setter
+    def file_type(self, file_type):
+        self._file_type = file_type
+
+    @property
+    def spdx_license_expressions(self):
+        return self._spdx_license_expressions
+
+    @spdx_license_expressions.setter
+    def spdx_license_expressions(self, spdx_license_expressions):
+        self._spdx_license_expressions = spdx_license_expressions
+
+    @property
+    def file_content_b64(self):
+        return self._file_content_b64
+
+    @file_content_b64.setter
+    def file_content_b64(self, file_content_b64):
+        self._file_content_b64 = file_content_b64
+
+    @property
+    def results_corpus_checksum(self):
+        return self._results_corpus_checksum
+
+    @results_corpus_checksum.setter
+    def results_corpus_checksum(self, results_corpus_checksum):
+        self._results_corpus_checksum = results_corpus_checksum
+
+    @property
+    def results_engine_version(self):
+        return self._results_engine_version
+
+    @results_engine_version.setter
+    def results_engine_version(self, results_engine_version):
+        self._results_engine_version = results_engine_version
     #
     # @property
     # def header_data(self):
@@ -267,6 +339,24 @@ class FileData:
     # def license_data(self, license_data):
     #     self._license_data = license_data
 
+    def locate_fuzzy_license_match(self) -> Optional[Dict[str, int]]:
+        """
+        Original byte span and lines of the fuzzy license match
+        (offset_map.locate_in_text), None without a match or if the text
+        doesn't line up with it. The match indexes into the cleaned content
+        normalized; the content is cleaned with keep_length so positions
+        still point into the original. Only the content up to the match is
+        mapped.
+
+        None for binaries too: their content is the extracted printable
+        strings, so offsets into it aren't offsets into the file.
+        """
+        match = self.fuzzy_license_match
+        if match is None or self.file_type == file_type_triage.FILE_TYPE_BINARY:
+            return None
+        text = utils.clean_decoded_binary_text(utils.to_text(self.file_content), keep_length=True)
+        return offset_map.locate_in_text(text, match.start_index, match.end_index, match.matched_substring)
+
     def to_persisted_dict(self) -> dict:
         is_text = isinstance(self.file_content, str)
         # Choose what to save.
@@ -274,8 +364,18 @@ class FileData:
             "file_path": str(Path(self.file_path).relative_to(Config.dest_dir)),
             "file_hash": self.file_hash,
             "licenses": self.license_names,
-            "file_content_b64": compress_to_b64(self.file_content),
+            "file_content_b64": self.file_content_b64 if self.file_content_b64 is not None else compress_to_b64(self.file_content),
             "file_content_is_text": is_text,
+            "file_type": self.file_type,
+            # Search results, so an incremental reassessment can carry them forward, and what produced them
+            "corpus_checksum": Config.license_corpus_checksum,
+            "engine_version": Config.analysis_engine_version,
+            "has_full_license": self.has_full_license,
+            "license_match_strength": self.license_match_strength,
+            "fuzzy_license_match": asdict(self.fuzzy_license_match) if self.fuzzy_license_match else None,
+            # Original byte span and lines of the fuzzy match
+            "fuzzy_license_match_location": self.fuzzy_license_match_location,
+            "keyword_matches": self.keyword_matches,
             # add "file_extension": self.file_extension if you want it too
         }
 
@@ -299,7 +399,17 @@ class FileData:
             file_content=file_content,
         )
         obj.file_hash = file_hash
-        obj.license_names = license_names
+        obj.file_type = data.get("file_type", "text")
+        obj.license_names = license_names if license_names is not None else []
+        obj.has_full_license = data.get("has_full_license", False)
+        obj.license_match_strength = data.get("license_match_strength")
+        fuzzy_license_match = data.get("fuzzy_license_match")
+        obj.fuzzy_license_match = MatchResult(**fuzzy_license_match) if fuzzy_license_match else None
+        obj.fuzzy_license_match_location = data.get("fuzzy_license_match_location")
+        obj.keyword_matches = data.get("keyword_matches")
+        # Absent from JSON written before results were persisted
+        obj.results_corpus_checksum = data.get("corpus_checksum")
+        obj.results_engine_version = data.get("engine_version")
         return obj
 
 
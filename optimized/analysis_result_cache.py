@@ -0,0 +1,152 @@
+from configuration import Configuration as Config
+from models.FileData import FileData
+import hashlib
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+# Bump whenever full/fuzzy/keyword matching or the fuzzy evaluator changes results
+ANALYSIS_ENGINE_VERSION = 3
+
+ANALYSIS_CACHE_FILE_NAME = "analysis_cache.sqlite"
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+_KEYWORD_STRINGS_PATH = Path(Config.root_dir, "input", "keyword_strings.py")
+
+
+def get_engine_version() -> str:
+    """
+    Engine key for cache entries: the code version plus a checksum of the
+    keyword terms and of the settings deciding what text a file is read as
+    and searched, so editing any of them invalidates earlier results.
+    """
+    h = hashlib.sha256()
+    if _KEYWORD_STRINGS_PATH.is_file():
+        h.update(_KEYWORD_STRINGS_PATH.read_bytes())
+    h.update(f"{Config.binary_file_triage}:{Config.binary_strings_min_length}:{Config.skip_no_license_file_types}".encode("ascii"))
+    h.update(f"{Config.spdx_tag_scan}:{Config.spdx_tag_skips_fuzzy}".encode("ascii"))
+    if Config.fuzzy_header_window:
+        h.update(f"{Config.fuzzy_header_window_head_tokens}:{Config.fuzzy_header_window_tail_tokens}:"
+                 f"{sorted(Config.fuzzy_header_window_extensions)}".encode("utf-8"))
+    return f"{ANALYSIS_ENGINE_VERSION}:{h.hexdigest()[:16]}"
+
+
+def results_to_dict(fd: FileData) -> dict:
+    """The search results of `fd`, without its content; what the cache stores per hash."""
+    return {
+        "license_matches": list(fd.license_matches),
+        "license_names": list(fd.license_names),
+        "license_match_strength": fd.license_match_strength,
+        "has_full_license": fd.has_full_license,
+        "fuzzy_license_matches": list(fd.fuzzy_license_matches),
+        "fuzzy_license_match": fd.fuzzy_license_match,
+        "fuzzy_license_match_location": fd.fuzzy_license_match_location,
+        "fuzzy_search_windowed": fd.fuzzy_search_windowed,
+        "keyword_matches": fd.keyword_matches,
+    }
+
+
+def apply_results(fd: FileData, results: dict) -> None:
+    """Fills results_to_dict() output into `fd`. Lists are copied, so one results dict can fill several files."""
+    fd.license_matches = list(results["license_matches"])
+    fd.license_names = list(results["license_names"])
+    fd.license_match_strength = results["license_match_strength"]
+    fd.has_full_license = results["has_full_license"]
+    fd.fuzzy_license_matches = list(results["fuzzy_license_matches"])
+    fd.fuzzy_license_match = results["fuzzy_license_match"]
+    fd.fuzzy_license_match_location = results.get("fuzzy_license_match_location")
+    fd.fuzzy_search_windowed = results.get("fuzzy_search_windowed", False)
+    fd.keyword_matches = results["keyword_matches"]
+
+
+class AnalysisResultCache:
+    """
+    Durable per-content results of the full, fuzzy and keyword searches,
+    stored in SQLite and keyed by (file hash, license corpus checksum,
+    engine version). Entries for another corpus or engine are never returned.
+    """
+
+    def __init__(self, corpus_checksum: str, path: Optional[Path] = None, engine_version: Optional[str] = None):
+        self.path = Path(path) if path is not None else Path(Config.data_dir, ANALYSIS_CACHE_FILE_NAME)
+        self.corpus_checksum = corpus_checksum
+        self.engine_version = engine_version if engine_version is not None else get_engine_version()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_results ("
+            " file_hash TEXT NOT NULL,"
+            " corpus_checksum TEXT NOT NULL,"
+            " engine_version TEXT NOT NULL,"
+            " results BLOB NOT NULL,"
+            " PRIMARY KEY (file_hash, corpus_checksum, engine_version))"
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "AnalysisResultCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def lookup(self, file_hashes: Iterable[str]) -> Dict[str, dict]:
+        """Returns {file_hash: results} for every hash that has a cache entry."""
+        hashes = list(file_hashes)
+        found: Dict[str, dict] = {}
+
+        for i in range(0, len(hashes), _LOOKUP_BATCH_SIZE):
+            batch = hashes[i:i + _LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT file_hash, results FROM analysis_results"
+                f" WHERE corpus_checksum = ? AND engine_version = ? AND file_hash IN ({placeholders})",
+                [self.corpus_checksum, self.engine_version, *batch],
+            )
+            for file_hash, blob in rows:
+                try:
+                    found[file_hash] = pickle.loads(blob)
+                except Exception as e:
+                    print(f"Ignoring unreadable analysis cache entry {file_hash}: {e}")
+
+        return found
+
+    def store(self, file_data_list: Iterable[FileData]) -> int:
+        """Stores the analysis results of each FileData that has a hash. Returns the count stored."""
+        rows = [
+            (fd.file_hash, self.corpus_checksum, self.engine_version,
+             pickle.dumps(results_to_dict(fd), protocol=pickle.HIGHEST_PROTOCOL))
+            for fd in file_data_list
+            if fd.file_hash
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO analysis_results"
+                " (file_hash, corpus_checksum, engine_version, results) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def fill_cached_results(self, file_data_list: List[FileData]) -> List[FileData]:
+        """
+        Fills cached results into every FileData whose hash is in the cache
+        and returns the ones that still need to be analyzed.
+        """
+        cached = self.lookup({fd.file_hash for fd in file_data_list if fd.file_hash})
+
+        uncached: List[FileData] = []
+        for fd in file_data_list:
+            results = cached.get(fd.file_hash) if fd.file_hash else None
+            if results is None:
+                uncached.append(fd)
+            else:
+                apply_results(fd, results)
+
+        return uncached
+
@@ -0,0 +1,244 @@
+from configuration import Configuration as Config
+from loggers.assessment_reader_logger import assessment_reader_logger as logger
+from optimized.assessment_reader_optimized import build_file_data_from_bytes, is_ignored_dir
+from tools import assessment_extractor, image_layer_extractor
+import bz2
+import gzip
+import io
+import lzma
+import os
+import posixpath
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+
+# Separates an archive from the path of a member inside it, e.g.
+# layer.tar!/usr/share/doc/x/COPYING
+ARCHIVE_MEMBER_SEPARATOR = "!/"
+
+# Archives nested deeper than this are read as plain files
+MAX_ARCHIVE_DEPTH = 16
+
+_DECOMPRESSORS = {
+    ".gz": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+    ".bz2": lambda f: bz2.BZ2File(f, mode="rb"),
+    ".xz": lambda f: lzma.LZMAFile(f, mode="rb"),
+    ".lzma": lambda f: lzma.LZMAFile(f, mode="rb"),
+}
+
+
+def _member_path(archive_path: Path, member_name: str) -> Optional[Path]:
+    """
+    Synthetic path of an archive member. Member names are normalized as
+    posix paths; anything pointing outside the archive is rejected.
+    """
+    name = posixpath.normpath(member_name.replace("\\", "/")).lstrip("/")
+    if not name or name == "." or name == ".." or name.startswith("../"):
+        return None
+    return Path(f"{archive_path}{ARCHIVE_MEMBER_SEPARATOR}{name}")
+
+
+def _is_seekable(fileobj: BinaryIO) -> bool:
+    # Members of a tar read in stream mode ("r|*") raise instead of answering
+    try:
+        return fileobj.seekable()
+    except (AttributeError, OSError):
+        return False
+
+
+def _open_archive(archive_path: Path, fileobj: BinaryIO, depth: int, memory_limit: int):
+    """
+    Return an iterator over the members of the tar or zip archive in
+    `fileobj`, or None (with fileobj rewound) if it is neither.
+    """
+    try:
+        tf = tarfile.open(fileobj=fileobj, mode="r:*")
+        return _iter_tar_members(archive_path, tf, depth, memory_limit)
+    except (tarfile.TarError, OSError, EOFError):
+        fileobj.seek(0)
+
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        try:
+            zf = zipfile.ZipFile(fileobj)
+            return _iter_zip_members(archive_path, zf, depth, memory_limit)
+        except (zipfile.BadZipFile, OSError):
+            pass
+
+    fileobj.seek(0)
+    return None
+
+
+def _iter_tar_members(archive_path: Path, tf: tarfile.TarFile, depth: int,
+                      memory_limit: int) -> Iterator[Tuple[Path, bytes]]:
+    with tf:
+        for member in tf:
+            # Skip dirs, symlinks, devices, fifos, etc.
+            if not member.isreg():
+                continue
+            member_path = _member_path(archive_path, member.name)
+            if member_path is None:
+                logger.error(f"Skipping unsafe tar member {member.name} in {archive_path}")
+                continue
+            src_f = tf.extractfile(member)
+            if src_f is None:
+                continue
+            with src_f:
+                yield from _iter_file_contents(member_path, src_f, member.size, depth + 1, memory_limit)
+
+
+def _iter_zip_members(archive_path: Path, zf: zipfile.ZipFile, depth: int,
+                      memory_limit: int) -> Iterator[Tuple[Path, bytes]]:
+    with zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            member_path = _member_path(archive_path, info.filename)
+            if member_path is None:
+                logger.error(f"Skipping unsafe zip member {info.filename} in {archive_path}")
+                continue
+            with zf.open(info, "r") as src_f:
+                yield from _iter_file_contents(member_path, src_f, info.file_size, depth + 1, memory_limit)
+
+
+def _iter_file_contents(path: Path, fileobj: BinaryIO, size: int, depth: int,
+                        memory_limit: int) -> Iterator[Tuple[Path, bytes]]:
+    """
+    Yield (path, raw bytes) for a file, or for every file inside it if it is
+    an archive or compressed file, classified the same way as
+    assessment_extractor would when extracting it.
+
+    Nested archives up to memory_limit bytes are read into memory; bigger ones
+    are read through their member stream instead if it is seekable, else
+    (e.g. members of an image layer read in stream mode) through a temp file
+    the stream is copied to.
+    """
+    # Archives and compressed files are opened, anything else is read as is
+    is_container = depth <= MAX_ARCHIVE_DEPTH and (assessment_extractor.is_multi_archive(path)
+                                                   or assessment_extractor.is_single_compressed(path))
+    if not _is_seekable(fileobj):
+        if is_container and size > memory_limit:
+            with tempfile.TemporaryFile() as spilled:
+                shutil.copyfileobj(fileobj, spilled)
+                spilled.seek(0)
+                yield from _iter_file_contents(path, spilled, size, depth, memory_limit)
+            return
+        fileobj = io.BytesIO(fileobj.read())
+
+    if depth <= MAX_ARCHIVE_DEPTH and assessment_extractor.is_multi_archive(path):
+        archive_obj = fileobj if size > memory_limit else io.BytesIO(fileobj.read())
+        members = _open_archive(path, archive_obj, depth, memory_limit)
+        if members is not None:
+            yield from members
+            return
+        yield path, archive_obj.read()
+        return
+
+    if depth <= MAX_ARCHIVE_DEPTH and assessment_extractor.is_single_compressed(path):
+        opener = _DECOMPRESSORS.get(path.suffix.lower())
+        try:
+            with opener(fileobj) as f_in:
+                raw = f_in.read()
+        except (OSError, EOFError, lzma.LZMAError) as e:
+            logger.error(f"Could not decompress {path}, reading it as is: {e}")
+            fileobj.seek(0)
+        else:
+            # Like decompress_single: drop only the final extension
+            yield from _iter_file_contents(path.with_suffix(""), io.BytesIO(raw), len(raw), depth + 1, memory_limit)
+            return
+
+    yield path, fileobj.read()
+
+
+def _list_source_files(source: Path, virtual_root: Path) -> List[Tuple[Path, Path]]:
+    """[(path on disk, synthetic path)] for a source file or every file under a source directory."""
+    if source.is_file():
+        return [(source, Path(virtual_root, source.name))]
+    return [
+        (Path(dirpath, filename), Path(virtual_root, Path(dirpath, filename).relative_to(source)))
+        for dirpath, dirnames, filenames in os.walk(source)
+        for filename in filenames
+    ]
+
+
+def iter_source_files(source: Path, virtual_root: Path,
+                      memory_limit: Optional[int] = None) -> Iterator[Tuple[Path, bytes]]:
+    """
+    Yield (synthetic path, raw bytes) for every file in `source` (a file or a
+    directory), looking inside archives instead of extracting them. Paths are
+    rooted at virtual_root, mirroring where the extractor would have put them.
+    """
+    if memory_limit is None:
+        memory_limit = Config.archive_memory_limit_mb * 1024 * 1024
+
+    for file_path, virtual_path in _list_source_files(Path(source), virtual_root):
+        yield from _iter_disk_file(file_path, virtual_path, memory_limit)
+
+
+def _iter_disk_file(file_path: Path, virtual_path: Path, memory_limit: int) -> Iterator[Tuple[Path, bytes]]:
+    try:
+        if Config.image_layer_aware and image_layer_extractor.is_image(file_path):
+            # Only the image's final visible filesystem, e.g. image.tar!/usr/share/doc/x/COPYING
+            for layer_index, name, src_f, member in image_layer_extractor.iter_visible_files(file_path):
+                yield from _iter_file_contents(_member_path(virtual_path, name), src_f, member.size, 1, memory_limit)
+            return
+
+        with open(file_path, "rb") as f:
+            yield from _iter_file_contents(virtual_path, f, os.fstat(f.fileno()).st_size, 0, memory_limit)
+    except Exception as e:
+        print(logger.exception(f"Could not read file: {file_path} exception: {e}"))
+
+
+def _read_source_file(file_path: Path, virtual_path: Path, memory_limit: int,
+                      normalized_by_hash: Dict[str, str]) -> Tuple[int, int]:
+    """Worker: read one source file (and its members) into FileData. Returns (file count, released count)."""
+    add_file_data = Config.file_data_manager.add_file_data
+    file_count = 0
+    released_count = 0
+
+    for path, raw in _iter_disk_file(file_path, virtual_path, memory_limit):
+        file_count += 1
+        if is_ignored_dir(path):
+            continue
+        add_file_data(build_file_data_from_bytes(path, raw, normalized_by_hash))
+        released_count += 1
+
+    return file_count, released_count
+
+
+def read_all_assessment_files_from_source(source, virtual_root=None, max_workers: Optional[int] = None) -> None:
+    """
+    Virtual-filesystem alternative to extracting the assessment and reading it
+    back: archives (tar/zip/jar, compressed and nested) under `source` are
+    read in place, and each member becomes a FileData with a synthetic path
+    like <virtual_root>/layer.tar!/usr/share/doc/x/COPYING. Nothing is written
+    to disk. Top-level files are read in parallel.
+    """
+    source = Path(source)
+    if virtual_root is None:
+        virtual_root = Config.dest_assessment_dir
+    memory_limit = Config.archive_memory_limit_mb * 1024 * 1024
+
+    sources = _list_source_files(source, virtual_root)
+    print(logger.info(f"Found source files to read in place under: {len(sources)} {source}"))
+
+    normalized_by_hash: Dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_read_source_file, file_path, virtual_path, memory_limit, normalized_by_hash)
+            for file_path, virtual_path in sources
+        ]
+        for future in as_completed(futures):
+            file_count, released_count = future.result()
+            Config.assessment_file_count += file_count
+            Config.released_file_count += released_count
+
+
+if __name__ == "__main__":
+    read_all_assessment_files_from_source(Config.source_project_dir)
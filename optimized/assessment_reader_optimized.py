@@ -1,20 +1,30 @@
 from configuration import Configuration as Config
 from models.FileData import FileData
 from loggers.assessment_reader_logger import assessment_reader_logger as logger
+from optimized import file_type_triage, spdx_tag_scanner
+from tools import content_store, extraction_manifest
 import utils
 import hashlib
+import mmap
 import os
 import re
 from pathlib import Path
-from typing import Union, Optional, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Union, Optional, List, Dict, Iterator, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 
-# One or more control chars (except \n, \r, \t) → single space
-_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0B-\x0C\x0E-\x1F]+')
+# Files from this size on are memory-mapped instead of read into a bytes object
+MMAP_MIN_FILE_SIZE = 1024 * 1024
 
-# Optional: literal "\xNN" escape sequences → single space
-_HEX_ESCAPE_RE = re.compile(r'(?:\\x[0-9A-Fa-f]{2})+')
+# Decoded text longer than this is cleaned and normalized in chunks of about this many characters
+NORMALIZE_CHUNK_SIZE = 1024 * 1024
+
+# Characters of text per batch sent to a normalization worker process
+NORMALIZE_BATCH_SIZE = 4 * 1024 * 1024
+
+# Chunks are split after a space or newline, which every cleaning and
+# normalization step leaves in place and none looks across
+_CHUNK_BOUNDARY_RE = re.compile(r'[ \n]')
 
 
 def is_ignored_dir(src_dir: Path) -> bool:
@@ -27,102 +37,292 @@ def is_ignored_dir(src_dir: Path) -> bool:
 
 def clean_decoded_binary_text(text: str) -> str:
     """
-    Replace runs of binary-like/control characters in text with a single space.
-
-    This targets:
-      - Actual control characters (NUL, BEL, etc.) in the decoded string.
-      - Literal '\\xNN' escape sequences, if they appear as text.
-
-    Newlines and tabs are preserved.
+    Replace runs of binary-like/control characters in text with a single
+    space, see utils.clean_decoded_binary_text.
     """
-    # Remove actual control characters (not visible but still in the string)
-    text = _CONTROL_CHARS_RE.sub(' ', text)
+    return utils.clean_decoded_binary_text(text)
 
-    # If your decoding ever produces literal backslash-x sequences like "\x00"
-    # as real characters, this cleans those too.
-    text = _HEX_ESCAPE_RE.sub(' ', text)
 
-    return text
-
-
-def _read_single_file(file_path: Path) -> Optional["FileData"]:
+def _read_single_file(file_path: Path, normalized_by_hash: Optional[Dict[str, str]] = None,
+                      normalize: bool = True) -> Optional["FileData"]:
+    """
+    Read, hash and normalize one file. If `normalized_by_hash` is given, files
+    whose content was already normalized reuse that text instead of
+    normalizing it again. With normalize=False the normalized text is left
+    for the caller to fill in.
+    """
     try:
         with open(file_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            # Files extracted through the content store were hashed while being written
+            file_hash = content_store.lookup_hash(st)
+
+            if st.st_size >= MMAP_MIN_FILE_SIZE:
+                # Hash and decode straight from the page cache, no bytes copy of the file
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        return build_file_data_from_bytes(file_path, mapped, normalized_by_hash, file_hash, normalize)
+                except (OSError, ValueError) as e:
+                    logger.info(f"Could not map {file_path}, reading it instead: {e}")
+                    f.seek(0)
+
             raw: bytes = f.read()
     except Exception as e:
         #logger.exception("Could not read %s: %s", file_path, e)
         print(logger.exception(f"Could not read file: {file_path} exception: {e}"))
         return None
 
+    return build_file_data_from_bytes(file_path, raw, normalized_by_hash, file_hash, normalize)
+
+
+def _iter_text_chunks(text: str, chunk_size: int):
+    """Split text into pieces of about chunk_size characters, each ending after a space or newline."""
+    start = 0
+    n = len(text)
+    while n - start > chunk_size:
+        end = start + chunk_size
+        split = max(text.rfind(" ", start, end), text.rfind("\n", start, end))
+        if split < 0:
+            match = _CHUNK_BOUNDARY_RE.search(text, end)
+            if match is None:
+                break
+            split = match.start()
+        yield text[start:split + 1]
+        start = split + 1
+    yield text[start:]
+
+
+def clean_and_normalize_text(text: str, chunk_size: Optional[int] = None) -> str:
+    """
+    clean_decoded_binary_text followed by utils.remove_punctuation_and_normalize_text,
+    done chunk by chunk (default NORMALIZE_CHUNK_SIZE) for long text so the
+    cleaned copy of the whole text never exists. The result is the same as
+    normalizing the text at once.
+    """
+    if chunk_size is None:
+        chunk_size = NORMALIZE_CHUNK_SIZE
+    if len(text) <= chunk_size:
+        return utils.remove_punctuation_and_normalize_text(clean_decoded_binary_text(text))
+
+    pieces = []
+    for chunk in _iter_text_chunks(text, chunk_size):
+        piece = utils.remove_punctuation_and_normalize_text(clean_decoded_binary_text(chunk))
+        if piece:
+            pieces.append(piece)
+    return " ".join(pieces)
+
+
+def build_file_data_from_bytes(file_path: Path, raw: Union[bytes, mmap.mmap],
+                               normalized_by_hash: Optional[Dict[str, str]] = None,
+                               file_hash: Optional[str] = None, normalize: bool = True) -> "FileData":
+    """
+    Hash, decode and normalize the raw bytes of one file. Shared by the disk
+    reader and readers of other sources, e.g. archive members. `raw` may be
+    any bytes-like buffer, e.g. a memory-mapped file; nothing keeps a
+    reference to it. A `file_hash` already computed for these bytes is used
+    as is.
+
+    With BINARY_FILE_TRIAGE, binaries are read as their printable strings
+    and images and fonts aren't read at all; file_type records which.
+    With SPDX_TAG_SCAN, SPDX-License-Identifier tags are read from the bytes.
+    """
     # Determine if the file is empty
     is_empty = (len(raw) == 0)
 
-    # compute hash directly from raw bytes (only disk read)
-    algo = Config.file_hash_algorithm  # e.g., "sha256"
-    h = hashlib.new(algo)
-    h.update(raw)
-    file_hash = h.hexdigest()
+    if file_hash is None:
+        # compute hash directly from raw bytes (only disk read)
+        algo = Config.file_hash_algorithm  # e.g., "sha256"
+        h = hashlib.new(algo)
+        h.update(raw)
+        file_hash = h.hexdigest()
 
 
+    file_extension = utils.get_file_extension(file_path)
+    file_type = file_type_triage.FILE_TYPE_TEXT
+    if not is_empty and Config.binary_file_triage:
+        file_type = file_type_triage.classify_file(raw, file_extension)
+        if file_type == file_type_triage.FILE_TYPE_SKIPPED and not Config.skip_no_license_file_types:
+            file_type = file_type_triage.FILE_TYPE_BINARY
+
     if is_empty:
         # You can choose "" or b""; "" keeps things simple for text handling
         content: Union[str, bytes] = ""
         print(logger.info(f"File empty: {file_path}"))
+    elif file_type == file_type_triage.FILE_TYPE_SKIPPED:
+        content = ""
+        print(logger.info(f"File skipped, no license content expected: {file_path}"))
+    elif file_type == file_type_triage.FILE_TYPE_BINARY:
+        # Only the printable runs, instead of the whole file decoded with its garbage
+        content = file_type_triage.extract_printable_strings(raw, Config.binary_strings_min_length)
     else:
         try:
             # First attempt: strict UTF-8 decode
-            decoded = raw.decode("utf-8")
+            decoded = str(raw, "utf-8")
         except UnicodeDecodeError:
             # Fallback: decode with errors ignored, then clean
             # This is where your \x00-style junk shows up.
-            decoded = raw.decode("utf-8", errors="ignore")
+            decoded = str(raw, "utf-8", errors="ignore")
 
         # At this point `decoded` is always a str from bytes,
         content = decoded
 
     file_data = FileData(file_path, content)
-    file_data.file_extension = utils.get_file_extension(file_path)
+    file_data.file_extension = file_extension
     file_data.file_is_empty = is_empty
+    file_data.file_type = file_type
     file_data.file_hash = file_hash
-    cleaned_file_content = clean_decoded_binary_text(file_data.file_content)
-    file_data.file_content_normalized = utils.remove_punctuation_and_normalize_text(cleaned_file_content)
+    if Config.spdx_tag_scan and file_type != file_type_triage.FILE_TYPE_SKIPPED and not is_empty:
+        # Straight from the bytes, so binaries are covered too
+        file_data.spdx_license_expressions = spdx_tag_scanner.scan_spdx_license_expressions(raw)
+    if not normalize:
+        return file_data
+
+    normalized = normalized_by_hash.get(file_hash) if normalized_by_hash is not None else None
+    if normalized is None:
+        normalized = clean_and_normalize_text(file_data.file_content)
+        if normalized_by_hash is not None:
+            normalized_by_hash[file_hash] = normalized
+    file_data.file_content_normalized = normalized
     return file_data
 
 
-def read_all_assessment_files(root_dir, max_workers: Optional[int] = None):
+def _walk_file_paths(root_dir: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirpath_path = Path(dirpath)
+        for filename in filenames:
+            yield dirpath_path / filename
+
+
+def collect_assessment_file_paths(root_dir) -> List[Path]:
     """
-    Multithreaded version:
-      - Walks the directory tree once to collect file paths.
-      - Uses a ThreadPoolExecutor to read files in parallel.
+    Returns the paths of all released files, updating the assessment and
+    released file counts. The file listing of a completed extraction
+    manifest is used if there is one, else the directory tree is walked.
     """
-
     root_dir = Path(root_dir)
 
-    # 1. Collect all file paths first (cheap)
+    all_file_paths = extraction_manifest.load_file_listing(root_dir)
+    if all_file_paths is None:
+        all_file_paths = _walk_file_paths(root_dir)
+    else:
+        print(logger.info(f"Using the extraction manifest file listing for: {root_dir}"))
+
     file_paths: List[Path] = []
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        dirpath_path = Path(dirpath)
-        for filename in filenames:
-            Config.assessment_file_count += 1
-            if not is_ignored_dir(dirpath_path / filename):
-                file_paths.append(dirpath_path / filename)
-                Config.released_file_count += 1
+    for file_path in all_file_paths:
+        Config.assessment_file_count += 1
+        if not is_ignored_dir(file_path):
+            file_paths.append(file_path)
+            Config.released_file_count += 1
 
     #logger.info("Found %d files to read under %s", len(file_paths), root_dir)
     print(logger.info(f"Found files to read under: {len(file_paths)} {root_dir}"))
+    return file_paths
+
+
+def _normalize_pieces(pieces: List[str]) -> List[str]:
+    """Worker: clean and normalize each piece of text."""
+    return [utils.remove_punctuation_and_normalize_text(clean_decoded_binary_text(piece)) for piece in pieces]
+
+
+def _normalize_in_processes(file_data_list: List[FileData], max_workers: int) -> None:
+    """
+    Fill in the normalized text of every FileData using worker processes.
+    Each unique content is normalized once; long texts are split into
+    chunks as in clean_and_normalize_text, and pieces are sent in batches of
+    about NORMALIZE_BATCH_SIZE characters so large and small files spread
+    evenly over the workers. Only the normalized text comes back.
+    """
+    file_data_by_hash: Dict[str, List[FileData]] = {}
+    for fd in file_data_list:
+        file_data_by_hash.setdefault(fd.file_hash, []).append(fd)
+
+    # Pieces of each unique text, and where each batch's pieces belong
+    normalized_pieces: Dict[str, List[Optional[str]]] = {}
+    batches: List[List[str]] = []
+    batch_targets: List[List[Tuple[str, int]]] = []
+    batch: List[str] = []
+    targets: List[Tuple[str, int]] = []
+    batch_chars = 0
+
+    for file_hash, group in file_data_by_hash.items():
+        text = group[0].file_content
+        pieces = list(_iter_text_chunks(text, NORMALIZE_CHUNK_SIZE)) if len(text) > NORMALIZE_CHUNK_SIZE else [text]
+        normalized_pieces[file_hash] = [None] * len(pieces)
+        for piece_index, piece in enumerate(pieces):
+            batch.append(piece)
+            targets.append((file_hash, piece_index))
+            batch_chars += len(piece)
+            if batch_chars >= NORMALIZE_BATCH_SIZE:
+                batches.append(batch)
+                batch_targets.append(targets)
+                batch, targets, batch_chars = [], [], 0
+    if batch:
+        batches.append(batch)
+        batch_targets.append(targets)
+
+    print(logger.info(f"Normalizing unique contents: {len(normalized_pieces)} in batches: {len(batches)}"))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_normalize_pieces, b): i for i, b in enumerate(batches)}
+        for future in as_completed(futures):
+            for (file_hash, piece_index), normalized in zip(batch_targets[futures[future]], future.result()):
+                normalized_pieces[file_hash][piece_index] = normalized
+
+    for file_hash, pieces in normalized_pieces.items():
+        normalized = pieces[0] if len(pieces) == 1 else " ".join(piece for piece in pieces if piece)
+        for fd in file_data_by_hash[file_hash]:
+            fd.file_content_normalized = normalized
+
+
+def read_all_assessment_files(root_dir, max_workers: Optional[int] = None, normalize_workers: Optional[int] = None):
+    """
+    Multithreaded version:
+      - Walks the directory tree once to collect file paths.
+      - Uses a ThreadPoolExecutor to read files in parallel.
+
+    normalize_workers (default Config.reader_normalize_workers):
+      - 1: normalize in the reader threads
+      - >1: normalize in that many worker processes after reading
+      - 0 or less: one worker process per CPU
+    """
+    if normalize_workers is None:
+        normalize_workers = Config.reader_normalize_workers
+    if normalize_workers <= 0:
+        normalize_workers = os.cpu_count() or 1
+
+    # 1. Collect all file paths first (cheap)
+    file_paths = collect_assessment_file_paths(root_dir)
 
     add_file_data = Config.file_data_manager.add_file_data
 
+    # Normalization is pure Python and holds the GIL; with several workers it
+    # moves out of the reader threads into processes
+    normalize_in_threads = normalize_workers == 1 or len(file_paths) <= 1
+
+    # Identical files (same hash) share one normalized string
+    normalized_by_hash: Dict[str, str] = {}
+    unnormalized: List[FileData] = []
+    file_type_counts: Dict[str, int] = {}
+
     # 2. Read in parallel
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_path = {
-            executor.submit(_read_single_file, p): p for p in file_paths
+            executor.submit(_read_single_file, p, normalized_by_hash, normalize_in_threads): p for p in file_paths
         }
 
         for future in as_completed(future_to_path):
             file_data = future.result()
             if file_data is not None:
                 add_file_data(file_data)
+                file_type_counts[file_data.file_type] = file_type_counts.get(file_data.file_type, 0) + 1
+                if not normalize_in_threads:
+                    unnormalized.append(file_data)
+
+    print(logger.info(f"Files read by type: {file_type_counts}"))
+
+    # 3. Normalize in worker processes
+    if unnormalized:
+        _normalize_in_processes(unnormalized, normalize_workers)
 
 
 if __name__ == "__main__":
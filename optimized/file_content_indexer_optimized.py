@@ -1,22 +1,30 @@
 import os
 import re
+from array import array
 from dataclasses import dataclass
+from itertools import accumulate
 from typing import Any, Dict, List, Tuple, Union, Optional
-from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import utils
+from optimized import assessment_reader_optimized, token_vocabulary
 
 
 WORD_RE = re.compile(r"\S+")
 
+# Offsets beyond this need 64-bit array slots
+_INT32_MAX = 2 ** 31 - 1
+
 
 @dataclass
 class FileIndex:
     source_obj: Any  # your FileData or similar
     text: str
-    tokens: List[Dict]
-    # Now stores 4-token anchors instead of 3-token trigrams
-    trigram_positions: Dict[Tuple[str, str, str, str], List[int]]
+    # Vocabulary ids of the normalized (lowercased) tokens, see token_vocabulary.VOCABULARY
+    token_ids: array
+    # Character span of each token in `text`
+    token_starts: array
+    token_ends: array
+    # Packed 4-token anchor key (token_vocabulary.pack_anchor) -> positions
+    trigram_positions: Dict[int, List[int]]
 
 
 @dataclass
@@ -36,56 +44,62 @@ def _ensure_text(value: Union[str, bytes]) -> str:
     return value
 
 
-def _tokenize_with_spans(text: str) -> List[Dict]:
+def _tokenize_with_spans(text: str) -> Tuple[List[str], array, array]:
     """
-    Tokenize using WORD_RE and record spans.
+    Tokenize using WORD_RE semantics and return (words, starts, ends).
+
+    Normalized text is single-space separated, so the common case splits
+    with str.split() and derives offsets from word lengths; anything else
+    falls back to WORD_RE.finditer.
     """
-    tokens: List[Dict] = []
-    append = tokens.append
-    finditer = WORD_RE.finditer
-    lower = str.lower
-
-    for m in finditer(text):
-        word = m.group(0)
-        append(
-            {
-                "word": word,
-                "norm": lower(word),
-                "start": m.start(),
-                "end": m.end(),
-            }
-        )
-    return tokens
+    words = text.split()
+    if not words:
+        return words, array("i"), array("i")
+
+    typecode = "i" if len(text) <= _INT32_MAX else "q"
+    lengths = list(map(len, words))
+
+    if sum(lengths) + len(words) - 1 == len(text):
+        # Exactly one separator char between words and none at the ends
+        starts = array(typecode, accumulate((n + 1 for n in lengths[:-1]), initial=0))
+        ends = array(typecode, map(int.__add__, starts, lengths))
+        return words, starts, ends
+
+    starts = array(typecode)
+    ends = array(typecode)
+    for m in WORD_RE.finditer(text):
+        starts.append(m.start())
+        ends.append(m.end())
+    return words, starts, ends
 
 
 def _build_anchor_positions(
-    tokens: List[Dict],
+    token_ids: array,
     anchor_size: int,
-) -> Dict[Tuple[str, ...], List[int]]:
+) -> Dict[int, List[int]]:
     """
-    Build anchor_size-gram index: (norm1, ..., normN) -> [positions].
+    Build anchor_size-gram index: packed anchor key -> [positions].
 
     With anchor_size=4, this becomes a 4-token anchor index.
     """
-    positions: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
-    if anchor_size <= 0 or len(tokens) < anchor_size:
-        return positions
-
-    norms = [t["norm"] for t in tokens]
-    n = len(norms)
-
-    if anchor_size == 4:
-        # Fast path for 4-token anchors
-        for i in range(n - 3):
-            anchor = (norms[i], norms[i + 1], norms[i + 2], norms[i + 3])
-            positions[anchor].append(i)
-    else:
-        # Generic N-gram fallback
-        for i in range(n - anchor_size + 1):
-            anchor = tuple(norms[i : i + anchor_size])
-            positions[anchor].append(i)
+    return token_vocabulary.pack_anchor_positions(token_ids, anchor_size)
 
-    return positions
+
+def build_index_from_text(obj: Any, text: str, anchor_size: int) -> FileIndex:
+    words, starts, ends = _tokenize_with_spans(text)
+    token_ids = token_vocabulary.VOCABULARY.intern_all([w.lower() for w in words])
+    anchor_positions = _build_anchor_positions(token_ids, anchor_size)
+
+    # Note: we keep the attribute name trigram_positions for compatibility,
+    # even though they are now 4-token anchors.
+    return FileIndex(
+        source_obj=obj,
+        text=text,
+        token_ids=token_ids,
+        token_starts=starts,
+        token_ends=ends,
+        trigram_positions=anchor_positions,  # 4-gram anchors
+    )
 
 
 def _build_single_file_index(obj: Any, anchor_size: int) -> FileIndex:
@@ -94,26 +108,17 @@ def _build_single_file_index(obj: Any, anchor_size: int) -> FileIndex:
     This is used as the worker for multithreading.
     """
 
-    # If you have pre-normalized text, reuse it:
-    # e.g. obj.normalized_text
-    text = getattr(obj, "normalized_text", None)
+    # Reuse the text the reader already cleaned and normalized (in its
+    # threads or worker processes)
+    text = getattr(obj, "file_content_normalized", None)
     if text is not None:
         text = _ensure_text(text)
     else:
+        # Cleaned and normalized like the reader does, chunk by chunk for long text
         raw = _ensure_text(obj.file_content)
-        text = utils.remove_punctuation_and_normalize_text(raw)
+        text = assessment_reader_optimized.clean_and_normalize_text(raw)
 
-    tokens = _tokenize_with_spans(text)
-    anchor_positions = _build_anchor_positions(tokens, anchor_size)
-
-    # Note: we keep the attribute name trigram_positions for compatibility,
-    # even though they are now 4-token anchors.
-    return FileIndex(
-        source_obj=obj,
-        text=text,
-        tokens=tokens,
-        trigram_positions=anchor_positions,  # 4-gram anchors
-    )
+    return build_index_from_text(obj, text, anchor_size)
 
 
 def build_file_indexes(
@@ -125,8 +130,9 @@ def build_file_indexes(
     Build FileIndex objects for all model_objects.
 
     Performance features:
-      - Reuses pre-normalized text if available (obj.normalized_text).
-      - Minimizes overhead in tokenization/anchor-building.
+      - Reuses pre-normalized text if available (obj.file_content_normalized).
+      - Tokens are interned to int ids in compact arrays, and anchors are
+        packed int keys instead of tuples of strings.
       - Uses ThreadPoolExecutor to parallelize indexing across files.
     """
     objs = list(model_objects)
@@ -0,0 +1,105 @@
+import re
+from functools import lru_cache
+from typing import Union
+import mmap
+
+
+FILE_TYPE_TEXT = "text"
+# Read as the printable strings in it
+FILE_TYPE_BINARY = "binary"
+# Known to carry no license text, not read at all
+FILE_TYPE_SKIPPED = "skipped"
+
+# Bytes of the start of a file looked at
+SNIFF_SIZE = 8192
+
+# Images and fonts
+_SKIPPED_MAGIC = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",          # JPEG
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",                    # BMP
+    b"\x00\x00\x01\x00",      # ICO
+    b"II*\x00",               # TIFF
+    b"MM\x00*",
+    b"wOFF",                  # WOFF
+    b"wOF2",
+    b"OTTO",                  # OpenType
+    b"\x00\x01\x00\x00\x00",  # TrueType
+    b"ttcf",
+)
+
+_SKIPPED_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".icns", ".tif", ".tiff", ".webp",
+    ".ttf", ".otf", ".ttc", ".woff", ".woff2", ".eot",
+})
+
+# Executables, libraries and bytecode
+_BINARY_MAGIC = (
+    b"\x7fELF",
+    b"MZ",                    # PE (.exe, .dll)
+    b"\xca\xfe\xba\xbe",      # Java class, Mach-O universal
+    b"\xfe\xed\xfa\xce",      # Mach-O
+    b"\xfe\xed\xfa\xcf",
+    b"\xce\xfa\xed\xfe",
+    b"\xcf\xfa\xed\xfe",
+    b"!<arch>\n",             # .a, .lib
+    b"dex\n",
+)
+
+_BINARY_EXTENSIONS = frozenset({
+    ".so", ".dll", ".exe", ".dylib", ".class", ".o", ".obj", ".a", ".lib", ".pyc", ".pyo", ".dex", ".bin",
+})
+
+# Text in UTF-16/32 has NUL bytes too
+_UNICODE_BOMS = (b"\xff\xfe", b"\xfe\xff", b"\xef\xbb\xbf")
+
+
+def classify_file(raw: Union[bytes, mmap.mmap], file_extension: str) -> str:
+    """
+    FILE_TYPE_TEXT, FILE_TYPE_BINARY or FILE_TYPE_SKIPPED for the raw
+    content of a file, from its magic bytes and extension. Anything else
+    with a NUL byte near the start is binary, and so is a binary extension
+    (e.g. '.so', '.class') that doesn't start with UTF-8 text.
+    """
+    head = bytes(raw[:SNIFF_SIZE])
+    looks_binary = b"\x00" in head and not head.startswith(_UNICODE_BOMS)
+    if _has_magic(head, _SKIPPED_MAGIC, looks_binary) or (file_extension in _SKIPPED_EXTENSIONS and looks_binary):
+        return FILE_TYPE_SKIPPED
+    if _has_magic(head, _BINARY_MAGIC, looks_binary) or looks_binary:
+        return FILE_TYPE_BINARY
+    if file_extension in _BINARY_EXTENSIONS and not _is_utf8(head):
+        return FILE_TYPE_BINARY
+    return FILE_TYPE_TEXT
+
+
+def _has_magic(head: bytes, magics, looks_binary: bool) -> bool:
+    for magic in magics:
+        if head.startswith(magic):
+            # Magic like 'MZ' or 'GIF89a' can also start a plain text file: only trusted with a NUL byte
+            if looks_binary or not magic.isalnum():
+                return True
+    return False
+
+
+def _is_utf8(head: bytes) -> bool:
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # The sniffed head may end inside a character
+        return e.reason == "unexpected end of data"
+    return True
+
+
+@lru_cache(maxsize=None)
+def _printable_run_re(min_length: int) -> re.Pattern:
+    return re.compile(rb"[\t\x20-\x7e]{%d,}" % min_length)
+
+
+def extract_printable_strings(raw: Union[bytes, mmap.mmap], min_length: int) -> str:
+    """
+    Runs of at least min_length printable ASCII characters in raw, one per
+    line, like the Unix `strings` tool.
+    """
+    return "\n".join(run.decode("ascii") for run in _printable_run_re(min_length).findall(raw))
@@ -1,9 +1,16 @@
 import utils
 from configuration import Configuration as Config
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from tools.file_content_indexer import FileIndex
+from array import array
+from optimized import token_vocabulary
+from optimized.file_content_indexer_optimized import FileIndex, WORD_RE
+from optimized.token_automaton import TokenAutomaton
+
+
+# Number of interior license tokens used as the automaton seed for each license
+SEED_SIZE = 8
 
 
 # licenses_normalized: Dict[Path, str] is already normalized text per license
@@ -21,16 +28,100 @@ def build_license_metadata(licenses_normalized: Dict[Path, str]) -> List[Tuple[s
     return result
 
 
-def search_assessment_files_for_full_licenses(license_metadata: List[Tuple[str, str]], file_indexes: List[FileIndex],):
+class FullLicenseMatcher:
+    """
+    Precompiled multi-pattern matcher over the normalized license corpus.
+
+    Normalized text is single-space separated, so any occurrence of a license
+    inside a file lines up with the file's tokens everywhere except the first
+    and last license token (those may be the tail/head of a longer file token).
+    Each license is therefore seeded in a TokenAutomaton by its first
+    SEED_SIZE *interior* tokens (as vocabulary ids, compared the same way
+    FileIndex.token_ids are). One pass over the file token ids yields every
+    seed hit, and each hit is confirmed with a single startswith() at the
+    implied character offset, which gives exactly the same answer as
+    `license_content in file_content`.
+
+    Licenses with fewer than three tokens have no interior seed and fall
+    back to the plain substring check.
+    """
+
+    def __init__(self, license_metadata: List[Tuple[str, str]], seed_size: int = SEED_SIZE):
+        self.license_metadata = license_metadata
+        self.automaton = TokenAutomaton()
+        # automaton pattern id -> license index in license_metadata
+        self._seed_license: List[int] = []
+        # automaton pattern id -> chars between license start and seed start
+        self._seed_lead: List[int] = []
+        self._short_licenses: List[int] = []
+
+        for license_idx, (_, license_content) in enumerate(license_metadata):
+            tokens = WORD_RE.findall(license_content)
+            if len(tokens) < 3:
+                self._short_licenses.append(license_idx)
+                continue
+
+            seed = tokens[1:min(len(tokens) - 1, seed_size + 1)]
+            self.automaton.add_pattern(token_vocabulary.VOCABULARY.intern_all([w.lower() for w in seed]))
+            self._seed_license.append(license_idx)
+            # first token plus the single separating space
+            self._seed_lead.append(len(tokens[0]) + 1)
+
+        self.automaton.build()
+
+    def find(self, file_text: str, token_ids: array, token_starts: array) -> List[int]:
+        """
+        Return the indexes (in license_metadata order) of every license whose
+        normalized text occurs in file_text.
+        """
+        if not file_text:
+            return []
+
+        license_metadata = self.license_metadata
+        seed_license = self._seed_license
+        seed_lead = self._seed_lead
+        pattern_lengths = self.automaton.pattern_lengths
+        startswith = file_text.startswith
+        found = set()
+
+        for end, pattern_id in self.automaton.iter_matches(token_ids):
+            license_idx = seed_license[pattern_id]
+            if license_idx in found:
+                continue
+
+            seed_start = end - pattern_lengths[pattern_id]
+            char_start = token_starts[seed_start] - seed_lead[pattern_id]
+            if char_start < 0:
+                continue
+
+            if startswith(license_metadata[license_idx][1], char_start):
+                found.add(license_idx)
+
+        for license_idx in self._short_licenses:
+            if license_metadata[license_idx][1] in file_text:
+                found.add(license_idx)
+
+        return sorted(found)
+
+
+def build_full_license_matcher(license_metadata: List[Tuple[str, str]]) -> FullLicenseMatcher:
+    return FullLicenseMatcher(license_metadata)
+
+
+def search_assessment_files_for_full_licenses(
+    license_metadata: List[Tuple[str, str]],
+    file_indexes: List[FileIndex],
+    matcher: Optional[FullLicenseMatcher] = None,
+):
     """
     Faster version:
       - Uses pre-indexed, normalized file text from FileIndex.text
       - Avoids re-normalizing file content in the hot loop
-      - Reuses precomputed license_metadata [(license_name, license_content)]
+      - Finds all licenses in one pass per file with a precompiled FullLicenseMatcher
+        instead of one substring scan per license
     """
-
-    # Optional: map file_data id -> FileIndex for quick lookup if needed elsewhere
-    # file_index_by_obj_id = {id(idx.source_obj): idx for idx in file_indexes}
+    if matcher is None:
+        matcher = build_full_license_matcher(license_metadata)
 
     for idx in file_indexes:
         file_data = idx.source_obj  # your FileData object
@@ -40,19 +131,12 @@ def search_assessment_files_for_full_licenses(license_metadata: List[Tuple[str,
         if not file_content:
             continue
 
-        # Simple length check can skip obviously impossible matches
-        content_len = len(file_content)
-
         license_matches = []
-        for license_name, license_content in license_metadata:
-            # Skip if license longer than file content
-            if len(license_content) > content_len:
-                continue
-
-            if license_content in file_content:
-                license_matches.append(
-                    {"License_name": license_name, "License_text": license_content}
-                )
+        for license_idx in matcher.find(file_content, idx.token_ids, idx.token_starts):
+            license_name, license_content = license_metadata[license_idx]
+            license_matches.append(
+                {"License_name": license_name, "License_text": license_content}
+            )
 
         if license_matches:
             file_data.license_match_strength = "EXACT"
@@ -2,10 +2,12 @@ from configuration import Configuration as Config
 import utils
 from input.keyword_strings import license_matches, general_matches, \
     custom_search_matches, license_name_matches, license_abbreviation_matches, license_url_matches
-from tools.file_content_indexer import FileIndex
+from optimized import token_vocabulary
+from optimized.file_content_indexer_optimized import FileIndex
+from optimized.token_automaton import TokenAutomaton
 import collections
 from dataclasses import dataclass
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Sequence
 
 
 ALL_MATCH_LISTS: Dict[str, List[str]] = {
@@ -27,6 +29,7 @@ class TermInfo:
     category: str
     norm: str         # normalized full string
     tokens: List[str] # normalized token list
+    token_ids: List[int]  # tokens interned in token_vocabulary.VOCABULARY
 
 
 # Global list of all terms, plus mapping from category -> [norms in original order]
@@ -57,6 +60,7 @@ def _build_term_index():
                 category=category,
                 norm=norm,
                 tokens=tokens,
+                token_ids=token_vocabulary.VOCABULARY.intern_all(tokens).tolist(),
             )
             ALL_TERMS.append(ti)
             TERMS_BY_CATEGORY[category].append(norm)
@@ -66,71 +70,73 @@ def _build_term_index():
 _build_term_index()
 
 
-def _get_token_texts(index: FileIndex) -> List[str]:
+class KeywordMatcher:
     """
-    Extract the normalized token text from FileIndex.tokens.
+    Precompiled matcher for the keyword terms of every category.
 
-    Adjust "norm" to whatever your token dict key is
-    (e.g., 'text', 'normalized', etc.).
+    All terms are token sequences in one TokenAutomaton (as vocabulary ids,
+    compared the same way FileIndex.token_ids are), so a single pass over a
+    file's tokens reports every hit of every category. Matches are the same
+    as comparing each term's tokens against the file's: whole tokens only.
+
+    Built once per keyword list and cached with the license corpus.
     """
-    return [t["norm"] for t in index.tokens]  # <-- change key if needed
 
+    def __init__(self, terms: Sequence[TermInfo]):
+        self.terms = list(terms)
+        self.automaton = TokenAutomaton()
+        for term in self.terms:
+            # Pattern id == position in self.terms
+            self.automaton.add_pattern(token_vocabulary.VOCABULARY.intern_all(term.tokens).tolist())
+        self.automaton.build()
 
-def _find_matches_in_index(index: FileIndex) -> Dict[str, List[str]]:
-    """
-    Given a FileIndex, return:
-        { category_name: [matched_normalized_terms_in_that_category] }
+    def find(self, token_ids: Sequence[int]) -> Dict[str, List[str]]:
+        """
+        { category_name: [matched_normalized_terms_in_that_category] }, each
+        category's terms in their keyword list order.
+        """
+        found = self.automaton.matched_patterns(token_ids)
 
-    Matching:
-    - Single-word terms: token-set membership.
-    - Multi-word terms: sliding-window token sequence comparison.
-    - No trigrams used.
-    """
-    if not index.tokens:
-        return {}
+        # Terms are grouped by category in ALL_MATCH_LISTS order, so sorted
+        # ids give categories and their terms in the original order
+        terms = self.terms
+        matches: Dict[str, List[str]] = {}
+        for pattern_id in sorted(found):
+            term = terms[pattern_id]
+            matches.setdefault(term.category, []).append(term.norm)
+        return matches
 
-    tokens = _get_token_texts(index)
-    token_count = len(tokens)
-    token_set: Set[str] = set(tokens)
 
-    found_by_category: Dict[str, Set[str]] = collections.defaultdict(set)
+def build_keyword_matcher() -> KeywordMatcher:
+    return KeywordMatcher(ALL_TERMS)
 
-    for term in ALL_TERMS:
-        L = len(term.tokens)
 
-        # --- Single-word term ---
-        if L == 1:
-            if term.tokens[0] in token_set:
-                found_by_category[term.category].add(term.norm)
-            continue
+_keyword_matcher: Optional[KeywordMatcher] = None
 
-        # --- Multi-word term (length >= 2): sliding-window search ---
-        first_tok = term.tokens[0]
 
-        # Quick skip: if the first token never appears, no match
-        if first_tok not in token_set:
-            continue
+def get_keyword_matcher() -> KeywordMatcher:
+    """The matcher over ALL_TERMS, built on first use."""
+    global _keyword_matcher
+    if _keyword_matcher is None:
+        _keyword_matcher = build_keyword_matcher()
+    return _keyword_matcher
 
-        # Scan tokens and compare slices
-        for i in range(token_count - L + 1):
-            if tokens[i] != first_tok:
-                continue
-            if tokens[i:i + L] == term.tokens:
-                found_by_category[term.category].add(term.norm)
-                break  # no need to keep checking this term in this file
 
-    # Build output preserving original per-category term order
-    matches: Dict[str, List[str]] = {}
-    for category, ordered_terms in TERMS_BY_CATEGORY.items():
-        found_set = found_by_category.get(category)
-        if not found_set:
-            continue
+def _find_matches_in_index(index: FileIndex, matcher: Optional[KeywordMatcher] = None) -> Dict[str, List[str]]:
+    """
+    Given a FileIndex, return:
+        { category_name: [matched_normalized_terms_in_that_category] }
 
-        ordered = [t for t in ordered_terms if t in found_set]
-        if ordered:
-            matches[category] = ordered
+    Matching runs every category's terms in one pass over the file's token
+    ids with `matcher` (default: the matcher over ALL_TERMS).
+    No trigrams used.
+    """
+    if not index.token_ids:
+        return {}
 
-    return matches
+    if matcher is None:
+        matcher = get_keyword_matcher()
+    return matcher.find(index.token_ids)
 
 
 # def search_all_assessment_files_for_keyword_matches():
@@ -140,10 +146,12 @@ def _find_matches_in_index(index: FileIndex) -> Dict[str, List[str]]:
 #         if file_matches:
 #             file_data.keyword_matches = file_matches
 
-def search_all_assessment_files_for_keyword_matches():
+def search_all_assessment_files_for_keyword_matches(matcher: Optional[KeywordMatcher] = None):
+    if matcher is None:
+        matcher = get_keyword_matcher()
     for idx in Config.file_indexes:
         print(f"Finding keyword matches for file: {idx.source_obj.file_path}")
-        matches = _find_matches_in_index(idx)
+        matches = _find_matches_in_index(idx, matcher)
         if matches:
             # assuming source_obj is your FileData instance
             idx.source_obj.keyword_matches = matches
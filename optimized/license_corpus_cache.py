@@ -0,0 +1,197 @@
+from configuration import Configuration as Config
+from optimized import full_license_search_optimized, keyword_search_optimized, token_vocabulary
+from optimized.full_license_search_optimized import FullLicenseMatcher
+from optimized.keyword_search_optimized import KeywordMatcher
+from tools import file_content_indexer
+from tools.file_content_indexer import AnchorPostings, PatternIndex
+import utils
+import hashlib
+import mmap
+import os
+import pickle
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# Bump whenever the cached structures or the way they are built change
+CORPUS_CACHE_VERSION = 2
+
+CORPUS_ANCHOR_SIZE = 4
+
+
+@dataclass
+class LicenseCorpus:
+    checksum: str
+    licenses_normalized: Dict[Path, str]
+    license_headers_normalized: Dict[Path, str]
+    # [(license_name, normalized_text)] for the full license search
+    license_metadata: List[Tuple[str, str]]
+    full_license_matcher: FullLicenseMatcher
+    # Token arrays, anchors and version metadata per header
+    license_header_indexes: List[PatternIndex]
+    license_header_postings: AnchorPostings
+    # Vocabulary the token ids above were interned in (id = position)
+    vocabulary_tokens: List[str]
+    # Keyword terms of every category, compiled for the keyword search
+    keyword_matcher: Optional[KeywordMatcher] = None
+
+
+def compute_corpus_checksum(license_dirs: List[Path]) -> str:
+    """
+    Checksum of every .txt file (relative path + content) under the license
+    directories and of the keyword terms, plus the cache format version and
+    build parameters, so any license or keyword edit or code change that
+    affects the corpus gives a new key.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{CORPUS_CACHE_VERSION}:a{CORPUS_ANCHOR_SIZE}:s{full_license_search_optimized.SEED_SIZE}".encode("utf-8"))
+    h.update(b"\0keywords\0")
+    for term in keyword_search_optimized.ALL_TERMS:
+        h.update(f"{term.category}\0{term.norm}\0".encode("utf-8"))
+
+    for base_dir in license_dirs:
+        base_dir = Path(base_dir)
+        h.update(b"\0dir\0")
+        h.update(base_dir.name.encode("utf-8"))
+        if not base_dir.is_dir():
+            continue
+
+        txt_files: List[Path] = []
+        for dirpath, dirnames, filenames in os.walk(base_dir):
+            for filename in filenames:
+                if filename.lower().endswith(".txt"):
+                    txt_files.append(Path(dirpath, filename))
+
+        for file_path in sorted(txt_files, key=lambda p: p.relative_to(base_dir).as_posix()):
+            h.update(b"\0file\0")
+            h.update(file_path.relative_to(base_dir).as_posix().encode("utf-8"))
+            h.update(b"\0")
+            with open(file_path, "rb") as f:
+                h.update(f.read())
+
+    return h.hexdigest()
+
+
+def build_license_corpus(checksum: str) -> LicenseCorpus:
+    licenses_normalized = utils.read_and_normalize_licenses(Config.all_licenses_dir)
+    license_headers_normalized = utils.read_and_normalize_licenses(Config.all_license_headers_dir)
+
+    license_metadata = full_license_search_optimized.build_license_metadata(licenses_normalized)
+    full_license_matcher = full_license_search_optimized.build_full_license_matcher(license_metadata)
+
+    license_header_indexes = file_content_indexer.build_pattern_indexes_from_dict(
+        license_headers_normalized, anchor_size=CORPUS_ANCHOR_SIZE
+    )
+    license_header_postings = file_content_indexer.build_anchor_postings(
+        license_header_indexes, anchor_size=CORPUS_ANCHOR_SIZE
+    )
+    # Before the vocabulary snapshot, which has to hold the keyword tokens too
+    keyword_matcher = keyword_search_optimized.build_keyword_matcher()
+
+    return LicenseCorpus(
+        checksum=checksum,
+        licenses_normalized=licenses_normalized,
+        license_headers_normalized=license_headers_normalized,
+        license_metadata=license_metadata,
+        full_license_matcher=full_license_matcher,
+        license_header_indexes=license_header_indexes,
+        license_header_postings=license_header_postings,
+        vocabulary_tokens=token_vocabulary.VOCABULARY.snapshot(),
+        keyword_matcher=keyword_matcher,
+    )
+
+
+def get_corpus_cache_path(checksum: str, cache_dir: Path = Config.data_dir) -> Path:
+    return Path(cache_dir, f"license_corpus_{checksum[:16]}.pkl")
+
+
+def save_license_corpus(corpus: LicenseCorpus, cache_dir: Path = Config.data_dir) -> Path:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = get_corpus_cache_path(corpus.checksum, cache_dir)
+
+    # Write to a temp file first so a crash never leaves a truncated cache behind
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(corpus, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_license_corpus(checksum: str, cache_dir: Path = Config.data_dir) -> Optional[LicenseCorpus]:
+    """
+    Load a cached corpus for `checksum` through a read-only mmap, or return
+    None if there is no usable cache entry.
+    """
+    path = get_corpus_cache_path(checksum, cache_dir)
+    if not path.is_file() or path.stat().st_size == 0:
+        return None
+
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            corpus = pickle.loads(mm)
+    except Exception as e:
+        print(f"Could not load license corpus cache {path}: {e}")
+        return None
+
+    if not isinstance(corpus, LicenseCorpus) or corpus.checksum != checksum:
+        return None
+
+    # Cached token ids are only valid if the live vocabulary agrees with them;
+    # if other ids were handed out first, translate the corpus instead
+    if not token_vocabulary.VOCABULARY.adopt(corpus.vocabulary_tokens):
+        _remap_corpus_to_vocabulary(corpus)
+
+    return corpus
+
+
+def _remap_corpus_to_vocabulary(corpus: LicenseCorpus) -> None:
+    """
+    Re-intern the corpus tokens in the live vocabulary and rewrite every
+    cached token id and anchor key to match. Only the (small) header indexes
+    and automaton transitions are touched, no license or keyword text is
+    re-normalized.
+    """
+    vocabulary = token_vocabulary.VOCABULARY
+    new_ids = vocabulary.intern_all(corpus.vocabulary_tokens)
+    mapping = dict(enumerate(new_ids))
+
+    for p_idx in corpus.license_header_indexes:
+        p_idx.token_ids = array("i", map(mapping.__getitem__, p_idx.token_ids))
+        if p_idx.anchor_positions:
+            p_idx.anchor_positions = dict(
+                token_vocabulary.pack_anchor_positions(p_idx.token_ids, corpus.license_header_postings.anchor_size)
+            )
+            p_idx.anchor_keys = set(p_idx.anchor_positions.keys())
+
+    corpus.license_header_postings = file_content_indexer.build_anchor_postings(
+        corpus.license_header_indexes, anchor_size=corpus.license_header_postings.anchor_size
+    )
+    corpus.full_license_matcher.automaton.remap_tokens(mapping)
+    if corpus.keyword_matcher is not None:
+        corpus.keyword_matcher.automaton.remap_tokens(mapping)
+    corpus.vocabulary_tokens = vocabulary.snapshot()
+
+
+def load_or_build_license_corpus(cache_dir: Path = Config.data_dir) -> LicenseCorpus:
+    """
+    Return the compiled license corpus, loading it from the cache in
+    cache_dir when the license directories are unchanged and compiling
+    (and caching) it otherwise.
+    """
+    checksum = compute_corpus_checksum(Config.all_licenses_dir + Config.all_license_headers_dir)
+
+    corpus = load_license_corpus(checksum, cache_dir)
+    if corpus is not None:
+        print(f"Loaded license corpus from cache: {get_corpus_cache_path(checksum, cache_dir)}")
+        return corpus
+
+    corpus = build_license_corpus(checksum)
+    path = save_license_corpus(corpus, cache_dir)
+    print(f"Saved license corpus cache: {path}")
+    return corpus
+
+
+if __name__ == "__main__":
+    load_or_build_license_corpus()
@@ -0,0 +1,180 @@
+import utils
+import re
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+# A word and the spaces/newlines after it, or the separators at the start of
+# the text. Normalizing the text piece by piece and joining the non-empty
+# results with one space gives the same text as normalizing it at once
+_PIECE_RE = re.compile(r'([^ \n]+)[ \n]*|[ \n]+')
+
+# Plain ASCII words one space apart, each a whole word: normalization only lowercases them
+_ASCII_WORDS_RE = re.compile(r'(?<![^ \n])[A-Za-z0-9]+(?: [A-Za-z0-9]+)*(?![^ \n])')
+
+# Ints per run in OffsetMap.runs
+RUN_SIZE = 5
+
+
+@dataclass
+class OffsetMap:
+    """
+    Run-length encoded map from positions in the normalized text
+    (FileIndex.text, MatchResult.start_index/end_index) back to the original
+    file. `runs` is a flat list of
+        norm_start, norm_end, byte_start, byte_end, line
+    per run, in order. A run whose normalized and original lengths are equal
+    maps position by position (words that only changed case, and the single
+    spaces between them); any other run is one word that normalization
+    rewrote and maps as a whole. Runs never cross a line; `line` is 1-based.
+
+    Byte offsets are into the decoded text re-encoded as UTF-8, which is the
+    file itself unless it had invalid UTF-8 that was dropped when decoding.
+    """
+    runs: array
+
+    def __len__(self) -> int:
+        return len(self.runs) // RUN_SIZE
+
+    def to_list(self) -> List[int]:
+        return self.runs.tolist()
+
+    def _run(self, i: int) -> Tuple[int, int, int, int, int]:
+        k = i * RUN_SIZE
+        return tuple(self.runs[k:k + RUN_SIZE])
+
+    def locate(self, start_index: int, end_index: int) -> Optional[Dict[str, int]]:
+        """Original byte span and lines of normalized text[start_index:end_index], None if empty."""
+        count = len(self)
+        if count == 0 or end_index <= start_index:
+            return None
+        norm_starts = self.runs[0::RUN_SIZE]
+
+        i = max(bisect_right(norm_starts, start_index) - 1, 0)
+        norm_start, norm_end, byte_start, byte_end, start_line = self._run(i)
+        if start_index >= norm_end and i + 1 < count:
+            # The space between two runs: start at the next one
+            norm_start, norm_end, byte_start, byte_end, start_line = self._run(i + 1)
+            start_byte = byte_start
+        elif norm_end - norm_start == byte_end - byte_start:
+            start_byte = byte_start + max(start_index - norm_start, 0)
+        else:
+            start_byte = byte_start
+
+        j = max(bisect_right(norm_starts, end_index - 1) - 1, 0)
+        norm_start, norm_end, byte_start, byte_end, end_line = self._run(j)
+        if end_index < norm_end and norm_end - norm_start == byte_end - byte_start:
+            end_byte = byte_start + (end_index - norm_start)
+        else:
+            end_byte = byte_end
+
+        return {
+            "start_byte": start_byte,
+            "end_byte": max(end_byte, start_byte),
+            "start_line": start_line,
+            "end_line": max(end_line, start_line),
+        }
+
+
+class _OffsetMapBuilder:
+    def __init__(self):
+        self.norm_parts: List[str] = []
+        # Char offsets until the end, flat like OffsetMap.runs
+        self.runs: List[int] = []
+        self.norm_pos = -1
+        self.line = 1
+        self.last_exact = False
+
+    def add(self, norm: str, orig_start: int, orig_end: int, exact: bool) -> None:
+        runs = self.runs
+        # One space before every word but the first
+        norm_start = self.norm_pos + 1
+        norm_end = norm_start + len(norm)
+        if exact and self.last_exact and runs[-1] == self.line and orig_start - runs[-2] == 1:
+            # One space apart in both texts: extend the run
+            runs[-4] = norm_end
+            runs[-2] = orig_end
+        else:
+            runs.extend((norm_start, norm_end, orig_start, orig_end, self.line))
+        self.norm_parts.append(norm)
+        self.norm_pos = norm_end
+        self.last_exact = exact
+
+    def add_words(self, text: str, start: int, end: int) -> None:
+        """Normalize text[start:end] one word at a time."""
+        normalize = utils.remove_punctuation_and_normalize_text
+        for m in _PIECE_RE.finditer(text, start, end):
+            word = m.group(1)
+            if word is not None:
+                norm = normalize(word)
+                if norm:
+                    k = word.lower().find(norm) if word.isascii() else -1
+                    if k >= 0:
+                        # e.g. 'License.' or '(c)': the normalized word is still in there
+                        self.add(norm, m.start() + k, m.start() + k + len(norm), True)
+                    else:
+                        self.add(norm, m.start(), m.end(1), False)
+            newlines = m.group().count("\n")
+            if newlines:
+                self.line += newlines
+
+
+def build_offset_map(text: str, stop_at: Optional[int] = None) -> Tuple[OffsetMap, str]:
+    """
+    Normalize `text` with utils.remove_punctuation_and_normalize_text and
+    record where each normalized word came from. Returns the map and the
+    normalized text, which equals normalizing the text at once.
+
+    Runs of plain ASCII words (letters and digits, one space apart) are
+    taken as they are, so only the words in between go through the
+    normalizer, one at a time.
+
+    With stop_at, only the start of the text is mapped, up to at least
+    normalized position stop_at; the normalized text returned is that
+    prefix of the whole normalized text.
+    """
+    builder = _OffsetMapBuilder()
+
+    gap_start = 0
+    for span in _ASCII_WORDS_RE.finditer(text):
+        span_start = span.start()
+        if span_start > gap_start:
+            builder.add_words(text, gap_start, span_start)
+        builder.add(span.group().lower(), span_start, span.end(), True)
+        gap_start = span.end()
+        if stop_at is not None and builder.norm_pos >= stop_at:
+            break
+    else:
+        builder.add_words(text, gap_start, len(text))
+
+    runs = builder.runs
+    if not text.isascii():
+        _chars_to_bytes(text, runs)
+
+    return OffsetMap(array("q", runs)), " ".join(builder.norm_parts)
+
+
+def locate_in_text(text: str, start_index: int, end_index: int,
+                   expected: Optional[str] = None) -> Optional[Dict[str, int]]:
+    """
+    Original byte span and lines of normalized text[start_index:end_index]
+    (see OffsetMap.locate), mapping `text` only as far as end_index. None if
+    the span is empty or, given `expected`, the normalized span isn't it.
+    """
+    text_map, normalized = build_offset_map(text, stop_at=end_index)
+    if expected is not None and normalized[start_index:end_index] != expected:
+        return None
+    return text_map.locate(start_index, end_index)
+
+
+def _chars_to_bytes(text: str, runs: List[int]) -> None:
+    """Turn the ascending char offsets of `runs` into UTF-8 byte offsets, in place."""
+    char_pos = 0
+    byte_pos = 0
+    for k in range(0, len(runs), RUN_SIZE):
+        for o in (k + 2, k + 3):
+            byte_pos += len(text[char_pos:runs[o]].encode("utf-8", errors="ignore"))
+            char_pos = runs[o]
+            runs[o] = byte_pos
@@ -0,0 +1,122 @@
+from configuration import Configuration as Config
+from models.FileData import FileData
+import mmap
+import re
+from typing import Iterable, List, Tuple, Union
+
+
+SPDX_TAG_MATCH_STRENGTH = "SPDX-TAG"
+
+_SPDX_TAG = b"SPDX-License-Identifier:"
+
+# The rest of the line after a tag
+_SPDX_TAG_RE = re.compile(re.escape(_SPDX_TAG) + rb"[ \t]*([^\r\n]*)")
+
+# Parentheses, or anything up to whitespace or a parenthesis
+_EXPRESSION_TOKEN_RE = re.compile(r"[()]|[^\s()]+")
+
+_OPERATORS = {"AND", "OR", "WITH"}
+
+# License and exception ids, LicenseRef-/DocumentRef- included, with an optional '+'
+_LICENSE_ID_RE = re.compile(r"(?:DocumentRef-[A-Za-z0-9.-]+:)?[A-Za-z0-9][A-Za-z0-9.-]*\+?")
+
+
+def scan_spdx_license_expressions(raw: Union[bytes, mmap.mmap]) -> List[str]:
+    """
+    SPDX license expressions of every SPDX-License-Identifier tag in the raw
+    content of a file, in order and without repeats. Whatever follows an
+    expression on its line, e.g. a comment terminator, is left out.
+    """
+    if raw.find(_SPDX_TAG) < 0:
+        return []
+
+    expressions: List[str] = []
+    for m in _SPDX_TAG_RE.finditer(raw):
+        expression = _parse_expression(m.group(1).decode("ascii", errors="ignore"))
+        if expression and expression not in expressions:
+            expressions.append(expression)
+    return expressions
+
+
+def _parse_expression(value: str) -> str:
+    """
+    The leading well-formed part of an SPDX expression, with single spaces
+    between tokens; '' if it has no license id.
+    """
+    tokens: List[str] = []
+    depth = 0
+    has_id = False
+    for token in _EXPRESSION_TOKEN_RE.findall(value):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            if depth == 0:
+                break
+            depth -= 1
+        elif token.upper() in _OPERATORS:
+            token = token.upper()
+        else:
+            # An id may run into a comment terminator, e.g. 'MIT-->' or 'MIT*/'
+            m = _LICENSE_ID_RE.match(token)
+            license_id = m.group().rstrip(".-") if m else ""
+            if not license_id:
+                break
+            tokens.append(license_id)
+            has_id = True
+            if m.end() < len(token):
+                break
+            continue
+        tokens.append(token)
+
+    # Drop a dangling operator or opening parenthesis left by a cut
+    while tokens and (tokens[-1] in _OPERATORS or tokens[-1] == "("):
+        if tokens.pop() == "(":
+            depth -= 1
+    if not has_id or depth:
+        return ""
+    return " ".join(tokens).replace("( ", "(").replace(" )", ")")
+
+
+def get_license_names(expression: str) -> List[str]:
+    """
+    License names in an SPDX expression: every license id, an id with an
+    exception as '<id> WITH <exception>'.
+    """
+    tokens = [token for token in _EXPRESSION_TOKEN_RE.findall(expression) if token not in ("(", ")")]
+    names: List[str] = []
+    for i, token in enumerate(tokens):
+        if token in _OPERATORS:
+            continue
+        if i > 0 and tokens[i - 1] == "WITH" and names:
+            names[-1] = f"{names[-1]} WITH {token}"
+        else:
+            names.append(token)
+    return names
+
+
+def search_assessment_files_for_spdx_tags(file_data_list: Iterable[FileData]) -> Tuple[int, int]:
+    """
+    Adds the licenses named by each file's SPDX-License-Identifier tags (found
+    by the reader) to its license names, with match strength SPDX-TAG.
+    Returns (files with tags, of those skipping the fuzzy header search).
+    """
+    tagged_count = 0
+    fuzzy_skipped_count = 0
+    for file_data in file_data_list:
+        if not file_data.spdx_license_expressions:
+            continue
+        tagged_count += 1
+        for expression in file_data.spdx_license_expressions:
+            for name in get_license_names(expression):
+                if name not in file_data.license_names:
+                    file_data.license_names.append(name)
+        if file_data.license_match_strength is None:
+            file_data.license_match_strength = SPDX_TAG_MATCH_STRENGTH
+        if skips_fuzzy_search(file_data):
+            fuzzy_skipped_count += 1
+    return tagged_count, fuzzy_skipped_count
+
+
+def skips_fuzzy_search(file_data: FileData) -> bool:
+    """True if the fuzzy header search is skipped for file_data for its SPDX tag (SPDX_TAG_SKIPS_FUZZY)."""
+    return Config.spdx_tag_skips_fuzzy and bool(file_data.spdx_license_expressions)
@@ -0,0 +1,188 @@
+from configuration import Configuration as Config
+from models.FileData import FileData, compress_to_b64
+from optimized import assessment_reader_optimized, file_content_indexer_optimized, full_license_search_optimized, \
+    keyword_search_optimized, license_corpus_cache, spdx_tag_scanner
+from optimized import analysis_result_cache
+from optimized.analysis_result_cache import AnalysisResultCache
+from optimized.license_corpus_cache import LicenseCorpus
+from search import fuzzy_license_search
+from tools import fuzzy_matches_evaluator
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+
+# Files in flight per worker; bounds the texts and indexes held to a few per worker
+STREAMING_QUEUE_DEPTH = 2
+
+
+def check_streaming_options() -> None:
+    """
+    Raises ValueError if options the streaming pipeline does not support are
+    set: SCAN_ARCHIVES_IN_PLACE (it reads the extracted assessment), and a
+    diff file data or incremental assessment (both compare whole assessments).
+    """
+    unsupported: List[str] = []
+    if Config.scan_archives_in_place:
+        unsupported.append("SCAN_ARCHIVES_IN_PLACE")
+    if Config.diff_file_data or Config.incremental_assessment:
+        unsupported.append("diff file data / incremental assessment")
+    if unsupported:
+        raise ValueError(f"STREAMING_PIPELINE can't be combined with: {', '.join(unsupported)}")
+
+
+def analyze_single_file(file_path: Path, license_corpus: LicenseCorpus,
+                        results_by_hash: Optional[Dict[str, dict]] = None,
+                        analysis_cache: Optional[AnalysisResultCache] = None) -> Optional[FileData]:
+    """
+    Take one file through read -> normalize -> index -> SPDX tag/full/fuzzy/keyword
+    search -> result record. The returned FileData keeps only the compressed
+    content for the JSON output; the text and index are dropped.
+
+    If `results_by_hash` is given, content that was already analyzed copies
+    those results instead of being searched again; only the results (see
+    analysis_result_cache.results_to_dict) are kept there, not the file. If `analysis_cache` is
+    given, content analyzed in earlier runs takes its results from there,
+    and new results are stored in it. Either way such content is never
+    normalized; otherwise it is normalized once, by the indexer.
+    """
+    file_data = assessment_reader_optimized._read_single_file(file_path, normalize=False)
+    if file_data is None:
+        return None
+
+    analyzed = results_by_hash.get(file_data.file_hash) if results_by_hash is not None else None
+    if analyzed is not None:
+        analysis_result_cache.apply_results(file_data, analyzed)
+    elif analysis_cache is not None and not analysis_cache.fill_cached_results([file_data]):
+        if results_by_hash is not None and file_data.file_hash:
+            results_by_hash[file_data.file_hash] = analysis_result_cache.results_to_dict(file_data)
+    else:
+        f_idx = file_content_indexer_optimized._build_single_file_index(file_data, anchor_size=4)
+
+        spdx_tag_scanner.search_assessment_files_for_spdx_tags([file_data])
+        full_license_search_optimized.search_assessment_files_for_full_licenses(
+            license_corpus.license_metadata, [f_idx], license_corpus.full_license_matcher
+        )
+        if f_idx.token_ids and not spdx_tag_scanner.skips_fuzzy_search(file_data):
+            fuzzy_license_search.fuzzy_match_file_index(f_idx, license_corpus.license_header_postings)
+        fuzzy_matches_evaluator.determine_best_fuzzy_matches_from_file_data([file_data])
+
+        matches = keyword_search_optimized._find_matches_in_index(f_idx, license_corpus.keyword_matcher)
+        if matches:
+            file_data.keyword_matches = matches
+
+        if analysis_cache is not None:
+            analysis_cache.store([file_data])
+        if results_by_hash is not None and file_data.file_hash:
+            results_by_hash[file_data.file_hash] = analysis_result_cache.results_to_dict(file_data)
+
+    # Drop the content, keep what the JSON output needs
+    is_text = isinstance(file_data.file_content, str)
+    file_data.file_content_b64 = compress_to_b64(file_data.file_content)
+    file_data.file_content = "" if is_text else b""
+    file_data.file_content_normalized = None
+    return file_data
+
+
+# ---------- Process pool ----------
+
+# License corpus, analysis cache connection and per-worker results of already analyzed content
+_worker_license_corpus: Optional[LicenseCorpus] = None
+_worker_analysis_cache: Optional[AnalysisResultCache] = None
+_worker_results_by_hash: Dict[str, dict] = {}
+
+
+def _init_streaming_worker(cache_dir: Path, analysis_cache_path: Optional[Path], engine_version: Optional[str]) -> None:
+    global _worker_license_corpus, _worker_analysis_cache
+    # The parent built the corpus cache already, so this is a cheap load
+    _worker_license_corpus = license_corpus_cache.load_or_build_license_corpus(cache_dir)
+    if analysis_cache_path is not None:
+        # Each worker has its own connection to the parent's cache
+        _worker_analysis_cache = AnalysisResultCache(_worker_license_corpus.checksum, analysis_cache_path, engine_version)
+
+
+def _analyze_single_file_in_worker(file_path: Path) -> Optional[FileData]:
+    return analyze_single_file(file_path, _worker_license_corpus, _worker_results_by_hash, _worker_analysis_cache)
+
+
+def _analyze_in_processes(file_paths: Iterable[Path], max_workers: int,
+                          analysis_cache: Optional[AnalysisResultCache] = None) -> int:
+    add_file_data = Config.file_data_manager.add_file_data
+    max_pending = max_workers * STREAMING_QUEUE_DEPTH
+    pending: Set[Future] = set()
+    count = 0
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_streaming_worker,
+        initargs=(Config.data_dir,
+                  analysis_cache.path if analysis_cache is not None else None,
+                  analysis_cache.engine_version if analysis_cache is not None else None),
+    ) as executor:
+        for file_path in file_paths:
+            # Only submit more work once results come back, so unread files stay on disk
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_data = future.result()
+                    if file_data is not None:
+                        add_file_data(file_data)
+                        count += 1
+            pending.add(executor.submit(_analyze_single_file_in_worker, file_path))
+
+        for future in wait(pending).done:
+            file_data = future.result()
+            if file_data is not None:
+                add_file_data(file_data)
+                count += 1
+
+    return count
+
+
+def run_streaming_assessment(root_dir, license_corpus: LicenseCorpus, max_workers: Optional[int] = None,
+                             analysis_cache: Optional[AnalysisResultCache] = None) -> int:
+    """
+    Streaming alternative to reading the whole assessment, indexing it and
+    running each search stage over the full list. Every file is analyzed end
+    to end and only its result record is kept in Config.file_data_manager.
+
+    Texts and indexes are only held for the files in flight, a few per
+    worker (STREAMING_QUEUE_DEPTH). What still grows with the assessment:
+      - one result record per file in this process, with the compressed
+        content the JSON output needs
+      - the search results (no content) of each unique content in each
+        worker (or in this process), to copy onto duplicates
+      - the token vocabulary of each process, one entry per distinct token
+
+    max_workers (default Config.streaming_pipeline_workers):
+      - 1: analyze in this process
+      - >1: that many worker processes
+      - 0 or less: one worker process per CPU
+
+    With `analysis_cache`, results of content analyzed in earlier runs are
+    reused and new ones stored (each worker opens its own connection).
+
+    Returns the number of files analyzed.
+    """
+    if max_workers is None:
+        max_workers = Config.streaming_pipeline_workers
+    if max_workers <= 0:
+        max_workers = os.cpu_count() or 1
+
+    file_paths = assessment_reader_optimized.collect_assessment_file_paths(root_dir)
+
+    if max_workers > 1 and len(file_paths) > 1:
+        print(f"Streaming {len(file_paths)} files through {max_workers} worker processes")
+        return _analyze_in_processes(file_paths, max_workers, analysis_cache)
+
+    add_file_data = Config.file_data_manager.add_file_data
+    results_by_hash: Dict[str, dict] = {}
+    count = 0
+    for file_path in file_paths:
+        print(f"Analyzing file: {file_path}")
+        file_data = analyze_single_file(file_path, license_corpus, results_by_hash, analysis_cache)
+        if file_data is not None:
+            add_file_data(file_data)
+            count += 1
+    return count
@@ -0,0 +1,148 @@
+from collections import deque
+from typing import Dict, Hashable, Iterable, Iterator, List, Sequence, Set, Tuple
+
+
+class TokenAutomaton:
+    """
+    Aho-Corasick automaton over token sequences.
+
+    Patterns are sequences of hashable tokens (normalized words, or interned
+    token ids). After build() the automaton reports every occurrence of every
+    pattern in a single left-to-right pass over a token stream.
+
+    The automaton only holds plain lists/dicts so it can be pickled and
+    reused across runs.
+    """
+
+    def __init__(self):
+        # goto[state] -> {token: next_state}; state 0 is the root
+        self._goto: List[Dict[Hashable, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Pattern ids that end at each state (fail-link outputs merged in by build())
+        self._out: List[Tuple[int, ...]] = [()]
+        self.pattern_lengths: List[int] = []
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self.pattern_lengths)
+
+    def add_pattern(self, tokens: Sequence[Hashable]) -> int:
+        """
+        Add a token sequence and return its pattern id.
+        Empty sequences are rejected since they would match everywhere.
+        """
+        if not tokens:
+            raise ValueError("Cannot add an empty pattern to TokenAutomaton")
+        if self._built:
+            raise ValueError("Cannot add patterns after TokenAutomaton.build()")
+
+        goto = self._goto
+        state = 0
+        for tok in tokens:
+            nxt = goto[state].get(tok)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][tok] = nxt
+                goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+
+        pattern_id = len(self.pattern_lengths)
+        self.pattern_lengths.append(len(tokens))
+        self._out[state] = self._out[state] + (pattern_id,)
+        return pattern_id
+
+    def build(self) -> "TokenAutomaton":
+        """
+        Compute failure links breadth-first and merge outputs along them.
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        queue = deque()
+        for nxt in goto[0].values():
+            fail[nxt] = 0
+            queue.append(nxt)
+
+        while queue:
+            state = queue.popleft()
+            for tok, nxt in goto[state].items():
+                queue.append(nxt)
+
+                f = fail[state]
+                while f and tok not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(tok, 0)
+                fail[nxt] = f
+
+                if out[f]:
+                    out[nxt] = out[nxt] + out[f]
+
+        self._built = True
+        return self
+
+    def remap_tokens(self, mapping: Dict[Hashable, Hashable]) -> None:
+        """
+        Replace every transition token t with mapping[t], e.g. to move token
+        ids into a different vocabulary. The mapping must be one-to-one.
+        """
+        self._goto = [{mapping[tok]: nxt for tok, nxt in edges.items()} for edges in self._goto]
+
+    def iter_matches(self, tokens: Iterable[Hashable]) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (end, pattern_id) for every pattern occurrence in `tokens`,
+        where `end` is the exclusive token index of the match end, so the
+        match covers tokens[end - pattern_lengths[pattern_id]:end].
+        """
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        root = goto[0]
+
+        state = 0
+        for i, tok in enumerate(tokens):
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0) if state else root.get(tok, 0)
+
+            if out[state]:
+                end = i + 1
+                for pattern_id in out[state]:
+                    yield end, pattern_id
+
+    def matched_patterns(self, tokens: Iterable[Hashable]) -> Set[int]:
+        """
+        Ids of every pattern that occurs in `tokens`, for when only presence
+        matters: the outputs of each state are collected once, however often
+        it is reached.
+        """
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        root = goto[0]
+
+        found: Set[int] = set()
+        seen_states: Set[int] = set()
+        state = 0
+        for tok in tokens:
+            if state:
+                while state and tok not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(tok, 0) if state else root.get(tok, 0)
+            else:
+                state = root.get(tok, 0)
+                if not state:
+                    continue
+
+            if out[state] and state not in seen_states:
+                seen_states.add(state)
+                found.update(out[state])
+        return found
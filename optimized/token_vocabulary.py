@@ -0,0 +1,154 @@
+import threading
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+# Ids up to this value fit a 16-bit lane, so a 4-token anchor packs into 64 bits
+_NARROW_ID_MAX = 0xFFFF
+
+
+class TokenVocabulary:
+    """
+    Shared mapping of normalized tokens <-> int ids.
+
+    Interning is thread safe (indexing runs in a ThreadPoolExecutor); lookups
+    of known tokens take no lock.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._tokens: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __getstate__(self):
+        return {"tokens": self._tokens}
+
+    def __setstate__(self, state):
+        self._tokens = list(state["tokens"])
+        self._ids = {tok: i for i, tok in enumerate(self._tokens)}
+        self._lock = threading.Lock()
+
+    def _add(self, token: str) -> int:
+        # Caller must hold self._lock
+        token_id = self._ids.get(token)
+        if token_id is None:
+            token_id = len(self._tokens)
+            self._tokens.append(token)
+            self._ids[token] = token_id
+        return token_id
+
+    def intern(self, token: str) -> int:
+        token_id = self._ids.get(token)
+        if token_id is not None:
+            return token_id
+        with self._lock:
+            return self._add(token)
+
+    def intern_all(self, tokens: Sequence[str]) -> array:
+        """
+        Return an array('i') of ids for `tokens`, adding unseen tokens.
+        """
+        ids = list(map(self._ids.get, tokens))
+        if None in ids:
+            with self._lock:
+                for k, token_id in enumerate(ids):
+                    if token_id is None:
+                        ids[k] = self._add(tokens[k])
+        return array("i", ids)
+
+    def lookup(self, token: str) -> Optional[int]:
+        """Return the id of `token` without adding it, or None if unseen."""
+        return self._ids.get(token)
+
+    def token(self, token_id: int) -> str:
+        return self._tokens[token_id]
+
+    def snapshot(self) -> List[str]:
+        """Return the tokens in id order (id = position)."""
+        with self._lock:
+            return list(self._tokens)
+
+    def adopt(self, tokens: Sequence[str]) -> bool:
+        """
+        Extend this vocabulary to `tokens` (id = position) if every token
+        interned so far already has the same id there, and return True.
+        Returns False, leaving the vocabulary untouched, if ids disagree.
+
+        Used when restoring indexes whose token ids were persisted with
+        their vocabulary, without invalidating ids handed out earlier.
+        """
+        with self._lock:
+            current = self._tokens
+            if len(current) > len(tokens) or current != list(tokens[:len(current)]):
+                return False
+            for token in tokens[len(current):]:
+                self._ids[token] = len(current)
+                current.append(token)
+            return True
+
+    def load(self, tokens: Iterable[str]) -> None:
+        """
+        Reset the vocabulary to `tokens` (id = position), e.g. when restoring
+        ids that were persisted alongside other indexes.
+        """
+        with self._lock:
+            self._tokens = list(tokens)
+            self._ids = {tok: i for i, tok in enumerate(self._tokens)}
+
+
+# Process-wide vocabulary shared by file, license and keyword indexes
+VOCABULARY = TokenVocabulary()
+
+
+def pack_anchor(ids: Sequence[int]) -> int:
+    """
+    Pack a run of token ids into one int anchor key.
+
+    Ids are packed into 16-bit lanes, so a 4-token anchor of ids below 65536
+    (the license corpus vocabulary) is a 64-bit key. If any id is wider, all
+    lanes are 32 bits and a flag bit above them keeps wide keys from ever
+    colliding with narrow ones.
+    """
+    if max(ids) <= _NARROW_ID_MAX:
+        shift = 16
+        key = 0
+    else:
+        shift = 32
+        key = 1
+    for token_id in ids:
+        key = (key << shift) | token_id
+    return key
+
+
+def unpack_anchor(key: int, anchor_size: int) -> List[int]:
+    """The token ids pack_anchor packed into `key`, for an anchor of anchor_size tokens."""
+    # A wide key has its flag bit above the 32-bit lanes
+    shift = 32 if key >> (32 * anchor_size) else 16
+    mask = (1 << shift) - 1
+    return [(key >> (shift * (anchor_size - 1 - k))) & mask for k in range(anchor_size)]
+
+
+def pack_anchor_positions(token_ids: Sequence[int], anchor_size: int) -> Dict[int, List[int]]:
+    """
+    Build {packed anchor key: [positions]} for every anchor_size-token window.
+    """
+    positions: Dict[int, List[int]] = defaultdict(list)
+    n = len(token_ids)
+    if anchor_size <= 0 or n < anchor_size:
+        return positions
+
+    if anchor_size == 4 and max(token_ids) <= _NARROW_ID_MAX:
+        # Fast path: every window packs into 64 bits
+        ids = token_ids.tolist() if isinstance(token_ids, array) else list(token_ids)
+        for i, (a, b, c, d) in enumerate(zip(ids, ids[1:], ids[2:], ids[3:])):
+            positions[(a << 48) | (b << 32) | (c << 16) | d].append(i)
+    else:
+        # Generic fallback
+        for i in range(n - anchor_size + 1):
+            positions[pack_anchor(token_ids[i:i + anchor_size])].append(i)
+
+    return positions
@@ -76,6 +76,18 @@ def print_empty_files(file_path="output/empty_files.txt"):
     print(f"{'Total empty files: '}{file_is_empty_count}")
 
 
+def print_fuzzy_windowed_files(file_path="output/fuzzy_windowed_files.txt"):
+    """Files the fuzzy header search only looked at the head and tail of (FUZZY_HEADER_WINDOW)."""
+    fuzzy_windowed_count = 0
+    with tee_stdout(Path(Config.root_dir) / file_path):
+        for file_data in Config.file_data_manager.get_all_file_data():
+            if file_data.fuzzy_search_windowed:
+                print(f"{'File: '}{Path(file_data.file_path).relative_to(Config.dest_dir)}")
+                fuzzy_windowed_count += 1
+
+    print(f"{'Total fuzzy header search windowed files: '}{fuzzy_windowed_count}")
+
+
 # def print_files_with_fuzzy_license_matches(file_path="output/fuzzy_license_matches.txt"):
 #     sorted_list = sorted(
 #         Config.file_data_manager.get_all_file_data(),
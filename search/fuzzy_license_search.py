@@ -1,18 +1,37 @@
 from configuration import Configuration as Config
 from models.FileData import FileDataManager
+from optimized import file_content_indexer_optimized, spdx_tag_scanner
 from tools import file_content_indexer
-from tools.file_content_indexer import FileIndex, PatternIndex, MatchResult
+from optimized.file_content_indexer_optimized import FileIndex
+from tools.file_content_indexer import PatternIndex, MatchResult, AnchorPostings
 import utils
+import os
 import re
-from typing import Dict, List, Tuple, Optional
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Set, Tuple, Optional
+
+
+# Fuzzy matches at or below this percent are discarded
+MIN_MATCH_PERCENT = 50.0
+
+# Upper bound on files per task sent to a fuzzy search worker process
+FUZZY_SHARD_SIZE = 256
+
+# Files named like this are license texts, always searched in full under FUZZY_HEADER_WINDOW
+_FULL_TEXT_NAME_RE = re.compile(r"^(?:licen[cs]e|copying|copyright|notice|unlicense|patents|legal)", re.IGNORECASE)
 
 
 def _align_with_gaps(
-    file_tokens: List[Dict],
-    pattern_tokens: List[str],
+    file_tokens: Sequence[int],
+    pattern_tokens: Sequence[int],
     fi_start: int,
     pj_start: int,
     gap_lookahead: int = 5,
+    matched_pairs: Optional[Set[Tuple[int, int]]] = None,
+    min_extra_matches: int = -1,
 ) -> Tuple[int, int]:
     """
     Greedy alignment that allows small insertions/deletions on either side.
@@ -23,6 +42,12 @@ def _align_with_gaps(
     - extra_matches: number of matches *after* the starting indices
     - last_match_file_idx: index in file_tokens of the last matched word
                            (or fi_start-1 if none matched).
+
+    If matched_pairs is given, every matched (file_idx, pattern_idx) pair
+    is added to it.
+
+    The alignment gives up early once extra_matches can no longer exceed
+    min_extra_matches, even if every remaining token matched.
     """
     n_file = len(file_tokens)
     n_pattern = len(pattern_tokens)
@@ -33,18 +58,24 @@ def _align_with_gaps(
     last_match_file_idx = fi_start - 1
 
     while fi < n_file and pj < n_pattern:
-        if file_tokens[fi]["norm"] == pattern_tokens[pj]:
+        if file_tokens[fi] == pattern_tokens[pj]:
             matches += 1
             last_match_file_idx = fi
+            if matched_pairs is not None:
+                matched_pairs.add((fi, pj))
             fi += 1
             pj += 1
         else:
+            # Bound: at best every remaining token still matches
+            if matches + min(n_file - fi, n_pattern - pj) <= min_extra_matches:
+                break
+
             # Try to re-sync by looking ahead in file for pattern_tokens[pj]
             found_in_file = None
             for k in range(1, gap_lookahead + 1):
                 if fi + k >= n_file:
                     break
-                if file_tokens[fi + k]["norm"] == pattern_tokens[pj]:
+                if file_tokens[fi + k] == pattern_tokens[pj]:
                     found_in_file = fi + k
                     break
 
@@ -53,7 +84,7 @@ def _align_with_gaps(
             for k in range(1, gap_lookahead + 1):
                 if pj + k >= n_pattern:
                     break
-                if pattern_tokens[pj + k] == file_tokens[fi]["norm"]:
+                if pattern_tokens[pj + k] == file_tokens[fi]:
                     found_in_pattern = pj + k
                     break
 
@@ -79,62 +110,130 @@ def best_match_indexed(
     p: PatternIndex,
     anchor_size: int = 3,
     gap_lookahead: int = 5,
+    common_anchors: Optional[Iterable[int]] = None,
+    min_match_percent: float = 0.0,
 ) -> Optional[MatchResult]:
-    file_tokens = f.tokens
-    pattern_tokens = p.tokens
+    """
+    Best gapped alignment of pattern `p` inside file `f`, seeded from the
+    anchors they share. `common_anchors` can be passed in when the caller
+    already knows them (e.g. from AnchorPostings) to skip the set intersection.
+
+    Only results with match_percent > min_match_percent are returned. Seeds
+    (and whole file/pattern pairs) whose upper bound on matches cannot beat
+    that cut or the current best are never extended, and the search stops
+    at the first 100% match.
+    """
+    # Token ids: alignment compares ints rather than strings
+    file_tokens = f.token_ids
+    pattern_tokens = p.token_ids
     n_file = len(file_tokens)
     n_pattern = len(pattern_tokens)
 
-    if not file_tokens or n_pattern < anchor_size:
+    if not n_file or n_pattern < anchor_size:
+        return None
+
+    # Largest match count that does NOT clear min_match_percent; a result has
+    # to beat this (and later, the best result so far) to be kept.
+    best_matches = _max_matches_at_or_below(min_match_percent, n_pattern)
+    if min(n_file, n_pattern) <= best_matches:
         return None
 
     # Fast skip: if no shared anchor, no need to align
-    common_anchors = f.trigram_positions.keys() & p.anchor_keys
+    if common_anchors is None:
+        common_anchors = f.trigram_positions.keys() & p.anchor_keys
     if not common_anchors:
         return None
 
     best_result: Optional[MatchResult] = None
 
+    # Seed chaining: every (file pos, pattern pos) anchor hit is a seed, and
+    # seeds are walked diagonal by diagonal (file_pos - pattern_pos) in file
+    # order. The greedy alignment only depends on its current (fi, pj), so once
+    # an extension has matched a seed's last anchor pair it continues exactly
+    # as that seed's own extension would, with strictly more matches behind
+    # it. Such seeds are skipped and each distinct alignment is extended once.
+    #
+    # A seed at (i, j0) can match at most min(n_file - i, n_pattern - j0)
+    # tokens, so seeds whose bound cannot beat best_matches are dropped.
+    seeds: List[Tuple[int, int]] = []
     for anchor in common_anchors:
         file_positions = f.trigram_positions[anchor]
-        pattern_positions = p.anchor_positions[anchor]
-
-        for i in file_positions:
-            for j0 in pattern_positions:
-                # We already know the first `anchor_size` words match
-                matches = anchor_size
-                last_match_file_idx = i + anchor_size - 1
-
-                fi_start = i + anchor_size
-                pj_start = j0 + anchor_size
-
-                extra_matches, extra_last_idx = _align_with_gaps(
-                    file_tokens,
-                    pattern_tokens,
-                    fi_start,
-                    pj_start,
-                    gap_lookahead=gap_lookahead,
-                )
-
-                matches += extra_matches
-                if extra_matches > 0:
-                    last_match_file_idx = extra_last_idx
-
-                start_char = file_tokens[i]["start"]
-                end_char = file_tokens[last_match_file_idx]["end"]
-                substring = f.text[start_char:end_char]
+        for j0 in p.anchor_positions[anchor]:
+            if n_pattern - j0 <= best_matches:
+                continue
+            for i in file_positions:
+                seeds.append((i - j0, i))
+    if not seeds:
+        return None
+    seeds.sort()
+
+    matched_pairs: Set[Tuple[int, int]] = set()
+    last_offset = anchor_size - 1
+
+    for diagonal, i in seeds:
+        j0 = i - diagonal
+        if min(n_file - i, n_pattern - j0) <= best_matches:
+            continue
+        if (i + last_offset, j0 + last_offset) in matched_pairs:
+            continue
+
+        # We already know the first `anchor_size` words match
+        matches = anchor_size
+        last_match_file_idx = i + anchor_size - 1
+
+        fi_start = i + anchor_size
+        pj_start = j0 + anchor_size
+
+        extra_matches, extra_last_idx = _align_with_gaps(
+            file_tokens,
+            pattern_tokens,
+            fi_start,
+            pj_start,
+            gap_lookahead=gap_lookahead,
+            matched_pairs=matched_pairs,
+            min_extra_matches=best_matches - anchor_size,
+        )
+
+        matches += extra_matches
+        if matches <= best_matches:
+            continue
+
+        if extra_matches > 0:
+            last_match_file_idx = extra_last_idx
+
+        start_char = f.token_starts[i]
+        end_char = f.token_ends[last_match_file_idx]
+        substring = f.text[start_char:end_char]
+
+        best_matches = matches
+        best_result = MatchResult(
+            matched_substring=substring,
+            match_percent=(matches / n_pattern) * 100.0,
+            start_index=start_char,
+            end_index=end_char,
+        )
+
+        # Nothing can beat a full match
+        if matches >= n_pattern:
+            break
 
-                match_percent = (matches / n_pattern) * 100.0
+    return best_result
 
-                if best_result is None or match_percent > best_result.match_percent:
-                    best_result = MatchResult(
-                        matched_substring=substring,
-                        match_percent=match_percent,
-                        start_index=start_char,
-                        end_index=end_char,
-                    )
 
-    return best_result
+def _max_matches_at_or_below(match_percent: float, n_pattern: int) -> int:
+    """
+    Largest match count m for which (m / n_pattern) * 100.0 <= match_percent,
+    or -1 if even zero matches exceeds it.
+    """
+    if match_percent < 0.0:
+        return -1
+    m = min(n_pattern, int(match_percent * n_pattern / 100.0))
+    # Settle float rounding against the exact expression the callers compare
+    while m < n_pattern and ((m + 1) / n_pattern) * 100.0 <= match_percent:
+        m += 1
+    while m >= 0 and (m / n_pattern) * 100.0 > match_percent:
+        m -= 1
+    return m
 
 
 _VERSION_RE = re.compile(
@@ -192,25 +291,259 @@ def _extract_versions(text: str) -> Optional[List[str]]:
     return versions
 
 
-def fuzzy_match_licenses_in_assessment_files(pattern_indexes):
-    for f_idx in Config.file_indexes:
-        file_model = f_idx.source_obj  # original model instance
-        print(f"Fuzzy searching file: {file_model.file_path}")
-        for p_idx in pattern_indexes:
-            pattern_path = p_idx.source_path  # the Path key from Dict[Path, str]
-            fuzzy_match_result = best_match_indexed(f_idx, p_idx, anchor_size=4)
-            if fuzzy_match_result and fuzzy_match_result.match_percent > 50.0:
-                license_name = utils.get_file_name_from_path_without_extension(pattern_path)
-                fuzzy_match_result.license_name = license_name
-                fuzzy_match_result.expected_versions = utils.extract_versions_from_name(license_name)
-                found_versions = _extract_versions(fuzzy_match_result.matched_substring)
-                fuzzy_match_result.found_versions = utils.normalize_number_strings(found_versions)
-                file_model.fuzzy_license_matches.append(fuzzy_match_result)
+def _find_candidate_patterns(
+    f: FileIndex,
+    anchor_postings: AnchorPostings,
+) -> Dict[int, Set[int]]:
+    """
+    Probe each of the file's anchors once against the global postings and
+    return {pattern_id: shared anchors} for every pattern sharing at least
+    one anchor with the file. No stricter count is safe: a gapped alignment
+    above MIN_MATCH_PERCENT can share as little as its seed anchor with the
+    file. Patterns that cannot clear MIN_MATCH_PERCENT are pruned by
+    best_match_indexed's upper bounds instead.
+    """
+    postings = anchor_postings.postings
+    shared: Dict[int, Set[int]] = defaultdict(set)
+
+    for anchor in f.trigram_positions:
+        posting_list = postings.get(anchor)
+        if posting_list is None:
+            continue
+        for pattern_id, _ in posting_list:
+            shared[pattern_id].add(anchor)
+
+    return shared
+
+
+def _match_file_against_patterns(
+    f_idx: FileIndex,
+    anchor_postings: AnchorPostings,
+) -> List[Tuple[int, MatchResult]]:
+    """
+    Return [(pattern_id, MatchResult)] for every license header that matches
+    this file above MIN_MATCH_PERCENT, in pattern order.
+    """
+    patterns = anchor_postings.patterns
+    results: List[Tuple[int, MatchResult]] = []
+
+    candidates = _find_candidate_patterns(f_idx, anchor_postings)
+    for pattern_id in sorted(candidates):
+        fuzzy_match_result = best_match_indexed(f_idx, patterns[pattern_id], anchor_size=anchor_postings.anchor_size,
+                                                common_anchors=candidates[pattern_id],
+                                                min_match_percent=MIN_MATCH_PERCENT)
+        if fuzzy_match_result and fuzzy_match_result.match_percent > MIN_MATCH_PERCENT:
+            results.append((pattern_id, fuzzy_match_result))
+
+    return results
+
+
+def _add_fuzzy_match(file_model, p_idx: PatternIndex, fuzzy_match_result: MatchResult) -> None:
+    # License name and versions are precomputed per pattern (and cached with the license corpus)
+    license_name = p_idx.license_name
+    expected_versions = p_idx.expected_versions
+    if license_name is None:
+        pattern_path = p_idx.source_path  # the Path key from Dict[Path, str]
+        license_name = utils.get_file_name_from_path_without_extension(pattern_path)
+        expected_versions = utils.extract_versions_from_name(license_name)
+    fuzzy_match_result.license_name = license_name
+    # Copy so later edits to one match never leak into the shared pattern metadata
+    fuzzy_match_result.expected_versions = list(expected_versions)
+    found_versions = _extract_versions(fuzzy_match_result.matched_substring)
+    fuzzy_match_result.found_versions = utils.normalize_number_strings(found_versions)
+    file_model.fuzzy_license_matches.append(fuzzy_match_result)
+
+
+def _scan_windows(f_idx: FileIndex) -> Optional[List[Tuple[int, int]]]:
+    """
+    Token ranges of f_idx the fuzzy search looks at, or None for the whole
+    file. With FUZZY_HEADER_WINDOW, files with one of
+    FUZZY_HEADER_WINDOW_EXTENSIONS are searched in their first
+    FUZZY_HEADER_WINDOW_HEAD_TOKENS and last FUZZY_HEADER_WINDOW_TAIL_TOKENS
+    tokens only, where license headers are. LICENSE/COPYING/NOTICE-like
+    files are always searched in full.
+    """
+    if not Config.fuzzy_header_window:
+        return None
+    file_model = f_idx.source_obj
+    if file_model.file_extension not in Config.fuzzy_header_window_extensions:
+        return None
+    if _FULL_TEXT_NAME_RE.match(Path(file_model.file_path).name):
+        return None
+
+    n_file = len(f_idx.token_ids)
+    head = Config.fuzzy_header_window_head_tokens
+    tail = Config.fuzzy_header_window_tail_tokens
+    if head + tail >= n_file:
+        return None
+    windows = [(0, head)]
+    if tail > 0:
+        windows.append((n_file - tail, n_file))
+    return windows
+
+
+def _window_index(f_idx: FileIndex, start: int, end: int, anchor_size: int) -> FileIndex:
+    """FileIndex of tokens [start, end) of f_idx; its token spans still point into the whole text."""
+    token_ids = f_idx.token_ids[start:end]
+    return FileIndex(
+        source_obj=f_idx.source_obj,
+        text=f_idx.text,
+        token_ids=token_ids,
+        token_starts=f_idx.token_starts[start:end],
+        token_ends=f_idx.token_ends[start:end],
+        trigram_positions=file_content_indexer_optimized._build_anchor_positions(token_ids, anchor_size),
+    )
+
+
+def _keep_best_match(best: Dict, key, result: MatchResult) -> None:
+    # Windows of one file can match the same header; only the best counts
+    current = best.get(key)
+    if current is None or result.match_percent > current.match_percent:
+        best[key] = result
+
+
+# ---------- Process pool ----------
+
+# Read-only license header index held by each worker process. It is handed
+# over once through the pool initializer (inherited for free under fork,
+# pickled once per worker under spawn), never per task.
+_worker_anchor_postings: Optional[AnchorPostings] = None
+
+
+def _init_fuzzy_worker(anchor_postings: AnchorPostings) -> None:
+    global _worker_anchor_postings
+    _worker_anchor_postings = anchor_postings
+
+
+def _fuzzy_match_shard(shard: List[Tuple[int, array, array, array]]) -> List[Tuple[int, int, float, int, int]]:
+    """
+    Worker: fuzzy match a shard of (file_pos, token_ids, token_starts, token_ends).
+
+    Token arrays pickle as flat buffers, so they are far cheaper to ship than
+    the text, and only compact (file_pos, pattern_id, match_percent,
+    start_index, end_index) records are sent back; the parent slices the
+    matched substring out of its own copy of the text.
+    """
+    anchor_postings = _worker_anchor_postings
+    records: List[Tuple[int, int, float, int, int]] = []
+
+    for file_pos, token_ids, token_starts, token_ends in shard:
+        f_idx = FileIndex(
+            source_obj=None,
+            text="",
+            token_ids=token_ids,
+            token_starts=token_starts,
+            token_ends=token_ends,
+            trigram_positions=file_content_indexer_optimized._build_anchor_positions(
+                token_ids, anchor_postings.anchor_size
+            ),
+        )
+        for pattern_id, result in _match_file_against_patterns(f_idx, anchor_postings):
+            records.append((file_pos, pattern_id, result.match_percent, result.start_index, result.end_index))
+
+    return records
+
+
+def _fuzzy_match_in_processes(file_indexes, anchor_postings: AnchorPostings, max_workers: int) -> None:
+    patterns = anchor_postings.patterns
+
+    # Windowed files send only their windows
+    scan_items = []
+    for pos, f_idx in enumerate(file_indexes):
+        windows = _scan_windows(f_idx)
+        if windows is None:
+            scan_items.append((pos, f_idx.token_ids, f_idx.token_starts, f_idx.token_ends))
+            continue
+        f_idx.source_obj.fuzzy_search_windowed = True
+        for start, end in windows:
+            scan_items.append((pos, f_idx.token_ids[start:end], f_idx.token_starts[start:end], f_idx.token_ends[start:end]))
+
+    # Several shards per worker keeps the pool busy when file sizes are uneven
+    shard_size = max(1, min(FUZZY_SHARD_SIZE, len(scan_items) // (max_workers * 4) or 1))
+    shards = [scan_items[start:start + shard_size] for start in range(0, len(scan_items), shard_size)]
+    best: Dict[Tuple[int, int], MatchResult] = {}
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_fuzzy_worker,
+        initargs=(anchor_postings,),
+    ) as executor:
+        futures = [executor.submit(_fuzzy_match_shard, shard) for shard in shards]
+
+        for future in as_completed(futures):
+            for file_pos, pattern_id, match_percent, start_index, end_index in future.result():
+                f_idx = file_indexes[file_pos]
+                fuzzy_match_result = MatchResult(
+                    matched_substring=f_idx.text[start_index:end_index],
+                    match_percent=match_percent,
+                    start_index=start_index,
+                    end_index=end_index,
+                )
+                _keep_best_match(best, (file_pos, pattern_id), fuzzy_match_result)
+
+    for file_pos, pattern_id in sorted(best):
+        _add_fuzzy_match(file_indexes[file_pos].source_obj, patterns[pattern_id], best[(file_pos, pattern_id)])
+
+
+def fuzzy_match_licenses_in_assessment_files(
+    pattern_indexes,
+    anchor_postings: Optional[AnchorPostings] = None,
+    max_workers: Optional[int] = None,
+):
+    """
+    Fuzzy match every license header against every assessment file.
+
+    max_workers (default Config.fuzzy_search_workers) selects the mode:
+      - 1: search in this process
+      - >1: shard the files across that many worker processes
+      - 0 or less: one worker process per CPU
+    """
+    if anchor_postings is None:
+        anchor_postings = file_content_indexer.build_anchor_postings(pattern_indexes, anchor_size=4)
+
+    if max_workers is None:
+        max_workers = Config.fuzzy_search_workers
+    if max_workers <= 0:
+        max_workers = os.cpu_count() or 1
+
+    file_indexes = [f_idx for f_idx in Config.file_indexes
+                    if f_idx.token_ids and not spdx_tag_scanner.skips_fuzzy_search(f_idx.source_obj)]
+
+    if max_workers > 1 and len(file_indexes) > 1:
+        print(f"Fuzzy searching {len(file_indexes)} files with {max_workers} worker processes")
+        _fuzzy_match_in_processes(file_indexes, anchor_postings, max_workers)
+    else:
+        for f_idx in file_indexes:
+            print(f"Fuzzy searching file: {f_idx.source_obj.file_path}")
+            fuzzy_match_file_index(f_idx, anchor_postings)
+
+    if Config.fuzzy_header_window:
+        windowed_count = sum(1 for f_idx in file_indexes if f_idx.source_obj.fuzzy_search_windowed)
+        print(f"Fuzzy searched files windowed to their head and tail: {windowed_count} of {len(file_indexes)}")
+
+
+def fuzzy_match_file_index(f_idx: FileIndex, anchor_postings: AnchorPostings) -> None:
+    """Fuzzy match every license header against one file, in this process."""
+    file_model = f_idx.source_obj  # original model instance
+    windows = _scan_windows(f_idx)
+    if windows is None:
+        for pattern_id, fuzzy_match_result in _match_file_against_patterns(f_idx, anchor_postings):
+            _add_fuzzy_match(file_model, anchor_postings.patterns[pattern_id], fuzzy_match_result)
+        return
+
+    file_model.fuzzy_search_windowed = True
+    best: Dict[int, MatchResult] = {}
+    for start, end in windows:
+        window_idx = _window_index(f_idx, start, end, anchor_postings.anchor_size)
+        for pattern_id, fuzzy_match_result in _match_file_against_patterns(window_idx, anchor_postings):
+            _keep_best_match(best, pattern_id, fuzzy_match_result)
+    for pattern_id in sorted(best):
+        _add_fuzzy_match(file_model, anchor_postings.patterns[pattern_id], best[pattern_id])
 
 
 if __name__ == "__main__":
     Config.file_data_manager = FileDataManager()
     license_headers_normalized = utils.read_and_normalize_licenses([Config.spdx_license_headers_dir, Config.manual_license_headers_dir])
-    Config.file_indexes = file_content_indexer.build_file_indexes(Config.file_data_manager.get_all_file_data(), anchor_size=4)
-    Config.license_header_indexes = file_content_indexer.build_pattern_indexes_from_dict(license_headers_normalized)
+    Config.file_indexes = file_content_indexer_optimized.build_file_indexes(Config.file_data_manager.get_all_file_data(), anchor_size=4)
+    Config.license_header_indexes = file_content_indexer.build_pattern_indexes_from_dict(license_headers_normalized, anchor_size=4)
     fuzzy_match_licenses_in_assessment_files(Config.license_header_indexes)
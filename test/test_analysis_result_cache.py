@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+from models.FileData import FileData
+from optimized.analysis_result_cache import AnalysisResultCache
+from tools.file_content_indexer import MatchResult
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+def _file_data(path, file_hash):
+    fd = FileData(Path(path), "content")
+    fd.file_hash = file_hash
+    return fd
+
+
+class TestAnalysisResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = Path(self.tmp_dir.name, "analysis_cache.sqlite")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        analyzed = _file_data("LICENSE", "h1")
+        analyzed.license_names.append("MIT")
+        analyzed.has_full_license = True
+        analyzed.fuzzy_license_match = MatchResult("mit", 100.0, 0, 3, [], [], "MIT")
+        analyzed.keyword_matches = {"license": ["mit"]}
+        with AnalysisResultCache("corpus1", self.cache_path, "engine1") as cache:
+            self.assertEqual(1, cache.store([analyzed]))
+
+        with AnalysisResultCache("corpus1", self.cache_path, "engine1") as cache:
+            cached, new = _file_data("other/LICENSE", "h1"), _file_data("NOTICE", "h2")
+            self.assertEqual([new], cache.fill_cached_results([cached, new]))
+
+        self.assertEqual(["MIT"], cached.license_names)
+        self.assertTrue(cached.has_full_license)
+        self.assertEqual(100.0, cached.fuzzy_license_match.match_percent)
+        self.assertEqual({"license": ["mit"]}, cached.keyword_matches)
+
+    def test_other_corpus_or_engine_misses(self):
+        with AnalysisResultCache("corpus1", self.cache_path, "engine1") as cache:
+            cache.store([_file_data("LICENSE", "h1")])
+
+        for corpus, engine in (("corpus2", "engine1"), ("corpus1", "engine2")):
+            with AnalysisResultCache(corpus, self.cache_path, engine) as cache:
+                self.assertEqual({}, cache.lookup(["h1"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import gzip
+import io
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from optimized import archive_reader_optimized
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+def _zip_bytes(files):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _tar_bytes(files, mode="w"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class _ForwardOnlyStream(io.RawIOBase):
+    """A member stream that can't seek and must never be read whole."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            raise AssertionError("stream read whole")
+        return self._data.read(size)
+
+
+class TestArchiveReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.src = Path(self.tmp_dir.name)
+        jar = _zip_bytes({"META-INF/LICENSE": b"apache license"})
+        layer = _tar_bytes({"usr/share/doc/x/COPYING": b"gpl", "usr/lib/y.jar": jar,
+                            "usr/share/doc/x/NEWS.txt.gz": gzip.compress(b"news")})
+        Path(self.src, "image.tar.gz").write_bytes(_tar_bytes({"layer.tar": layer}, "w:gz"))
+        Path(self.src, "plain.txt").write_bytes(b"plain")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read(self, memory_limit):
+        root = Path("/virtual")
+        files = archive_reader_optimized.iter_source_files(self.src, root, memory_limit=memory_limit)
+        return {path.relative_to(root).as_posix(): raw for path, raw in files}
+
+    def test_members_get_synthetic_paths(self):
+        expected = {
+            "image.tar.gz!/layer.tar!/usr/share/doc/x/COPYING": b"gpl",
+            "image.tar.gz!/layer.tar!/usr/lib/y.jar!/META-INF/LICENSE": b"apache license",
+            "image.tar.gz!/layer.tar!/usr/share/doc/x/NEWS.txt": b"news",
+            "plain.txt": b"plain",
+        }
+        self.assertEqual(expected, self._read(memory_limit=1024 * 1024))
+        # Nested archives above the memory limit are streamed from their parent instead
+        self.assertEqual(expected, self._read(memory_limit=0))
+
+    def test_oversized_archive_in_forward_only_stream_is_not_buffered(self):
+        data = _tar_bytes({"LICENSE": b"mit", "lib.jar": _zip_bytes({"NOTICE": b"notice"})})
+        files = archive_reader_optimized._iter_file_contents(Path("/virtual/layer.tar"), _ForwardOnlyStream(data),
+                                                            len(data), 1, memory_limit=16)
+
+        self.assertEqual({"/virtual/layer.tar!/LICENSE": b"mit", "/virtual/layer.tar!/lib.jar!/NOTICE": b"notice"},
+                         {path.as_posix(): raw for path, raw in files})
+
+    def test_unsafe_member_names_are_rejected(self):
+        self.assertIsNone(archive_reader_optimized._member_path(Path("a.tar"), "../../etc/passwd"))
+        self.assertEqual(Path("a.tar!/etc/passwd"), archive_reader_optimized._member_path(Path("a.tar"), "/etc/passwd"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+from configuration import Configuration as Config
+from models.FileData import FileData
+from tools import assessment_compare
+from tools.file_content_indexer import MatchResult
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+def _file_data(path, file_hash):
+    fd = FileData(Path(Config.dest_dir, path), "content")
+    fd.file_hash = file_hash
+    return fd
+
+
+class TestAssessmentCompare(unittest.TestCase):
+
+    def test_carry_forward_unchanged_results(self):
+        old = _file_data("v1/LICENSE", "h1")
+        old.license_names = ["MIT"]
+        old.has_full_license = True
+        old.keyword_matches = {"license": ["mit"]}
+        old.fuzzy_license_match = MatchResult("mit", 95.0, 0, 3, [], [], "MIT")
+        # Prior assessments are loaded back from their JSON
+        with mock.patch.object(Config, "license_corpus_checksum", "c1"), \
+                mock.patch.object(Config, "analysis_engine_version", "e1"):
+            old = FileData.from_persisted_dict(old.to_persisted_dict())
+
+        unchanged, changed, unhashed = _file_data("v2/LICENSE", "h1"), _file_data("v2/NOTICE", "h2"), _file_data("x", None)
+        to_analyze = assessment_compare.carry_forward_unchanged_results([old], [unchanged, changed, unhashed], "c1", "e1")
+
+        self.assertEqual([changed, unhashed], to_analyze)
+        self.assertEqual(["MIT"], unchanged.license_names)
+        self.assertTrue(unchanged.has_full_license)
+        self.assertEqual({"license": ["mit"]}, unchanged.keyword_matches)
+        self.assertEqual(95.0, unchanged.fuzzy_license_match.match_percent)
+        self.assertEqual([], changed.license_names)
+
+    def test_stale_results_are_not_carried_forward(self):
+        old = _file_data("v1/LICENSE", "h1")
+        old.license_names = ["MIT"]
+        data = old.to_persisted_dict()
+        # Written before the results were persisted
+        legacy = {key: data[key] for key in ("file_path", "file_hash", "file_content_b64", "file_content_is_text")}
+        for prior in (FileData.from_persisted_dict(legacy),
+                      FileData.from_persisted_dict(dict(data, corpus_checksum="c0", engine_version="e1")),
+                      FileData.from_persisted_dict(dict(data, corpus_checksum="c1", engine_version="e0"))):
+            new = _file_data("v2/LICENSE", "h1")
+            self.assertEqual([new], assessment_compare.carry_forward_unchanged_results([prior], [new], "c1", "e1"))
+            self.assertEqual([], new.license_names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import gzip
+import io
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from tools import assessment_extractor, extraction_manifest
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+def _zip_bytes(files):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _tar_bytes(files, mode="w"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class TestAssessmentExtractor(unittest.TestCase):
+
+    def setUp(self):
+        assessment_extractor.DEBUG = False
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.src = Path(self.tmp_dir.name, "src")
+        self.dest = Path(self.tmp_dir.name, "dest")
+        self.src.mkdir()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _extracted_files(self):
+        return {f.relative_to(self.dest).as_posix(): f.read_bytes() for f in self.dest.rglob("*") if f.is_file()}
+
+    def test_nested_archives_are_extracted(self):
+        jar = _zip_bytes({"META-INF/LICENSE": b"apache license"})
+        inner = _zip_bytes({"lib/c.jar": jar, "README": b"readme"})
+        archive = _tar_bytes({"a/b.zip": inner, "a/doc.txt.gz": gzip.compress(b"doc")}, "w:gz")
+        Path(self.src, "a.tar.gz").write_bytes(archive)
+        Path(self.src, "plain.txt").write_bytes(b"plain")
+        for i in range(5):
+            Path(self.src, f"m{i}.zip").write_bytes(_zip_bytes({f"m{i}/n.jar": jar}))
+
+        assessment_extractor.create_assessment_from_source(self.src, self.dest)
+
+        expected = {
+            "a/b/README": b"readme",
+            "a/b/lib/c/META-INF/LICENSE": b"apache license",
+            "a/doc.txt": b"doc",
+            "plain.txt": b"plain",
+        }
+        for i in range(5):
+            expected[f"m{i}/n/META-INF/LICENSE"] = b"apache license"
+        self.assertEqual(expected, self._extracted_files())
+
+    def test_flattening_is_undone_when_a_later_member_differs(self):
+        Path(self.src, "pkg.tar.gz").write_bytes(
+            _tar_bytes({"pkg/a": b"a", "pkg/pkg/b": b"b", "other/c": b"c"}, "w:gz"))
+        Path(self.src, "flat.tar.gz").write_bytes(_tar_bytes({"flat/x": b"x", "flat/y/z": b"z"}, "w:gz"))
+
+        assessment_extractor.create_assessment_from_source(self.src, self.dest)
+
+        expected = {
+            "pkg/pkg/a": b"a",
+            "pkg/pkg/pkg/b": b"b",
+            "pkg/other/c": b"c",
+            "flat/x": b"x",
+            "flat/y/z": b"z",
+        }
+        self.assertEqual(expected, self._extracted_files())
+
+        # Members written before flattening is undone must not overwrite files already there
+        Path(self.dest, "foo").mkdir()
+        Path(self.dest, "foo", "readme").write_bytes(b"existing")
+        archive = Path(self.src, "foo.tar")
+        archive.write_bytes(_tar_bytes({"foo/readme": b"archived", "bar.txt": b"bar"}))
+
+        written = assessment_extractor.extract_multi(archive, self.dest, Path("foo.tar"))
+
+        self.assertEqual({"foo/foo/readme", "foo/bar.txt"},
+                         {f.relative_to(self.dest.resolve()).as_posix() for f in written})
+        expected.update({"foo/readme": b"existing", "foo/foo/readme": b"archived", "foo/bar.txt": b"bar"})
+        self.assertEqual(expected, self._extracted_files())
+
+    def test_interrupted_extraction_resumes(self):
+        Path(self.src, "a.zip").write_bytes(_zip_bytes({"a/x.txt": b"x"}))
+        Path(self.src, "b.tar.gz").write_bytes(_tar_bytes({"b/y.txt": b"y"}, "w:gz"))
+        Path(self.src, "c.txt").write_bytes(b"c")
+
+        copy_or_extract_file = assessment_extractor.copy_or_extract_file
+
+        def fail_on_b(src_file, dest_root, rel_path):
+            if src_file.name == "b.tar.gz":
+                raise OSError("disk full")
+            return copy_or_extract_file(src_file, dest_root, rel_path)
+
+        with mock.patch.object(assessment_extractor, "copy_or_extract_file", side_effect=fail_on_b):
+            with self.assertRaises(OSError):
+                assessment_extractor.create_assessment_from_source(self.src, self.dest)
+        self.assertTrue(extraction_manifest.is_extraction_incomplete(self.dest))
+
+        with mock.patch.object(assessment_extractor, "copy_or_extract_file", side_effect=copy_or_extract_file) as task:
+            assessment_extractor.create_assessment_from_source(self.src, self.dest)
+        self.assertEqual(["b.tar.gz"], [call.args[0].name for call in task.call_args_list])
+        self.assertFalse(extraction_manifest.is_extraction_incomplete(self.dest))
+
+        expected = {"a/x.txt": b"x", "b/y.txt": b"y", "c.txt": b"c"}
+        self.assertEqual(expected, self._extracted_files())
+        listing = extraction_manifest.load_file_listing(self.dest)
+        self.assertEqual(sorted(expected), sorted(f.relative_to(self.dest).as_posix() for f in listing))
+
+    def test_safe_member_name(self):
+        self.assertEqual("a/b", assessment_extractor._safe_member_name("./a/../a//b"))
+        self.assertEqual("", assessment_extractor._safe_member_name("./"))
+        self.assertIsNone(assessment_extractor._safe_member_name("/etc/passwd"))
+        self.assertIsNone(assessment_extractor._safe_member_name("a/../../b"))
+
+
+if __name__ == '__main__':
+    unittest.main()
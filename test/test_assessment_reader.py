@@ -0,0 +1,102 @@
+import random
+import tempfile
+import unittest
+from unittest import mock
+import utils
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+from optimized import assessment_reader_optimized, file_content_indexer_optimized
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+class TestAssessmentReader(unittest.TestCase):
+
+    def test_chunked_normalization_matches_whole_text(self):
+        alphabet = list("ab Z9 0.1.\n\t,;!&é́ﬁΣß\x00\x0b\x1f.") + ["\\x4a", "\\&.", "  "]
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+            expected = utils.remove_punctuation_and_normalize_text(
+                assessment_reader_optimized.clean_decoded_binary_text(text))
+            for chunk_size in (1, 5, 16):
+                self.assertEqual(expected, assessment_reader_optimized.clean_and_normalize_text(text, chunk_size))
+
+    def test_memory_mapped_read_matches_bytes_read(self):
+        raw = "Licensed under the Apache License, Version 2.0 (the \"License\"); café\n".encode("utf-8") * 50 + b"\xff\x00"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = Path(tmp_dir, "LICENSE")
+            file_path.write_bytes(raw)
+            # Decoded as text, not triaged as binary for its NUL byte
+            with mock.patch.object(assessment_reader_optimized, "MMAP_MIN_FILE_SIZE", 1), \
+                    mock.patch.object(assessment_reader_optimized, "NORMALIZE_CHUNK_SIZE", 64), \
+                    mock.patch.object(Config, "binary_file_triage", False):
+                mapped = assessment_reader_optimized._read_single_file(file_path)
+                expected = assessment_reader_optimized.build_file_data_from_bytes(file_path, raw)
+
+        self.assertEqual(expected.file_hash, mapped.file_hash)
+        self.assertEqual(expected.file_content, mapped.file_content)
+        self.assertEqual(expected.file_content_normalized, mapped.file_content_normalized)
+
+    def test_process_normalization_matches_thread_normalization(self):
+        rng = random.Random(1)
+        words = ["Licensed", "under", "GPL-2.0+", "v1.2.3,", "café\n", "(c)", "\x00"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(6):
+                Path(tmp_dir, f"f{i}.txt").write_text(" ".join(rng.choice(words) for _ in range(rng.randint(0, 400))))
+            Path(tmp_dir, "copy.txt").write_text(Path(tmp_dir, "f1.txt").read_text())
+
+            results = []
+            for normalize_workers in (1, 2):
+                Config.file_data_manager = FileDataManager()
+                with mock.patch.object(assessment_reader_optimized, "NORMALIZE_CHUNK_SIZE", 100), \
+                        mock.patch.object(assessment_reader_optimized, "NORMALIZE_BATCH_SIZE", 300), \
+                        mock.patch.object(Config, "binary_file_triage", False):
+                    assessment_reader_optimized.read_all_assessment_files(tmp_dir, normalize_workers=normalize_workers)
+                results.append({str(fd.file_path): fd.file_content_normalized
+                                for fd in Config.file_data_manager.get_all_file_data()})
+
+        self.assertEqual(7, len(results[0]))
+        self.assertEqual(results[0], results[1])
+
+    def test_each_file_normalized_once(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for i in range(3):
+                Path(tmp_dir, f"f{i}.txt").write_text(f"Licensed under the MIT License, file {i}.\x00")
+
+            for normalize_workers, expected_calls in ((1, 3), (2, 0)):
+                Config.file_data_manager = FileDataManager()
+                normalize = utils.remove_punctuation_and_normalize_text
+                # Calls in this process; worker processes normalize their own copies
+                with mock.patch.object(utils, "remove_punctuation_and_normalize_text", wraps=normalize) as normalizer, \
+                        mock.patch.object(Config, "binary_file_triage", False):
+                    assessment_reader_optimized.read_all_assessment_files(tmp_dir, normalize_workers=normalize_workers)
+                    file_data = Config.file_data_manager.get_all_file_data()
+                    file_indexes = file_content_indexer_optimized.build_file_indexes(file_data, anchor_size=4)
+
+                self.assertEqual(expected_calls, normalizer.call_count)
+                self.assertEqual(sorted(fd.file_content_normalized for fd in file_data),
+                                 sorted(idx.text for idx in file_indexes))
+                self.assertTrue(all(idx.text.startswith("licensed under the mit license") for idx in file_indexes))
+
+    def test_binary_file_triage(self):
+        elf = b"\x7fELF\x02\x01\x01\x00" + b"\x00\x13" * 40 + b"GPL-2.0 licensed\x00\x01ab\x00Copyright (c) 2024 Foo\x00"
+        png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16 + b"MIT License text"
+        with mock.patch.object(Config, "binary_file_triage", True), \
+                mock.patch.object(Config, "binary_strings_min_length", 6), \
+                mock.patch.object(Config, "skip_no_license_file_types", True):
+            binary = assessment_reader_optimized.build_file_data_from_bytes(Path("libfoo.so"), elf)
+            image = assessment_reader_optimized.build_file_data_from_bytes(Path("logo.png"), png)
+            text = assessment_reader_optimized.build_file_data_from_bytes(Path("README.md"), b"MZ is not a PE header")
+
+        self.assertEqual("binary", binary.file_type)
+        self.assertEqual("GPL-2.0 licensed\nCopyright (c) 2024 Foo", binary.file_content)
+        self.assertEqual("skipped", image.file_type)
+        self.assertEqual("", image.file_content_normalized)
+        self.assertEqual("text", text.file_type)
+        self.assertEqual("MZ is not a PE header", text.file_content)
+
+
+if __name__ == '__main__':
+    unittest.main()
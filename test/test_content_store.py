@@ -0,0 +1,66 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from optimized import assessment_reader_optimized
+from tools import content_store
+from tools.content_store import ContentStore
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+class TestContentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.store = ContentStore(Path(self.root, ".content_store"), "sha256")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_identical_content_is_stored_once(self):
+        a = Path(self.root, "a.txt")
+        b = Path(self.root, "b.txt")
+        a_hash = self.store.write(io.BytesIO(b"same"), a)
+        b_hash = self.store.write(io.BytesIO(b"same"), b)
+
+        self.assertEqual(hashlib.sha256(b"same").hexdigest(), a_hash)
+        self.assertEqual(a_hash, b_hash)
+        self.assertEqual(1, self.store.stored_count)
+        self.assertEqual(1, self.store.deduplicated_count)
+        self.assertEqual(os.stat(a).st_ino, os.stat(b).st_ino)
+        self.assertEqual(a_hash, self.store.lookup_hash(os.stat(b)))
+
+        # Replacing a path leaves the other links untouched
+        self.store.write(io.BytesIO(b"other"), a)
+        self.assertEqual(b"same", b.read_bytes())
+        self.assertEqual(b"other", a.read_bytes())
+
+    def test_prune_removes_unreferenced_blobs(self):
+        a = Path(self.root, "a.txt")
+        self.store.write(io.BytesIO(b"archive"), a)
+        self.store.write(io.BytesIO(b"kept"), Path(self.root, "b.txt"))
+        a.unlink()
+
+        self.assertEqual(1, self.store.prune())
+        self.assertEqual(1, len(list(self.store.objects_dir.glob("*/*"))))
+
+    def test_reader_uses_stored_hash(self):
+        a = Path(self.root, "a.txt")
+        file_hash = self.store.write(io.BytesIO(b"content"), a)
+        previous_store = content_store._content_store
+        content_store._content_store = self.store
+        try:
+            # A hash the reader could not have computed itself proves it was taken from the store
+            self.store._hashes[(os.stat(a).st_dev, os.stat(a).st_ino)] = "stored-" + file_hash
+            file_data = assessment_reader_optimized._read_single_file(a)
+        finally:
+            content_store._content_store = previous_store
+        self.assertEqual("stored-" + file_hash, file_data.file_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
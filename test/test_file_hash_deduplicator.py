@@ -0,0 +1,46 @@
+import unittest
+from models.FileData import FileData
+from tools import file_hash_deduplicator
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+def _file_data(path, file_hash):
+    fd = FileData(Path(path), "content")
+    fd.file_hash = file_hash
+    return fd
+
+
+class TestFileHashDeduplicator(unittest.TestCase):
+
+    def test_groups_by_hash(self):
+        a, b, c = _file_data("a/LICENSE", "h1"), _file_data("b/LICENSE", "h1"), _file_data("NOTICE", "h2")
+        groups = file_hash_deduplicator.group_file_data_by_hash([a, b, c])
+        self.assertEqual([a, c], file_hash_deduplicator.get_unique_file_data(groups))
+
+    def test_files_without_hash_are_not_merged(self):
+        groups = file_hash_deduplicator.group_file_data_by_hash([_file_data("a", None), _file_data("b", None)])
+        self.assertEqual(2, len(groups))
+
+    def test_fan_out_analysis_results(self):
+        a, b = _file_data("a/LICENSE", "h1"), _file_data("b/LICENSE", "h1")
+        a.license_names.append("MIT")
+        a.has_full_license = True
+        a.license_match_strength = "EXACT"
+        a.keyword_matches = {"license": ["mit"]}
+        groups = file_hash_deduplicator.group_file_data_by_hash([a, b])
+
+        self.assertEqual(1, file_hash_deduplicator.fan_out_analysis_results(groups))
+        self.assertEqual(["MIT"], b.license_names)
+        self.assertTrue(b.has_full_license)
+        self.assertEqual("EXACT", b.license_match_strength)
+        self.assertEqual({"license": ["mit"]}, b.keyword_matches)
+
+        # Each path keeps its own list
+        b.license_names.append("Apache-2.0")
+        self.assertEqual(["MIT"], a.license_names)
+
+
+if __name__ == '__main__':
+    unittest.main()
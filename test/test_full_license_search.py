@@ -0,0 +1,56 @@
+import unittest
+import utils
+from configuration import Configuration as Config
+from models.FileData import FileData
+from optimized import full_license_search_optimized
+from optimized.file_content_indexer_optimized import _build_single_file_index
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+class TestFullLicenseSearch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        licenses_normalized = utils.read_and_normalize_licenses(Config.all_licenses_dir)
+        cls.license_metadata = full_license_search_optimized.build_license_metadata(licenses_normalized)
+        cls.matcher = full_license_search_optimized.build_full_license_matcher(cls.license_metadata)
+
+    def _assert_same_as_substring_search(self, content):
+        file_index = _build_single_file_index(FileData(Path("test.txt"), content), anchor_size=4)
+        expected = [
+            i for i, (_, license_content) in enumerate(self.license_metadata)
+            if license_content in file_index.text
+        ]
+        self.assertEqual(expected, self.matcher.find(file_index.text, file_index.token_ids, file_index.token_starts))
+        return expected
+
+    def test_matches_substring_search(self):
+        by_name = {name: content for name, content in self.license_metadata}
+        mit = by_name["MIT"]
+        apache = by_name["Apache-2.0"]
+
+        # Licenses glued onto neighbouring words still count, like `in` does
+        found = self._assert_same_as_substring_search("header x" + mit + "y " + apache + " trailer")
+        found_names = [self.license_metadata[i][0] for i in found]
+        self.assertIn("MIT", found_names)
+        self.assertIn("Apache-2.0", found_names)
+
+        # Truncated license text must not match
+        self._assert_same_as_substring_search(mit[:-10])
+        self._assert_same_as_substring_search("")
+
+    def test_search_fills_file_data(self):
+        by_name = {name: content for name, content in self.license_metadata}
+        file_data = FileData(Path("LICENSE"), by_name["MIT"])
+        file_index = _build_single_file_index(file_data, anchor_size=4)
+        full_license_search_optimized.search_assessment_files_for_full_licenses(
+            self.license_metadata, [file_index], self.matcher
+        )
+        self.assertTrue(file_data.has_full_license)
+        self.assertEqual("EXACT", file_data.license_match_strength)
+        self.assertIn("MIT", file_data.license_names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+from configuration import Configuration as Config
+from models.FileData import FileData
+from optimized.file_content_indexer_optimized import _build_single_file_index
+from search import fuzzy_license_search
+from tools import file_content_indexer
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+HEADER = ("licensed under the apache license version 2.0 the license you may not use this file "
+          "except in compliance with the license you may obtain a copy of the license at")
+
+
+class TestFuzzyLicenseSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.pattern_indexes = file_content_indexer.build_pattern_indexes_from_dict(
+            {Path("Apache-2.0.txt"): HEADER}, anchor_size=4
+        )
+
+    def _best_match(self, content):
+        file_index = _build_single_file_index(FileData(Path("Main.java"), content), anchor_size=4)
+        return fuzzy_license_search.best_match_indexed(file_index, self.pattern_indexes[0], anchor_size=4)
+
+    def test_exact_header(self):
+        result = self._best_match("package foo " + HEADER + " public class Main")
+        self.assertEqual(100.0, result.match_percent)
+        self.assertEqual(HEADER, result.matched_substring)
+
+    def test_repeated_header_extends_once(self):
+        # Repetitive content produces many seeds across several diagonals
+        result = self._best_match(" ".join([HEADER] * 5))
+        self.assertEqual(100.0, result.match_percent)
+        self.assertEqual(HEADER, result.matched_substring)
+
+    def test_header_with_edits(self):
+        edited = HEADER.replace("you may not", "you shall not").replace("obtain a copy", "get one copy")
+        result = self._best_match(edited)
+        n_pattern = len(HEADER.split())
+        self.assertAlmostEqual((n_pattern - 3) / n_pattern * 100.0, result.match_percent)
+
+    def test_min_match_percent_prunes_weak_matches(self):
+        content = "package foo licensed under the apache license and nothing more"
+        file_index = _build_single_file_index(FileData(Path("Main.java"), content), anchor_size=4)
+        pattern_index = self.pattern_indexes[0]
+        weak = fuzzy_license_search.best_match_indexed(file_index, pattern_index, anchor_size=4)
+        self.assertLess(weak.match_percent, 50.0)
+        self.assertIsNone(
+            fuzzy_license_search.best_match_indexed(file_index, pattern_index, anchor_size=4, min_match_percent=50.0)
+        )
+
+    def test_sparse_match_above_threshold_is_kept(self):
+        # One intact anchor, then every other token: 52% with a single shared anchor
+        header = " ".join(f"word{i}" for i in range(100))
+        content = " ".join(f"word{i}" if i < 4 or i % 2 else "other" for i in range(100))
+        pattern_indexes = file_content_indexer.build_pattern_indexes_from_dict({Path("Sparse-1.0.txt"): header},
+                                                                               anchor_size=4)
+        file_data = FileData(Path("Main.java"), content)
+        Config.file_indexes = [_build_single_file_index(file_data, anchor_size=4)]
+
+        fuzzy_license_search.fuzzy_match_licenses_in_assessment_files(pattern_indexes, max_workers=1)
+
+        self.assertEqual(52.0, fuzzy_license_search.best_match_indexed(Config.file_indexes[0], pattern_indexes[0],
+                                                                       anchor_size=4).match_percent)
+        self.assertEqual([52.0], [m.match_percent for m in file_data.fuzzy_license_matches])
+
+    def test_no_shared_anchor(self):
+        self.assertIsNone(self._best_match("int main return 0"))
+
+    def _search_files(self, max_workers):
+        contents = ["package foo " + HEADER, "no license here at all", HEADER.replace("you may not", "you must not")]
+        file_data = [FileData(Path(f"File{i}.java"), content) for i, content in enumerate(contents)]
+        Config.file_indexes = [_build_single_file_index(fd, anchor_size=4) for fd in file_data]
+        fuzzy_license_search.fuzzy_match_licenses_in_assessment_files(self.pattern_indexes, max_workers=max_workers)
+        return [
+            [(m.license_name, m.match_percent, m.start_index, m.end_index, m.matched_substring)
+             for m in fd.fuzzy_license_matches]
+            for fd in file_data
+        ]
+
+    def test_process_pool_matches_in_process_search(self):
+        in_process = self._search_files(max_workers=1)
+        self.assertEqual("Apache-2.0", in_process[0][0][0])
+        self.assertEqual([], in_process[1])
+        self.assertEqual(in_process, self._search_files(max_workers=2))
+
+    def test_header_window(self):
+        filler = " ".join(f"token{i}" for i in range(200))
+        contents = {
+            "Head.java": HEADER + " " + filler,
+            "Middle.java": filler + " " + HEADER + " " + filler,
+            "Tail.java": filler + " " + HEADER,
+            "LICENSE.java": filler + " " + HEADER + " " + filler,
+            "Middle.txt": filler + " " + HEADER + " " + filler,
+        }
+        for max_workers in (1, 2):
+            file_data = {name: FileData(Path(name), content) for name, content in contents.items()}
+            for name, fd in file_data.items():
+                fd.file_extension = Path(name).suffix
+            Config.file_indexes = [_build_single_file_index(fd, anchor_size=4) for fd in file_data.values()]
+            with mock.patch.object(Config, "fuzzy_header_window", True), \
+                    mock.patch.object(Config, "fuzzy_header_window_head_tokens", 100), \
+                    mock.patch.object(Config, "fuzzy_header_window_tail_tokens", 50), \
+                    mock.patch.object(Config, "fuzzy_header_window_extensions", frozenset({".java"})):
+                fuzzy_license_search.fuzzy_match_licenses_in_assessment_files(self.pattern_indexes, max_workers=max_workers)
+
+            found = {name: [m.match_percent for m in fd.fuzzy_license_matches] for name, fd in file_data.items()}
+            self.assertEqual({"Head.java": [100.0], "Middle.java": [], "Tail.java": [100.0],
+                              "LICENSE.java": [100.0], "Middle.txt": [100.0]}, found)
+            self.assertEqual(HEADER, file_data["Tail.java"].fuzzy_license_matches[0].matched_substring)
+            windowed = {name for name, fd in file_data.items() if fd.fuzzy_search_windowed}
+            self.assertEqual({"Head.java", "Middle.java", "Tail.java"}, windowed)
+
+
+if __name__ == "__main__":
+    unittest.main()
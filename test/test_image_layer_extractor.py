@@ -0,0 +1,116 @@
+import hashlib
+import io
+import json
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+from configuration import Configuration as Config
+from optimized import archive_reader_optimized
+from tools import assessment_extractor, image_layer_extractor
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+def _tar_bytes(files, mode="w"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+LAYERS = [
+    {"usr/a.txt": b"a v1", "usr/b.txt": b"b", "etc/old/x.conf": b"x", "opt/keep": b"keep"},
+    # Replaces a.txt, deletes b.txt and makes etc opaque (hides everything below it from layer 0)
+    {"usr/a.txt": b"a v2", "usr/.wh.b.txt": b"", "etc/.wh..wh..opq": b"", "etc/new.conf": b"new"},
+    {"opt/extra": b"extra"},
+]
+
+VISIBLE = {"usr/a.txt": b"a v2", "etc/new.conf": b"new", "opt/keep": b"keep", "opt/extra": b"extra"}
+
+
+class TestImageLayerExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _docker_save_image(self, prefix=""):
+        files = {}
+        for i, layer in enumerate(LAYERS):
+            files[f"{prefix}layer{i}/layer.tar"] = _tar_bytes(layer)
+        manifest = [{"Config": "config.json", "Layers": [f"{prefix}layer{i}/layer.tar" for i in range(len(LAYERS))]}]
+        files[f"{prefix}manifest.json"] = json.dumps(manifest).encode("utf-8")
+        image = Path(self.root, "image.tar")
+        image.write_bytes(_tar_bytes(files))
+        return image
+
+    def _oci_image(self):
+        files = {}
+        layers = []
+        for layer in LAYERS:
+            blob = _tar_bytes(layer, "w:gz")
+            digest = hashlib.sha256(blob).hexdigest()
+            files[f"blobs/sha256/{digest}"] = blob
+            layers.append({"digest": f"sha256:{digest}"})
+        manifest = json.dumps({"layers": layers}).encode("utf-8")
+        manifest_digest = hashlib.sha256(manifest).hexdigest()
+        files[f"blobs/sha256/{manifest_digest}"] = manifest
+        files["index.json"] = json.dumps({"manifests": [{"digest": f"sha256:{manifest_digest}"}]}).encode("utf-8")
+        image = Path(self.root, "oci.tar")
+        image.write_bytes(_tar_bytes(files))
+        return image
+
+    def _visible(self, image):
+        return {name: f.read() for _, name, f, _ in image_layer_extractor.iter_visible_files(image)}
+
+    def test_visible_files_apply_layers_and_whiteouts(self):
+        for image in (self._docker_save_image(), self._oci_image()):
+            self.assertTrue(image_layer_extractor.is_image(image))
+            self.assertEqual(VISIBLE, self._visible(image))
+
+    def test_dot_prefixed_member_names(self):
+        image = self._docker_save_image(prefix="./")
+        self.assertEqual(["layer0/layer.tar", "layer1/layer.tar", "layer2/layer.tar"],
+                         image_layer_extractor.ImageLayout(image).layer_names())
+        self.assertTrue(image_layer_extractor.is_image(image))
+        self.assertEqual(VISIBLE, self._visible(image))
+
+    def test_image_without_layers_is_extracted_as_plain_tar(self):
+        image = Path(self.root, "image.tar")
+        image.write_bytes(_tar_bytes({"manifest.json": b"[{\"Layers\": []}]", "NOTICE": b"notice"}))
+        self.assertFalse(image_layer_extractor.is_image(image))
+
+        dest = Path(self.root, "dest")
+        with mock.patch.object(Config, "image_layer_aware", True):
+            written = assessment_extractor.extract_multi(image, dest, Path("image.tar"))
+        self.assertIn(b"notice", [f.read_bytes() for f in written])
+
+    def test_extract_image(self):
+        image = self._docker_save_image()
+        dest = Path(self.root, "dest")
+        written = image_layer_extractor.extract_image(image, dest, Path("image.tar"), layer_view=True)
+
+        extracted = {f.relative_to(dest).as_posix(): f.read_bytes() for f in written}
+        expected = {f"image/{name}": data for name, data in VISIBLE.items()}
+        expected["image_layers/001/usr/a.txt"] = b"a v2"
+        self.assertEqual(b"a v1", extracted.pop("image_layers/000/usr/a.txt"))
+        self.assertTrue(all(name in extracted for name in expected))
+        self.assertNotIn("image/usr/b.txt", extracted)
+
+    def test_scan_image_in_place(self):
+        image = self._docker_save_image()
+        with mock.patch.object(Config, "image_layer_aware", True):
+            files = dict(archive_reader_optimized.iter_source_files(image, Path("/virtual"), memory_limit=0))
+        self.assertEqual({Path(f"/virtual/image.tar!/{name}"): data for name, data in VISIBLE.items()}, files)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import random
+import unittest
+from models.FileData import FileData
+from optimized import keyword_search_optimized
+from optimized.file_content_indexer_optimized import _build_single_file_index
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+def _reference_matches(token_ids):
+    # Every term's tokens compared against every position of the file
+    tokens = token_ids.tolist()
+    found = set()
+    for term in keyword_search_optimized.ALL_TERMS:
+        length = len(term.token_ids)
+        if any(tokens[i:i + length] == term.token_ids for i in range(len(tokens) - length + 1)):
+            found.add((term.category, term.norm))
+    matches = {}
+    for category, ordered_terms in keyword_search_optimized.TERMS_BY_CATEGORY.items():
+        ordered = [norm for norm in ordered_terms if (category, norm) in found]
+        if ordered:
+            matches[category] = ordered
+    return matches
+
+
+class TestKeywordSearch(unittest.TestCase):
+
+    def test_matches_per_term_scan(self):
+        words = sorted({token for term in keyword_search_optimized.ALL_TERMS for token in term.tokens})
+        words += ["the", "software", "2.0", "licensed"]
+        rng = random.Random(0)
+        matcher = keyword_search_optimized.build_keyword_matcher()
+        for i in range(200):
+            content = " ".join(rng.choice(words) for _ in range(rng.randint(0, 300)))
+            index = _build_single_file_index(FileData(Path(f"f{i}.txt"), content), anchor_size=4)
+            self.assertEqual(_reference_matches(index.token_ids),
+                             keyword_search_optimized._find_matches_in_index(index, matcher))
+
+    def test_categories_in_one_pass(self):
+        content = "Licensed under the Apache License. All rights reserved. Classpath exception applies."
+        index = _build_single_file_index(FileData(Path("Main.java"), content), anchor_size=4)
+
+        matches = keyword_search_optimized._find_matches_in_index(index)
+
+        self.assertEqual(["apache", "apache license"], matches["license_name"])
+        self.assertIn("all rights reserved", matches["license"])
+        self.assertIn("classpath exception", matches["custom"])
+        self.assertEqual({}, keyword_search_optimized._find_matches_in_index(
+            _build_single_file_index(FileData(Path("empty.txt"), ""), anchor_size=4)))
+
+
+if __name__ == '__main__':
+    unittest.main()
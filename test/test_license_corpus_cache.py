@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from unittest import mock
+from models.FileData import FileData
+from optimized import full_license_search_optimized, keyword_search_optimized, license_corpus_cache, token_vocabulary
+from optimized.file_content_indexer_optimized import _build_single_file_index
+from optimized.license_corpus_cache import LicenseCorpus
+from search import fuzzy_license_search
+from tools import file_content_indexer
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+LICENSE = ("permission is hereby granted free of charge to any person obtaining a copy of this software "
+           "and associated documentation files the software to deal in the software without restriction")
+HEADER = ("licensed under the apache license version 2.0 the license you may not use this file "
+          "except in compliance with the license you may obtain a copy of the license at")
+
+
+def _build_corpus(checksum):
+    licenses_normalized = {Path("MIT.txt"): LICENSE}
+    license_headers_normalized = {Path("Apache-2.0.txt"): HEADER}
+    license_metadata = full_license_search_optimized.build_license_metadata(licenses_normalized)
+    header_indexes = file_content_indexer.build_pattern_indexes_from_dict(license_headers_normalized, anchor_size=4)
+    keyword_matcher = keyword_search_optimized.build_keyword_matcher()
+    return LicenseCorpus(
+        checksum=checksum,
+        licenses_normalized=licenses_normalized,
+        license_headers_normalized=license_headers_normalized,
+        license_metadata=license_metadata,
+        full_license_matcher=full_license_search_optimized.build_full_license_matcher(license_metadata),
+        license_header_indexes=header_indexes,
+        license_header_postings=file_content_indexer.build_anchor_postings(header_indexes, anchor_size=4),
+        vocabulary_tokens=token_vocabulary.VOCABULARY.snapshot(),
+        keyword_matcher=keyword_matcher,
+    )
+
+
+class TestLicenseCorpusCache(unittest.TestCase):
+
+    def _assert_corpus_matches(self, corpus):
+        file_index = _build_single_file_index(FileData(Path("Main.java"), "x " + LICENSE + " y " + HEADER), 4)
+        found = corpus.full_license_matcher.find(file_index.text, file_index.token_ids, file_index.token_starts)
+        self.assertEqual([0], found)
+
+        header = corpus.license_header_indexes[0]
+        self.assertEqual("Apache-2.0", header.license_name)
+        self.assertEqual(1, len(fuzzy_license_search._find_candidate_patterns(file_index, corpus.license_header_postings)))
+        result = fuzzy_license_search.best_match_indexed(file_index, header, anchor_size=4)
+        self.assertEqual(100.0, result.match_percent)
+
+        keyword_matches = corpus.keyword_matcher.find(file_index.token_ids)
+        self.assertEqual(["apache", "apache license"], keyword_matches["license_name"])
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                mock.patch.object(token_vocabulary, "VOCABULARY", token_vocabulary.TokenVocabulary()):
+            license_corpus_cache.save_license_corpus(_build_corpus("abc"), Path(cache_dir))
+            self.assertIsNone(license_corpus_cache.load_license_corpus("other", Path(cache_dir)))
+
+            corpus = license_corpus_cache.load_license_corpus("abc", Path(cache_dir))
+            self.assertIsNotNone(corpus)
+            self._assert_corpus_matches(corpus)
+
+    def test_load_into_different_vocabulary(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(token_vocabulary, "VOCABULARY", token_vocabulary.TokenVocabulary()):
+                license_corpus_cache.save_license_corpus(_build_corpus("abc"), Path(cache_dir))
+
+            # Ids handed out before the load disagree with the cached ones
+            vocabulary = token_vocabulary.TokenVocabulary()
+            vocabulary.intern_all(["the", "software", "license", "unrelated"])
+            with mock.patch.object(token_vocabulary, "VOCABULARY", vocabulary):
+                corpus = license_corpus_cache.load_license_corpus("abc", Path(cache_dir))
+                self.assertEqual(vocabulary.snapshot(), corpus.vocabulary_tokens)
+                self._assert_corpus_matches(corpus)
+
+
+if __name__ == '__main__':
+    unittest.main()
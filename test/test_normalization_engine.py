@@ -0,0 +1,151 @@
+import random
+import re
+import string
+import unicodedata
+import unittest
+import utils
+from typing import Union
+from configuration import Configuration as Config
+from input import keyword_strings
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+# ---------- Reference implementation: the char-by-char normalization the fast engine replaced ----------
+
+def _reference_remove_punctuation_keep_decimal_dots(text: str) -> str:
+    """
+    Remove all punctuation from `text`, except for '.' characters that are part
+    of numbers or version-like tokens (i.e., a '.' with digits on both sides,
+    such as in '1.0' or '1.0.0').
+
+    Also handles LaTeX-style escaped sequences like '\\&.' so that
+    '2\\&.0\\&.' becomes '2.0'.
+    """
+    # Normalize '\&.' sequences to a plain dot
+    # "v\\&. 2\\&.0\\&." -> "v. 2.0."
+    text = re.sub(r'\\&\.', '.', text)
+
+    punctuation = set(string.punctuation)
+    result_chars = []
+    n = len(text)
+
+    for i, ch in enumerate(text):
+        # Not punctuation? Always keep it.
+        if ch not in punctuation:
+            result_chars.append(ch)
+            continue
+
+        # Special handling for dots
+        if ch == '.':
+            prev_ch = text[i - 1] if i > 0 else ''
+            next_ch = text[i + 1] if i + 1 < n else ''
+
+            # Keep '.' only if it's between digits (e.g., 1.0, 1.0.0)
+            if prev_ch.isdigit() and next_ch.isdigit():
+                result_chars.append(ch)
+            # else: skip this dot
+            continue
+
+        # Any other punctuation: remove it (skip)
+        continue
+
+    return ''.join(result_chars)
+
+
+def _reference_normalize(value: Union[str, bytes, None]) -> str:
+    """
+    Normalize a string for comparison:
+      - Handles None and bytes
+      - Unicode normalizes (NFKC)
+      - Strips accents/diacritics
+      - Case-insensitive (casefold)
+      - Collapses whitespace to single spaces
+    Returns a normalized string.
+    """
+    if value is None:
+        return ""
+
+    # Decode bytes if needed
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="ignore")
+
+    # Ensure it's a string
+    value = str(value)
+
+    value = _reference_remove_punctuation_keep_decimal_dots(value)
+
+    # Normalize Unicode (compatibility decomposition + recomposition)
+    value = unicodedata.normalize("NFKC", value)
+
+    # Remove diacritics (accents)
+    # e.g., "café" → "cafe"
+    value = "".join(
+        ch for ch in value
+        if not unicodedata.category(ch).startswith("M")
+    )
+
+    # Case-insensitive
+    value = value.casefold()
+
+    # Collapse any whitespace (spaces, tabs, newlines) into a single space
+    value = re.sub(r"\s+", " ", value)
+
+    # Strip leading/trailing spaces
+    return value.strip()
+
+
+# Characters that exercise every rule: punctuation and the digit-dot rule,
+# non-ASCII digits (str.isdigit is wider than \d), marks, compatibility
+# forms, case folding and Unicode whitespace
+_FUZZ_ALPHABET = (
+    list("aZ09 .,;:!?'\"-_()[]{}<>/\\@#$%^&*+=|~`\n\t\r\x0b\x0c\x1c\x85\xa0")
+    + list("²³¹٣०.．。́̈⃝ͅéÉİıßẞΣσςﬁﬀ①Ⅳ㎏ＡＢ！ 　​")
+    + ["\\&.", "1.0", "v2.1.3", "\\&", "..", " 1. 2 "]
+)
+
+
+def _corpus_files():
+    for license_dir in Config.all_licenses_dir + Config.all_license_headers_dir:
+        yield from sorted(Path(license_dir).rglob("*.txt"))
+
+
+class TestNormalizationEngine(unittest.TestCase):
+
+    def assertSameAsReference(self, text):
+        self.assertEqual(_reference_normalize(text), utils.remove_punctuation_and_normalize_text(text), repr(text))
+
+    def test_license_corpus(self):
+        files = list(_corpus_files())
+        self.assertTrue(files)
+        for file_path in files:
+            text = file_path.read_text(encoding="utf-8", errors="ignore")
+            self.assertSameAsReference(text)
+
+    def test_keyword_terms(self):
+        for name, value in vars(keyword_strings).items():
+            if isinstance(value, (list, tuple, set)):
+                for term in value:
+                    if isinstance(term, str):
+                        self.assertSameAsReference(term)
+
+    def test_random_text(self):
+        rng = random.Random(0)
+        for _ in range(20000):
+            self.assertSameAsReference("".join(rng.choice(_FUZZ_ALPHABET) for _ in range(rng.randint(0, 40))))
+
+    def test_other_input_types(self):
+        for value in (None, b"Caf\xc3\xa9 1.0 \xff", bytearray(b"abc"), 12.5):
+            self.assertEqual(_reference_normalize(value), utils.remove_punctuation_and_normalize_text(value))
+
+    def test_remove_punctuation_keep_decimal_dots(self):
+        rng = random.Random(1)
+        for _ in range(5000):
+            text = "".join(rng.choice(_FUZZ_ALPHABET) for _ in range(rng.randint(0, 40)))
+            self.assertEqual(_reference_remove_punctuation_keep_decimal_dots(text),
+                             utils.remove_punctuation_keep_decimal_dots(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import random
+import unittest
+from unittest import mock
+import utils
+from configuration import Configuration as Config
+from models.FileData import FileData
+from optimized import assessment_reader_optimized, offset_map
+from optimized.file_content_indexer_optimized import _build_single_file_index
+from tools import fuzzy_matches_evaluator
+from tools.file_content_indexer import MatchResult
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+class TestOffsetMap(unittest.TestCase):
+
+    def test_normalized_text_matches_whole_text(self):
+        alphabet = list("ab Z9 0.1.\n\t,;!&é́ﬁΣß\x00\x1f.") + ["\\&.", "\\x4a", "  ", "(c)", "License."]
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+            text_map, normalized = offset_map.build_offset_map(text)
+            self.assertEqual(utils.remove_punctuation_and_normalize_text(text), normalized)
+            # Cleaned keeping positions, the map covers the text the indexer searches
+            _, cleaned_normalized = offset_map.build_offset_map(utils.clean_decoded_binary_text(text, keep_length=True))
+            self.assertEqual(assessment_reader_optimized.clean_and_normalize_text(text), cleaned_normalized)
+            size = len(text.encode("utf-8"))
+            for start in range(len(normalized)):
+                location = text_map.locate(start, len(normalized))
+                self.assertTrue(0 <= location["start_byte"] <= location["end_byte"] <= size)
+
+    def test_locate_original_span(self):
+        text = "Copyright (c) 2024\n\nPermission is hereby granted, free of charge, to café owners.\n"
+        text_map, normalized = offset_map.build_offset_map(text)
+        start = normalized.index("hereby")
+        end = normalized.index("café") + len("café")
+
+        location = text_map.locate(start, end)
+
+        raw = text.encode("utf-8")
+        self.assertEqual(b"hereby granted, free of charge, to caf\xc3\xa9", raw[location["start_byte"]:location["end_byte"]])
+        self.assertEqual(3, location["start_line"])
+        self.assertEqual(3, location["end_line"])
+        # Plain words one space apart share a run
+        self.assertLess(len(text_map), len(normalized.split()))
+
+    def test_locate_maps_only_up_to_the_span(self):
+        alphabet = list("ab Z9 0.1.\n,;é́ﬁ") + ["  ", "(c)", "License."]
+        rng = random.Random(2)
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 80)))
+            text_map, normalized = offset_map.build_offset_map(text)
+            for _ in range(5):
+                start = rng.randint(0, len(normalized))
+                end = rng.randint(start, len(normalized))
+                _, prefix = offset_map.build_offset_map(text, stop_at=end)
+                self.assertTrue(normalized.startswith(prefix) and len(prefix) >= end)
+                self.assertEqual(text_map.locate(start, end),
+                                 offset_map.locate_in_text(text, start, end, normalized[start:end]))
+
+    def test_persisted_fuzzy_match_location(self):
+        text = "// Header\n// Licensed under the MIT License.\n"
+        normalized = utils.remove_punctuation_and_normalize_text(text)
+        start = normalized.index("licensed")
+        fd = FileData(Path(Config.dest_dir, "a.c"), text)
+        fd.fuzzy_license_matches = [MatchResult(normalized[start:], 90.0, start, len(normalized), [], [], "MIT")]
+        with mock.patch.object(Config, "offset_maps", True):
+            fuzzy_matches_evaluator.determine_best_fuzzy_matches_from_file_data([fd])
+
+        # Located when the match was chosen, saving doesn't map the content again
+        with mock.patch.object(offset_map, "build_offset_map") as build:
+            data = fd.to_persisted_dict()
+        build.assert_not_called()
+
+        location = data["fuzzy_license_match_location"]
+        self.assertEqual(text.index("Licensed"), location["start_byte"])
+        self.assertEqual(text.index("License.") + len("License"), location["end_byte"])
+        self.assertEqual(2, location["start_line"])
+        self.assertNotIn("offset_map", data)
+        # Persisted results load back as before
+        loaded = FileData.from_persisted_dict(data)
+        self.assertEqual(90.0, loaded.fuzzy_license_match.match_percent)
+        self.assertEqual(location, loaded.fuzzy_license_match_location)
+
+        # A binary's content is its printable strings, which have no offsets in the file
+        fd.file_type = "binary"
+        self.assertIsNone(fd.locate_fuzzy_license_match())
+
+    def test_location_of_chunked_index_with_control_chars(self):
+        text = "binary\x00\x01junk \\x7f\\x00 " * 20 + "\n// Licensed under the MIT License.\n"
+        fd = FileData(Path(Config.dest_dir, "a.c"), text)
+        normalize = utils.remove_punctuation_and_normalize_text
+        with mock.patch.object(assessment_reader_optimized, "NORMALIZE_CHUNK_SIZE", 64), \
+                mock.patch.object(utils, "remove_punctuation_and_normalize_text", wraps=normalize) as normalizer:
+            file_index = _build_single_file_index(fd, anchor_size=4)
+
+        # Never normalized as a whole
+        self.assertLessEqual(max(len(call.args[0]) for call in normalizer.call_args_list), 64)
+        self.assertEqual(assessment_reader_optimized.clean_and_normalize_text(text), file_index.text)
+        start = file_index.text.index("licensed")
+        fd.fuzzy_license_match = MatchResult(file_index.text[start:], 90.0, start, len(file_index.text), [], [], "MIT")
+
+        location = fd.locate_fuzzy_license_match()
+
+        self.assertEqual(text.index("Licensed"), location["start_byte"])
+        self.assertEqual(2, location["start_line"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+from configuration import Configuration as Config
+from optimized import assessment_reader_optimized, spdx_tag_scanner
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+class TestSpdxTagScanner(unittest.TestCase):
+
+    def test_scan_expressions(self):
+        raw = (b"// SPDX-License-Identifier: MIT\n"
+               b"/* SPDX-License-Identifier: (GPL-2.0-only WITH Linux-syscall-note OR BSD-3-Clause) */\r\n"
+               b"<!-- SPDX-License-Identifier: Apache-2.0-->\n"
+               b"# SPDX-License-Identifier: $LICENSE\n"
+               b"SPDX-License-Identifier: GPL-2.0+ or LicenseRef-Foo.\n"
+               b"SPDX-License-Identifier: MIT\n")
+
+        expressions = spdx_tag_scanner.scan_spdx_license_expressions(raw)
+
+        self.assertEqual(["MIT", "(GPL-2.0-only WITH Linux-syscall-note OR BSD-3-Clause)", "Apache-2.0",
+                          "GPL-2.0+ OR LicenseRef-Foo"], expressions)
+        self.assertEqual(["GPL-2.0-only WITH Linux-syscall-note", "BSD-3-Clause"],
+                         spdx_tag_scanner.get_license_names(expressions[1]))
+        self.assertEqual([], spdx_tag_scanner.scan_spdx_license_expressions(b"SPDX-License-Identifier: (MIT OR */"))
+
+    def test_tagged_file_skips_fuzzy_search(self):
+        raw = b"// SPDX-License-Identifier: Apache-2.0 OR MIT\nint main() { return 0; }\n"
+        with mock.patch.object(Config, "spdx_tag_scan", True), \
+                mock.patch.object(Config, "spdx_tag_skips_fuzzy", True):
+            tagged = assessment_reader_optimized.build_file_data_from_bytes(Path("main.c"), raw)
+            untagged = assessment_reader_optimized.build_file_data_from_bytes(Path("util.c"), b"int x;\n")
+            counts = spdx_tag_scanner.search_assessment_files_for_spdx_tags([tagged, untagged])
+            self.assertTrue(spdx_tag_scanner.skips_fuzzy_search(tagged))
+            self.assertFalse(spdx_tag_scanner.skips_fuzzy_search(untagged))
+
+        self.assertEqual((1, 1), counts)
+        self.assertEqual(["Apache-2.0", "MIT"], tagged.license_names)
+        self.assertEqual("SPDX-TAG", tagged.license_match_strength)
+        self.assertIsNone(untagged.license_match_strength)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import tempfile
+import unittest
+from unittest import mock
+import utils
+from configuration import Configuration as Config
+from models.FileData import FileDataManager, decompress_from_b64
+from optimized import full_license_search_optimized, streaming_pipeline
+from optimized.analysis_result_cache import AnalysisResultCache
+from optimized.license_corpus_cache import LicenseCorpus
+from tools import file_content_indexer
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+LICENSE = ("Permission is hereby granted, free of charge, to any person obtaining a copy of this software "
+           "and associated documentation files (the Software), to deal in the Software without restriction")
+HEADER = ("Licensed under the Apache License, Version 2.0 (the License); you may not use this file "
+          "except in compliance with the License. You may obtain a copy of the License at")
+
+
+def _build_corpus():
+    licenses_normalized = {Path("MIT.txt"): "permission is hereby granted free of charge to any person obtaining a copy "
+                                            "of this software and associated documentation files the software to "
+                                            "deal in the software without restriction"}
+    license_headers_normalized = {Path("Apache-2.0.txt"): "licensed under the apache license version 2.0 the license "
+                                                          "you may not use this file except in compliance with the "
+                                                          "license you may obtain a copy of the license at"}
+    license_metadata = full_license_search_optimized.build_license_metadata(licenses_normalized)
+    header_indexes = file_content_indexer.build_pattern_indexes_from_dict(license_headers_normalized, anchor_size=4)
+    return LicenseCorpus(
+        checksum="test",
+        licenses_normalized=licenses_normalized,
+        license_headers_normalized=license_headers_normalized,
+        license_metadata=license_metadata,
+        full_license_matcher=full_license_search_optimized.build_full_license_matcher(license_metadata),
+        license_header_indexes=header_indexes,
+        license_header_postings=file_content_indexer.build_anchor_postings(header_indexes, anchor_size=4),
+        vocabulary_tokens=[],
+    )
+
+
+class TestStreamingPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.corpus = _build_corpus()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name, content):
+        path = Path(self.tmp_dir.name, name)
+        path.write_text(content, encoding="utf-8")
+        return path
+
+    def test_analyze_single_file(self):
+        content = "/* " + HEADER + " */\n" + LICENSE
+        file_data = streaming_pipeline.analyze_single_file(self._write("Main.java", content), self.corpus)
+
+        self.assertTrue(file_data.has_full_license)
+        self.assertEqual(["MIT", "Apache-2.0"], file_data.license_names)
+        self.assertEqual(100.0, file_data.fuzzy_license_match.match_percent)
+        # Content is dropped, the JSON output still gets it
+        self.assertEqual("", file_data.file_content)
+        self.assertEqual(content, decompress_from_b64(file_data.file_content_b64, as_text=True))
+
+    def test_duplicates_copy_kept_results(self):
+        results_by_hash = {}
+        first = streaming_pipeline.analyze_single_file(self._write("a.txt", LICENSE), self.corpus, results_by_hash)
+        second = streaming_pipeline.analyze_single_file(self._write("b.txt", LICENSE), self.corpus, results_by_hash)
+
+        # Only the results are kept per hash, not the file and its content
+        self.assertEqual([dict], [type(results) for results in results_by_hash.values()])
+        self.assertEqual(["MIT"], second.license_names)
+        second.license_names.append("Other")
+        self.assertEqual(["MIT"], first.license_names)
+
+    def test_run_streaming_assessment_in_process(self):
+        self._write("a.txt", LICENSE)
+        self._write("b.txt", LICENSE)
+        self._write("c.txt", "nothing to see here")
+        Config.file_data_manager = FileDataManager()
+
+        count = streaming_pipeline.run_streaming_assessment(self.tmp_dir.name, self.corpus, max_workers=1)
+
+        self.assertEqual(3, count)
+        by_name = {Path(fd.file_path).name: fd for fd in Config.file_data_manager.get_all_file_data()}
+        self.assertEqual(["MIT"], by_name["a.txt"].license_names)
+        self.assertEqual(["MIT"], by_name["b.txt"].license_names)
+        self.assertEqual([], by_name["c.txt"].license_names)
+
+    def test_unique_content_normalized_once_and_cached(self):
+        self._write("a.txt", LICENSE)
+        self._write("b.txt", LICENSE)
+        self._write("c.txt", "nothing to see here")
+        normalize = utils.remove_punctuation_and_normalize_text
+
+        results = []
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                AnalysisResultCache("test", Path(cache_dir, "analysis.sqlite")) as analysis_cache:
+            # Second run takes every result from the analysis cache
+            for expected_calls in (2, 0):
+                Config.file_data_manager = FileDataManager()
+                with mock.patch.object(utils, "remove_punctuation_and_normalize_text", wraps=normalize) as normalizer:
+                    streaming_pipeline.run_streaming_assessment(self.tmp_dir.name, self.corpus, max_workers=1,
+                                                                analysis_cache=analysis_cache)
+                self.assertEqual(expected_calls, normalizer.call_count)
+                results.append({Path(fd.file_path).name: fd.license_names
+                                for fd in Config.file_data_manager.get_all_file_data()})
+
+        self.assertEqual({"a.txt": ["MIT"], "b.txt": ["MIT"], "c.txt": []}, results[0])
+        self.assertEqual(results[0], results[1])
+
+    def test_unsupported_options_are_rejected(self):
+        streaming_pipeline.check_streaming_options()
+        with mock.patch.object(Config, "scan_archives_in_place", True):
+            self.assertRaises(ValueError, streaming_pipeline.check_streaming_options)
+        with mock.patch.object(Config, "diff_file_data", "prior.json"), \
+                mock.patch.object(Config, "incremental_assessment", True):
+            self.assertRaises(ValueError, streaming_pipeline.check_streaming_options)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import pickle
+import random
+import unittest
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from optimized import token_vocabulary
+from optimized.token_vocabulary import TokenVocabulary
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+class TestTokenVocabulary(unittest.TestCase):
+
+    def test_intern_and_lookup(self):
+        vocabulary = TokenVocabulary()
+        self.assertIsNone(vocabulary.lookup("license"))
+
+        ids = vocabulary.intern_all(["license", "mit", "license"])
+
+        self.assertEqual(array("i", [0, 1, 0]), ids)
+        self.assertEqual(1, vocabulary.intern("mit"))
+        self.assertEqual(2, vocabulary.intern("apache"))
+        self.assertEqual(0, vocabulary.lookup("license"))
+        self.assertEqual("apache", vocabulary.token(2))
+        self.assertEqual(["license", "mit", "apache"], vocabulary.snapshot())
+        # Persisted with the tokens only, ids come back the same
+        self.assertEqual(2, pickle.loads(pickle.dumps(vocabulary)).lookup("apache"))
+
+    def test_concurrent_interning_gives_one_id_per_token(self):
+        vocabulary = TokenVocabulary()
+        tokens = [f"token{i}" for i in range(2000)]
+
+        def intern_shuffled(seed):
+            shuffled = list(tokens)
+            random.Random(seed).shuffle(shuffled)
+            return dict(zip(shuffled, vocabulary.intern_all(shuffled)))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(intern_shuffled, range(8)))
+
+        self.assertEqual(len(tokens), len(vocabulary))
+        for ids in results:
+            self.assertEqual({token: vocabulary.lookup(token) for token in tokens}, ids)
+
+    def test_adopt(self):
+        vocabulary = TokenVocabulary()
+        vocabulary.intern_all(["a", "b"])
+
+        self.assertTrue(vocabulary.adopt(["a", "b", "c"]))
+        self.assertEqual(2, vocabulary.lookup("c"))
+        self.assertFalse(vocabulary.adopt(["b", "a", "c", "d"]))
+        self.assertIsNone(vocabulary.lookup("d"))
+
+    def test_pack_anchor_round_trip(self):
+        rng = random.Random(0)
+        narrow_max = 0xFFFF
+        for _ in range(1000):
+            anchor_size = rng.randint(1, 6)
+            top = rng.choice([narrow_max, narrow_max + 1, 2 ** 31 - 1])
+            ids = [rng.randint(0, top) for _ in range(anchor_size)]
+            key = token_vocabulary.pack_anchor(ids)
+            self.assertEqual(ids, token_vocabulary.unpack_anchor(key, anchor_size))
+
+        # Narrow keys fit 64 bits, wide ones never collide with them
+        self.assertLess(token_vocabulary.pack_anchor([narrow_max] * 4), 2 ** 64)
+        self.assertGreaterEqual(token_vocabulary.pack_anchor([0, 0, 0, narrow_max + 1]), 2 ** 128)
+
+    def test_wide_anchor_positions(self):
+        # Ids past 65535, as once the vocabulary outgrows 16-bit lanes
+        ids = array("i", [5, 70000, 5, 70000, 5, 70000, 3, 65535, 65536])
+        positions = token_vocabulary.pack_anchor_positions(ids, 4)
+
+        expected = {}
+        for i in range(len(ids) - 3):
+            expected.setdefault(token_vocabulary.pack_anchor(ids[i:i + 4]), []).append(i)
+        self.assertEqual(expected, dict(positions))
+        self.assertEqual([0, 2], positions[token_vocabulary.pack_anchor([5, 70000, 5, 70000])])
+        self.assertEqual([3, 65535, 65536], token_vocabulary.unpack_anchor(
+            token_vocabulary.pack_anchor(ids[6:9]), 3))
+
+    def test_narrow_fast_path_matches_generic_packing(self):
+        rng = random.Random(1)
+        ids = array("i", [rng.randint(0, 50) for _ in range(500)])
+        positions = token_vocabulary.pack_anchor_positions(ids, 4)
+
+        for key, starts in positions.items():
+            for i in starts:
+                self.assertEqual(key, token_vocabulary.pack_anchor(ids[i:i + 4]))
+        self.assertEqual(len(ids) - 3, sum(map(len, positions.values())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 from configuration import Configuration as Config
 from models.FileData import FileData
-from typing import Iterable, List, Set
+from tools import file_hash_deduplicator
+from typing import Dict, Iterable, List, Set
 
 
 def find_new_or_changed_files(old_data: Iterable[FileData], new_data: Iterable[FileData],) -> List[FileData]:
@@ -23,10 +24,10 @@ def find_new_or_changed_files(old_data: Iterable[FileData], new_data: Iterable[F
     for fd in new_data:
         file_hash = fd.file_hash
 
-        # Skip None/empty hashes
+        # Files without a hash can't be compared, so treat them as new
         if not file_hash:
-            #continue
             results.append(fd)
+            continue
 
         if file_hash not in old_file_data_hashes:
             results.append(fd)
@@ -54,10 +55,10 @@ def find_removed_files(old_data: Iterable[FileData], new_data: Iterable[FileData
     for fd in old_data:
         file_hash = fd.file_hash
 
-        # Skip None/empty hashes
+        # Files without a hash can't be compared, so treat them as removed
         if not file_hash:
-            #continue
             results.append(fd)
+            continue
 
         if file_hash not in new_file_data_hashes:
             results.append(fd)
@@ -65,6 +66,43 @@ def find_removed_files(old_data: Iterable[FileData], new_data: Iterable[FileData
     return results
 
 
+def carry_forward_unchanged_results(old_data: Iterable[FileData], new_data: Iterable[FileData],
+                                    corpus_checksum: str, engine_version: str) -> List[FileData]:
+    """
+    Copies the search results of a prior assessment onto every FileData in
+    new_data whose file_hash appears in old_data, and returns the remaining
+    new or changed files, which still need to be analyzed.
+    Like the functions above, comparison is based on file_hash, but only
+    prior results produced with the same license corpus checksum and engine
+    version count; entries from another corpus or engine, or from JSON
+    written before results were persisted, are treated as changed.
+    """
+    new_data = list(new_data)
+    old_by_hash: Dict[str, FileData] = {}
+    stale_count = 0
+
+    for fd in old_data:
+        if not fd.file_hash:
+            continue
+        if (fd.results_corpus_checksum is None or fd.results_corpus_checksum != corpus_checksum
+                or fd.results_engine_version != engine_version):
+            stale_count += 1
+            continue
+        old_by_hash.setdefault(fd.file_hash, fd)
+
+    if stale_count:
+        print(f"Prior results from another license corpus or engine, not carried forward: {stale_count}")
+
+    new_or_changed = find_new_or_changed_files(old_by_hash.values(), new_data)
+    new_or_changed_ids = {id(fd) for fd in new_or_changed}
+
+    for fd in new_data:
+        if id(fd) not in new_or_changed_ids:
+            file_hash_deduplicator.copy_analysis_results(old_by_hash[fd.file_hash], fd)
+
+    return new_or_changed
+
+
 if __name__ == "__main__":
     old_file_data = Config.loaded_file_data_manager.get_all_file_data()
     new_file_data = Config.file_data_manager.get_all_file_data()
@@ -1,13 +1,19 @@
 from configuration import Configuration as Config
 from loggers.assessment_extractor_logger import assessment_extractor_logger as logger
+from tools import content_store, image_layer_extractor
+from tools.extraction_manifest import ExtractionManifest
 import os
+import posixpath
 import shutil
+import tempfile
 from pathlib import Path
 import zipfile
 import tarfile
 import gzip
 import bz2
 import lzma
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
 
 
 # Toggle this to turn noisy debug output on/off
@@ -109,8 +115,8 @@ def classify(path: Path) -> str:
 
 # ---------- Extraction helpers ----------
 
-def decompress_single(src_file: Path, dest_file: Path) -> None:
-    """Decompress single-file compressed src_file to dest_file."""
+def decompress_single(src_file: Path, dest_file: Path) -> List[Path]:
+    """Decompress single-file compressed src_file to dest_file and return [dest_file]."""
     debug_print(f"[decompress_single] {src_file} -> {dest_file}")
     dest_file.parent.mkdir(parents=True, exist_ok=True)
 
@@ -126,8 +132,9 @@ def decompress_single(src_file: Path, dest_file: Path) -> None:
         print(logger.error(f"Unsupported single-file compression: {src_file}"))
         raise ValueError(f"Unsupported single-file compression: {src_file}")
 
-    with opener(src_file, "rb") as f_in, open(dest_file, "wb") as f_out:
-        shutil.copyfileobj(f_in, f_out)
+    with opener(src_file, "rb") as f_in:
+        content_store.write_stream(f_in, dest_file)
+    return [dest_file]
 
 
 def strip_multi_suffix(rel_path: Path) -> Path:
@@ -151,103 +158,222 @@ def strip_multi_suffix(rel_path: Path) -> Path:
     return result
 
 
-def safe_extract_tar(tar_obj: tarfile.TarFile, path: Path) -> None:
+def _safe_member_name(name: str) -> Optional[str]:
+    """
+    Normalize an archive member name with plain string operations (no
+    filesystem access). Returns "" for the archive root itself, or None if
+    the name is absolute or climbs above the extraction directory.
+
+    Checking strings is enough because extraction never creates symlinks,
+    so nothing under the extraction directory can point outside it.
+    """
+    if os.name == "nt":
+        name = name.replace("\\", "/")
+        if len(name) > 1 and name[1] == ":":
+            return None
+    if name.startswith("/"):
+        return None
+    name = posixpath.normpath(name)
+    if name == ".." or name.startswith("../"):
+        return None
+    return "" if name == "." else name
+
+
+def _tar_top_level(name: str) -> Optional[str]:
+    """Top-level entry of a tar member name, None for the archive root."""
+    if not name or name in (".", "/"):
+        return None
+    return name.split("/", 1)[0].rstrip("/")
+
+
+def _extract_tar_member(tar_obj: tarfile.TarFile, member: tarfile.TarInfo, path: Path,
+                        written: List[Path]) -> None:
+    """
+    Extract one tar member under the already resolved directory `path`,
+    appending the file to `written` if one was written.
+    """
+    name = member.name
+    if not name:
+        return
+
+    # On Windows, skip names with invalid characters (like ":" in man pages)
+    if os.name == "nt" and any(ch in name for ch in '<>:"|?*'):
+        logger.info(f"[safe_extract_tar] Skipping invalid Windows name: {name}")
+        debug_print(f"[safe_extract_tar] Skipping invalid Windows name: {name}")
+        return
+
+    # Path traversal protection
+    safe_name = _safe_member_name(name)
+    if safe_name is None:
+        logger.exception(f"Unsafe path in tar archive (path traversal attempt) for path: {path}")
+        raise Exception("Unsafe path in tar archive (path traversal attempt)")
+    member_path = path / safe_name if safe_name else path
+
+    try:
+        if member.isdir():
+            debug_print(f"[safe_extract_tar] Dir: {member_path}")
+            member_path.mkdir(parents=True, exist_ok=True)
+
+        elif member.isreg():
+            debug_print(f"[safe_extract_tar] File: {member_path}")
+            member_path.parent.mkdir(parents=True, exist_ok=True)
+            src_f = tar_obj.extractfile(member)
+            if src_f is None:
+                debug_print(f"[safe_extract_tar]   No fileobj for {name}, skipping")
+                return
+
+            try:
+                with src_f:
+                    content_store.write_stream(src_f, member_path)
+            except (OSError, ValueError) as e:
+                logger.error(f"[safe_extract_tar]   Failed writing {member_path}: {e}")
+                debug_print(f"[safe_extract_tar]   Failed writing {member_path}: {e}")
+                return
+            written.append(member_path)
+
+            # Stored files share their inode with identical files, leave their mode alone
+            if Config.content_addressed_extraction:
+                return
+
+            # Apply basic permissions; ignore failures
+            try:
+                os.chmod(member_path, member.mode & 0o777)
+            except PermissionError:
+                logger.error(f"[safe_extract_tar]   chmod failed for {member_path}")
+                debug_print(f"[safe_extract_tar]   chmod failed for {member_path}")
+                pass
+
+        else:
+            # Skip symlinks, devices, fifos, etc.
+            logger.info(f"[safe_extract_tar] Skipping special member: {name}")
+            debug_print(f"[safe_extract_tar] Skipping special member: {name}")
+
+    except (PermissionError, OSError, ValueError) as e:
+        logger.error(f"[safe_extract_tar]   Error for {name}: {e}")
+        debug_print(f"[safe_extract_tar]   Error for {name}: {e}")
+
+
+def safe_extract_tar(tar_obj: tarfile.TarFile, path: Path) -> List[Path]:
     """
     Safely extract a tarfile to 'path', handling:
     - path traversal protection
     - Windows-invalid filename characters
     - skipping special files (symlinks, devices, FIFOs)
+
+    Members are read in order, so this also works for tars opened in stream
+    mode ("r|*"). Returns the regular files written.
     """
     path = path.resolve()
-    invalid_chars = '<>:"|?*' if os.name == "nt" else ""
+    written: List[Path] = []
 
     debug_print(f"[safe_extract_tar] Extracting to {path}")
 
-    for member in tar_obj.getmembers():
-        name = member.name
-        if not name:
-            continue
+    for member in tar_obj:
+        _extract_tar_member(tar_obj, member, path, written)
 
-        # On Windows, skip names with invalid characters (like ":" in man pages)
-        if os.name == "nt" and any(ch in name for ch in invalid_chars):
-            logger.info(f"[safe_extract_tar] Skipping invalid Windows name: {name}")
-            debug_print(f"[safe_extract_tar] Skipping invalid Windows name: {name}")
-            continue
+    return written
 
-        # Path traversal protection
-        member_path = (path / name).resolve()
-        if not str(member_path).startswith(str(path)):
-            logger.exception(f"Unsafe path in tar archive (path traversal attempt) for path: {path}")
-            raise Exception("Unsafe path in tar archive (path traversal attempt)")
 
-        try:
-            if member.isdir():
-                debug_print(f"[safe_extract_tar] Dir: {member_path}")
-                member_path.mkdir(parents=True, exist_ok=True)
-
-            elif member.isreg():
-                debug_print(f"[safe_extract_tar] File: {member_path}")
-                member_path.parent.mkdir(parents=True, exist_ok=True)
-                src_f = tar_obj.extractfile(member)
-                if src_f is None:
-                    debug_print(f"[safe_extract_tar]   No fileobj for {name}, skipping")
-                    continue
+def _peek_tar_top_level(tar_obj: tarfile.TarFile) -> Optional[str]:
+    """
+    Top-level entry of the first member that has one. Iterating tar_obj
+    afterwards still starts at the first member, and since only root entries
+    ("." or "/") are skipped, no file data is consumed in stream mode.
+    """
+    member = tar_obj.next()
+    while member is not None:
+        top_level = _tar_top_level(member.name)
+        if top_level is not None:
+            return top_level
+        member = tar_obj.next()
+    return None
 
-                try:
-                    with src_f:
-                        with open(member_path, "wb") as dst_f:
-                            shutil.copyfileobj(src_f, dst_f)
-                except (OSError, ValueError) as e:
-                    logger.error(f"[safe_extract_tar]   Failed writing {member_path}: {e}")
-                    debug_print(f"[safe_extract_tar]   Failed writing {member_path}: {e}")
-                    continue
 
-                # Apply basic permissions; ignore failures
-                try:
-                    os.chmod(member_path, member.mode & 0o777)
-                except PermissionError:
-                    logger.error(f"[safe_extract_tar]   chmod failed for {member_path}")
-                    debug_print(f"[safe_extract_tar]   chmod failed for {member_path}")
-                    pass
+def _stream_extract_tar(tar_obj: tarfile.TarFile, staging_dir: Path, base_name: str) -> Tuple[List[Path], bool]:
+    """
+    Extract a tar in one sequential pass into a private staging directory,
+    with members exactly where their names put them. Returns the files
+    written and whether every member was under base_name, i.e. whether the
+    archive can be flattened.
+    """
+    staging_dir = staging_dir.resolve()
+    written: List[Path] = []
+    flatten = True
+    debug_print(f"[safe_extract_tar] Extracting to {staging_dir}")
 
-            else:
-                # Skip symlinks, devices, fifos, etc.
-                logger.info(f"[safe_extract_tar] Skipping special member: {name}")
-                debug_print(f"[safe_extract_tar] Skipping special member: {name}")
-                continue
+    for member in tar_obj:
+        top_level = _tar_top_level(member.name)
+        if flatten and top_level is not None and top_level != base_name:
+            debug_print(f"[extract_multi] {member.name} is outside {base_name}, not flattening after all")
+            flatten = False
+        _extract_tar_member(tar_obj, member, staging_dir, written)
 
-        except (PermissionError, OSError, ValueError) as e:
-            logger.error(f"[safe_extract_tar]   Error for {name}: {e}")
-            debug_print(f"[safe_extract_tar]   Error for {name}: {e}")
-            continue
+    return written, flatten
+
+
+def _move_staged_extraction(staged_dir: Path, final_dir: Path, written: List[Path]) -> List[Path]:
+    """
+    Move a staged extraction to final_dir. A missing final_dir is simply
+    renamed into place; an existing one keeps its other files and only the
+    paths the archive wrote are replaced. A file at final_dir is the archive
+    being extracted in place and is removed first.
+
+    Returns the `written` paths as they are after the move.
+    """
+    staged_dir = staged_dir.resolve()
+    if final_dir.is_file():
+        debug_print(f"[finalize] Removing file {final_dir}")
+        final_dir.unlink()
+
+    if not final_dir.exists():
+        debug_print(f"[finalize] Moving {staged_dir} -> {final_dir}")
+        staged_dir.rename(final_dir)
+        final_dir = final_dir.resolve()
+        return [final_dir / w.relative_to(staged_dir) for w in written]
+
+    debug_print(f"[finalize] Merging {staged_dir} into {final_dir}")
+    final_dir = final_dir.resolve()
+    moved = []
+    for w in written:
+        dest = final_dir / w.relative_to(staged_dir)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(w, dest)
+        moved.append(dest)
+    return moved
 
 
-def safe_extract_zip(zf: zipfile.ZipFile, path: Path) -> None:
+def safe_extract_zip(zf: zipfile.ZipFile, path: Path) -> List[Path]:
     """
     Safe zip extraction with path traversal protection.
+
+    Returns the files written.
     """
     path = path.resolve()
+    written: List[Path] = []
     debug_print(f"[safe_extract_zip] Extracting to {path}")
 
     for info in zf.infolist():
+        safe_name = _safe_member_name(info.filename)
+        if safe_name is None:
+            logger.exception(f"Unsafe path in zip archive (path traversal attempt) for path: {path / info.filename}")
+            raise Exception("Unsafe path in zip archive (path traversal attempt)")
+        dest = path / safe_name if safe_name else path
+
         if info.is_dir():
-            d = (path / info.filename).resolve()
-            debug_print(f"[safe_extract_zip] Dir: {d}")
-            d.mkdir(parents=True, exist_ok=True)
+            debug_print(f"[safe_extract_zip] Dir: {dest}")
+            dest.mkdir(parents=True, exist_ok=True)
             continue
 
-        dest = (path / info.filename).resolve()
-        if not str(dest).startswith(str(path)):
-            logger.exception(f"Unsafe path in zip archive (path traversal attempt) for path: {dest}")
-            raise Exception("Unsafe path in zip archive (path traversal attempt)")
-
         debug_print(f"[safe_extract_zip] File: {dest}")
         dest.parent.mkdir(parents=True, exist_ok=True)
-        with zf.open(info, "r") as src, open(dest, "wb") as dst:
-            shutil.copyfileobj(src, dst)
+        with zf.open(info, "r") as src:
+            content_store.write_stream(src, dest)
+        written.append(dest)
+
+    return written
 
 
-def _finalize_extract_dir(extract_dir: Path, final_dir: Path) -> None:
+def _finalize_extract_dir(extract_dir: Path, final_dir: Path, written: List[Path]) -> List[Path]:
     """
     Finalize an extraction directory:
 
@@ -257,10 +383,12 @@ def _finalize_extract_dir(extract_dir: Path, final_dir: Path) -> None:
         * rename/move extract_dir to final_dir
 
     After this, there should be NO lingering '*_extracted' dirs.
+
+    Returns the `written` paths as they are after the move.
     """
     if extract_dir == final_dir:
         debug_print(f"[finalize] extract_dir == final_dir == {final_dir}, nothing to do")
-        return
+        return written
 
     debug_print(f"[finalize] Moving {extract_dir} -> {final_dir}")
     if final_dir.exists():
@@ -272,18 +400,32 @@ def _finalize_extract_dir(extract_dir: Path, final_dir: Path) -> None:
             shutil.rmtree(final_dir)
 
     # Now move/rename the extracted directory into place
+    resolved_extract_dir = extract_dir.resolve()
     extract_dir.rename(final_dir)
 
+    final_dir = final_dir.resolve()
+    return [final_dir / w.relative_to(resolved_extract_dir) for w in written]
+
 
-def extract_multi(src_file: Path, dest_root: Path, rel_path: Path) -> None:
+def extract_multi(src_file: Path, dest_root: Path, rel_path: Path) -> List[Path]:
     """
-    Extract a multi-file archive.
+    Extract a multi-file archive and return the files it produced.
 
     - Normal archives: .zip, .tar, .tar.gz, etc.
     - Hash-named image layers (no extension, hex name under sha256): treated
       as tar streams via tarfile.open(..., "r:*") directly.
     """
     debug_print(f"[extract_multi] {src_file} (rel={rel_path})")
+
+    # Container images: only the final filesystem after applying the layers
+    if Config.image_layer_aware and image_layer_extractor.is_image(src_file):
+        debug_print(f"[extract_multi] Image detected: {src_file}")
+        written = image_layer_extractor.extract_image(src_file, dest_root, rel_path)
+        if written:
+            return written
+        # Nothing came out of the layers, keep the image's content as a plain tar
+        logger.info(f"[extract_multi] No files extracted from image {src_file}, extracting it as a plain tar")
+
     default_dir_rel = strip_multi_suffix(rel_path)
     base_name = default_dir_rel.name
 
@@ -320,29 +462,32 @@ def extract_multi(src_file: Path, dest_root: Path, rel_path: Path) -> None:
                 final_dir = target_dir_candidate
 
             extract_dir.mkdir(parents=True, exist_ok=True)
-            safe_extract_zip(zf, extract_dir)
-        _finalize_extract_dir(extract_dir, final_dir)
-        return
+            written = safe_extract_zip(zf, extract_dir)
+        return _finalize_extract_dir(extract_dir, final_dir, written)
 
-    # TAR (covers .tar, .tar.gz, and hash layer blobs)
+    # TAR (covers .tar, .tar.gz, and hash layer blobs), read in a single
+    # sequential pass: flattening is decided from the first member instead of
+    # listing every member first, which for compressed tars meant
+    # decompressing them twice
     try:
         debug_print(f"[extract_multi] Trying TAR: {archive_src}")
-        with tarfile.open(archive_src, mode="r:*") as tf:
-            names = [m.name for m in tf.getmembers() if m.name]
-            top_levels = set(
-                n.split("/", 1)[0].rstrip("/")
-                for n in names
-                if n and n not in (".", "/")
-            )
-
-            target_dir_rel = default_dir_rel
-            if len(top_levels) == 1:
-                only = next(iter(top_levels))
-                if only == base_name:
-                    debug_print("[extract_multi] Flattening TAR top-level dir")
-                    target_dir_rel = default_dir_rel.parent
+        with tarfile.open(archive_src, mode="r|*") as tf:
+            if _peek_tar_top_level(tf) == base_name:
+                # Flattening would write into the shared parent directory before
+                # the last member confirms it, so extract to a private staging
+                # directory and move the result into place once it is decided
+                debug_print("[extract_multi] Flattening TAR top-level dir")
+                final_dir = dest_root / default_dir_rel
+                final_dir.parent.mkdir(parents=True, exist_ok=True)
+                staging = Path(tempfile.mkdtemp(prefix=".extract_", dir=final_dir.parent))
+                try:
+                    written, flatten = _stream_extract_tar(tf, staging, base_name)
+                    staged_dir = staging / base_name if flatten else staging
+                    return _move_staged_extraction(staged_dir, final_dir, written)
+                finally:
+                    shutil.rmtree(staging, ignore_errors=True)
 
-            target_dir_candidate = dest_root / target_dir_rel
+            target_dir_candidate = dest_root / default_dir_rel
 
             if src_file.resolve() == target_dir_candidate.resolve():
                 # Hash-layer in-place: extract to temp dir, then replace the file.
@@ -355,11 +500,10 @@ def extract_multi(src_file: Path, dest_root: Path, rel_path: Path) -> None:
                 final_dir = target_dir_candidate
 
             extract_dir.mkdir(parents=True, exist_ok=True)
-            safe_extract_tar(tf, extract_dir)
-        _finalize_extract_dir(extract_dir, final_dir)
-        return
+            written = safe_extract_tar(tf, extract_dir)
+        return _finalize_extract_dir(extract_dir, final_dir, written)
 
-    except (tarfile.ReadError, OSError, FileNotFoundError) as e:
+    except (tarfile.ReadError, tarfile.StreamError, OSError, FileNotFoundError) as e:
         logger.error(f"[extract_multi] Not a TAR or error reading {archive_src}: {e}")
         debug_print(f"[extract_multi] Not a TAR or error reading {archive_src}: {e}")
 
@@ -368,17 +512,20 @@ def extract_multi(src_file: Path, dest_root: Path, rel_path: Path) -> None:
     if dest_file != src_file:
         debug_print(f"[extract_multi] Fallback copy {src_file} -> {dest_file}")
         dest_file.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(src_file, dest_file)
+        content_store.copy_file(src_file, dest_file)
+        return [dest_file]
+    return []
 
 
 # ---------- Copy / nested extraction pipeline ----------
 
-def copy_or_extract_file(src_file: Path, dest_root: Path, rel_path: Path) -> None:
+def copy_or_extract_file(src_file: Path, dest_root: Path, rel_path: Path) -> List[Path]:
     """
-    Handle a single file during the initial copy phase.
+    Handle a single file during the initial copy phase and return the files
+    it produced.
     """
     if not src_file.is_file():
-        return
+        return []
 
     kind = classify(src_file)
 
@@ -386,29 +533,141 @@ def copy_or_extract_file(src_file: Path, dest_root: Path, rel_path: Path) -> Non
         dest_file = dest_root / rel_path
         debug_print(f"[copy_or_extract] Copy (none): {src_file} -> {dest_file}")
         dest_file.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(src_file, dest_file)
+        content_store.copy_file(src_file, dest_file)
+        return [dest_file]
 
     elif kind == "single":
         dest_rel = rel_path.with_suffix("")  # drop only final extension
         dest_file = dest_root / dest_rel
         debug_print(f"[copy_or_extract] Decompress (single): {src_file} -> {dest_file}")
-        decompress_single(src_file, dest_file)
+        return decompress_single(src_file, dest_file)
 
     else:  # "multi"
         debug_print(f"[copy_or_extract] Extract (multi): {src_file}")
-        extract_multi(src_file, dest_root, rel_path)
+        return extract_multi(src_file, dest_root, rel_path)
+
+
+def extract_nested_file(abs_path: Path, dest_root: Path, kind: str) -> List[Path]:
+    """
+    Extract an archive/compressed file that lives inside dest_root in-place,
+    remove it, and return the files it produced.
+    """
+    if not abs_path.is_file():
+        return []
+
+    rel_path = abs_path.relative_to(dest_root)
+    debug_print(f"[extract_nested_file] {kind} -> {abs_path}")
 
+    if kind == "single":
+        dest_rel = rel_path.with_suffix("")
+        produced = decompress_single(abs_path, dest_root / dest_rel)
+    else:  # "multi"
+        produced = extract_multi(abs_path, dest_root, rel_path)
+
+    if abs_path.exists() and abs_path.is_file():
+        try:
+            debug_print(f"[extract_nested_file] unlink {abs_path}")
+            abs_path.unlink()
+        except PermissionError as e:
+            logger.error(f"[extract_nested_file] unlink failed: {e}")
+            debug_print(f"[extract_nested_file] unlink failed: {e}")
+
+    return [p for p in produced if p != abs_path]
+
+
+def _resolve_extraction_workers(max_workers: Optional[int]) -> int:
+    if max_workers is None:
+        max_workers = Config.extraction_workers
+    if max_workers <= 0:
+        # Extraction is mostly I/O and zlib/bz2/lzma work, which release the GIL
+        max_workers = min(32, (os.cpu_count() or 1) + 4)
+    return max_workers
+
+
+def run_extraction_tasks(
+    tasks: List[Tuple[Callable[..., List[Path]], tuple]],
+    dest_root: Path,
+    max_workers: Optional[int] = None,
+    manifest: Optional[ExtractionManifest] = None,
+    sources: Optional[List[Tuple[Path, Path]]] = None,
+) -> None:
+    """
+    Run extraction tasks on a worker pool. Each task returns the files it
+    produced; produced archives/compressed files are queued for in-place
+    extraction right away, so independent archives (image layers, nested
+    JARs, ...) decompress concurrently and no pass over the tree is needed.
+
+    With a manifest, `sources` gives the (source file, relative path) of each
+    task, and a source is journaled with its final files as soon as its task
+    and all the nested extraction it led to are done.
+    """
+    max_workers = _resolve_extraction_workers(max_workers)
+    debug_print(f"[run_extraction_tasks] {len(tasks)} tasks, {max_workers} workers")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Index of the task each future descends from, that task's unfinished
+        # futures and the final (non-archive) files it produced so far
+        task_of: Dict[Future, int] = {}
+        outstanding: Dict[int, int] = {}
+        final_files: Dict[int, List[Path]] = {}
+        for i, (fn, args) in enumerate(tasks):
+            task_of[executor.submit(fn, *args)] = i
+            outstanding[i] = 1
+            final_files[i] = []
+        pending = set(task_of)
+        error: Optional[BaseException] = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = task_of.pop(future)
+                try:
+                    produced_files = future.result()
+                except Exception as e:
+                    # Let the other sources finish (and be journaled) before failing;
+                    # this one stays unjournaled so a resumed run redoes it
+                    logger.error(f"[run_extraction_tasks] Extraction task failed: {e}")
+                    if error is None:
+                        error = e
+                    continue
 
-def copy_tree_with_extraction(src: Path, dest_root: Path) -> None:
+                for produced in produced_files:
+                    kind = classify(produced)
+                    if kind != "none":
+                        nested = executor.submit(extract_nested_file, produced, dest_root, kind)
+                        task_of[nested] = i
+                        outstanding[i] += 1
+                        pending.add(nested)
+                    else:
+                        final_files[i].append(produced)
+
+                outstanding[i] -= 1
+                if outstanding[i] == 0:
+                    files = final_files.pop(i)
+                    if manifest is not None:
+                        src_file, rel_path = sources[i]
+                        manifest.record(src_file, rel_path, files)
+
+    if error is not None:
+        raise error
+
+
+def copy_tree_with_extraction(src: Path, dest_root: Path, max_workers: Optional[int] = None,
+                              manifest: Optional[ExtractionManifest] = None) -> None:
     """
     Copy a directory from src to dest_root, extracting archives/compressed files
-    encountered in src.
+    encountered in src and, recursively, the archives they contain. Files the
+    manifest has journaled as done are skipped.
     """
     if not src.is_dir():
         logger.error(f"Source {src} is not a directory")
         raise ValueError(f"Source {src} is not a directory")
 
+    dest_root = Path(dest_root).resolve()
     debug_print(f"[copy_tree_with_extraction] Walking {src}")
+    tasks: List[Tuple[Callable[..., List[Path]], tuple]] = []
+    sources: List[Tuple[Path, Path]] = []
+    skipped_count = 0
     for dirpath, dirnames, filenames in os.walk(src):
         dirpath = Path(dirpath)
         rel_dir = dirpath.relative_to(src)
@@ -422,81 +681,36 @@ def copy_tree_with_extraction(src: Path, dest_root: Path) -> None:
             else:
                 rel_path = rel_dir / filename
 
+            if manifest is not None and manifest.is_done(src_file, rel_path):
+                skipped_count += 1
+                continue
+
             debug_print(f"[copy_tree_with_extraction] File: {src_file}, rel={rel_path}")
-            copy_or_extract_file(src_file, dest_root, rel_path)
+            tasks.append((copy_or_extract_file, (src_file, dest_root, rel_path)))
+            sources.append((src_file, rel_path))
 
+    if skipped_count:
+        logger.info(f"[copy_tree_with_extraction] Skipping {skipped_count} files extracted by an earlier run")
+    run_extraction_tasks(tasks, dest_root, max_workers, manifest, sources)
 
-def extract_nested_archives(dest_root: Path) -> None:
-    """
-    Repeatedly scan dest_root for archive/compressed files and extract them
-    in-place until no more remain.
 
-    Each physical file path is processed at most once.
+def extract_nested_archives(dest_root: Path, max_workers: Optional[int] = None) -> None:
     """
-    processed = set()  # resolved absolute paths we've already processed
-    pass_num = 0
-
-    while True:
-        pass_num += 1
-        debug_print(f"[extract_nested_archives] Pass {pass_num} starting")
-        changed = False
-
-        for dirpath, dirnames, filenames in os.walk(dest_root):
-            dirpath = Path(dirpath)
-
-            for filename in filenames:
-                abs_path = dirpath / filename
-
-                # Resolve to a canonical key; skip if we can't resolve
-                try:
-                    key = str(abs_path.resolve())
-                except FileNotFoundError:
-                    logger.error(f"Failed to resolve path to a canonical key for path: {abs_path}")
-                    continue
-
-                # Don't process same file path more than once across passes
-                if key in processed:
-                    continue
-
-                processed.add(key)
-
-                if not abs_path.is_file():
-                    continue
+    Extract every archive/compressed file already under dest_root in-place,
+    including the archives they produce, until none remain.
+    """
+    dest_root = Path(dest_root).resolve()
+    tasks: List[Tuple[Callable[..., List[Path]], tuple]] = []
 
-                kind = classify(abs_path)
-                if kind == "none":
-                    continue
+    for dirpath, dirnames, filenames in os.walk(dest_root):
+        dirpath = Path(dirpath)
+        for filename in filenames:
+            abs_path = dirpath / filename
+            kind = classify(abs_path)
+            if kind != "none":
+                tasks.append((extract_nested_file, (abs_path, dest_root, kind)))
 
-                rel_path = abs_path.relative_to(dest_root)
-                debug_print(f"[extract_nested_archives] {kind} -> {abs_path}")
-
-                if kind == "single":
-                    dest_rel = rel_path.with_suffix("")
-                    dest_file = dest_root / dest_rel
-                    decompress_single(abs_path, dest_file)
-                    if abs_path.exists() and abs_path.is_file():
-                        try:
-                            debug_print(f"[extract_nested_archives] unlink {abs_path}")
-                            abs_path.unlink()
-                        except PermissionError as e:
-                            logger.error(f"[extract_nested_archives] unlink failed: {e}")
-                            debug_print(f"[extract_nested_archives] unlink failed: {e}")
-                    changed = True
-
-                else:  # "multi"
-                    extract_multi(abs_path, dest_root, rel_path)
-                    if abs_path.exists() and abs_path.is_file():
-                        try:
-                            debug_print(f"[extract_nested_archives] unlink {abs_path}")
-                            abs_path.unlink()
-                        except PermissionError as e:
-                            logger.error(f"[extract_nested_archives] unlink failed: {e}")
-                            debug_print(f"[extract_nested_archives] unlink failed: {e}")
-                    changed = True
-
-        debug_print(f"[extract_nested_archives] Pass {pass_num} changed={changed}")
-        if not changed:
-            break
+    run_extraction_tasks(tasks, dest_root, max_workers)
 
 
 # ---------- CLI ----------
@@ -510,32 +724,66 @@ def create_assessment_from_source(source_project_dir, dest_assessment_dir) -> No
         source_project_dir.is_file(),
     )
 
-    if source_project_dir.is_dir():
-        # Normal directory: copy + first-level extraction, then nested extraction
-        copy_tree_with_extraction(source_project_dir, dest_assessment_dir)
-        #rel_path = Path(source_dir.name)
-        #target_dir_rel = strip_multi_suffix(rel_path)
-        #target_dir = dest_dir / target_dir_rel
-        # Second phase: extract all nested archives/compressed files in-place
-        extract_nested_archives(dest_assessment_dir)
-
-    elif source_project_dir.is_file():
-        # Top-level is a single file (could be archive/compressed/normal):
-        # Treat it as if it were a file inside a virtual root and process it,
-        # then run nested extraction on whatever it produced.
-        rel_path = Path(source_project_dir.name)
-        copy_or_extract_file(source_project_dir, dest_assessment_dir, rel_path)
-        #target_dir_rel = strip_multi_suffix(rel_path)
-        #target_dir = dest_assessment_dir / target_dir_rel
-        # Second phase: extract all nested archives/compressed files in-place
-        extract_nested_archives(dest_assessment_dir)
+    dest_root = Path(dest_assessment_dir).resolve()
 
-    else:
-        logger.error(f"Source path {source_project_dir} is neither a file nor a directory")
-        raise ValueError(f"Source path {source_project_dir} is neither a file nor a directory")
+    # Journal finished sources so an interrupted extraction can resume
+    manifest = None
+    if Config.resumable_extraction:
+        manifest = ExtractionManifest(dest_root, source_project_dir, fresh=Config.overwrite_dest)
+
+    try:
+        if source_project_dir.is_dir() and Config.image_layer_aware and image_layer_extractor.is_image(source_project_dir):
+            # Unpacked image layout (manifest.json/index.json + blobs)
+            _run_single_source_task(image_layer_extractor.extract_image,
+                                    (source_project_dir, dest_root, Path(source_project_dir.name)),
+                                    source_project_dir, dest_root, manifest)
+
+        elif source_project_dir.is_dir():
+            # Normal directory: copy + first-level extraction, nested archives are
+            # extracted as soon as they are produced
+            copy_tree_with_extraction(source_project_dir, dest_root, manifest=manifest)
+            #rel_path = Path(source_dir.name)
+            #target_dir_rel = strip_multi_suffix(rel_path)
+            #target_dir = dest_dir / target_dir_rel
+
+        elif source_project_dir.is_file():
+            # Top-level is a single file (could be archive/compressed/normal):
+            # Treat it as if it were a file inside a virtual root and process it,
+            # then run nested extraction on whatever it produced.
+            rel_path = Path(source_project_dir.name)
+            _run_single_source_task(copy_or_extract_file, (source_project_dir, dest_root, rel_path),
+                                    source_project_dir, dest_root, manifest)
+            #target_dir_rel = strip_multi_suffix(rel_path)
+            #target_dir = dest_assessment_dir / target_dir_rel
+
+        else:
+            logger.error(f"Source path {source_project_dir} is neither a file nor a directory")
+            raise ValueError(f"Source path {source_project_dir} is neither a file nor a directory")
 
-    # Second phase: extract all nested archives/compressed files in-place
-    # extract_nested_archives(dest_dir)
+        # Second phase: extract all nested archives/compressed files in-place
+        # extract_nested_archives(dest_dir)
+
+        if Config.content_addressed_extraction:
+            # Blobs of extracted-then-removed archives are linked from nowhere now
+            store = content_store.get_content_store()
+            pruned = store.prune()
+            logger.info(f"Content store: {store.stored_count} stored, {store.deduplicated_count} deduplicated, "
+                        f"{pruned} unreferenced blobs removed")
+
+        if manifest is not None:
+            manifest.mark_complete()
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+
+def _run_single_source_task(fn: Callable[..., List[Path]], args: tuple, source: Path, dest_root: Path,
+                            manifest: Optional[ExtractionManifest]) -> None:
+    rel_path = Path(source.name)
+    if manifest is not None and manifest.is_done(source, rel_path):
+        logger.info(f"Skipping {source}, extracted by an earlier run")
+        return
+    run_extraction_tasks([(fn, args)], dest_root, manifest=manifest, sources=[(source, rel_path)])
 
 
 if __name__ == "__main__":
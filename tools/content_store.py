@@ -0,0 +1,153 @@
+from configuration import Configuration as Config
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+
+CONTENT_STORE_DIR_NAME = ".content_store"
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class ContentStore:
+    """
+    Content-addressed store for extracted files. Each unique content is
+    written once to objects/<hash[:2]>/<hash> and every extracted path is a
+    hardlink to it (or a copy, where hardlinks aren't supported). Content is
+    hashed while it is written, and the hash of every stored file is kept by
+    (device, inode) so the reader can take it instead of hashing again.
+    """
+
+    def __init__(self, root: Path, hash_algorithm: Optional[str] = None):
+        self.root = Path(root)
+        self.hash_algorithm = hash_algorithm or Config.file_hash_algorithm
+        self.objects_dir = self.root / "objects"
+        self.tmp_dir = self.root / "tmp"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._hashes: Dict[Tuple[int, int], str] = {}
+        self._lock = threading.Lock()
+        self.stored_count = 0
+        self.deduplicated_count = 0
+
+    def _blob_path(self, file_hash: str) -> Path:
+        return self.objects_dir / file_hash[:2] / file_hash
+
+    def _remember(self, path: Path, file_hash: str) -> None:
+        st = os.stat(path)
+        self._hashes[(st.st_dev, st.st_ino)] = file_hash
+
+    def lookup_hash(self, st: os.stat_result) -> Optional[str]:
+        """Hash of the stored file with this stat result, None if it wasn't stored here."""
+        return self._hashes.get((st.st_dev, st.st_ino))
+
+    def write(self, src_f: BinaryIO, dest: Path) -> str:
+        """
+        Store the content of src_f and link it at dest, replacing whatever is
+        there without modifying it (other paths may share its inode).
+        Returns the content hash.
+        """
+        h = hashlib.new(self.hash_algorithm)
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as tmp_f:
+                while True:
+                    chunk = src_f.read(_COPY_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    tmp_f.write(chunk)
+            file_hash = h.hexdigest()
+
+            blob = self._blob_path(file_hash)
+            with self._lock:
+                if blob.exists():
+                    tmp_path.unlink()
+                    self.deduplicated_count += 1
+                    if self.lookup_hash(os.stat(blob)) is None:
+                        # Stored by an earlier run
+                        self._remember(blob, file_hash)
+                else:
+                    blob.parent.mkdir(exist_ok=True)
+                    os.replace(tmp_path, blob)
+                    self.stored_count += 1
+                    self._remember(blob, file_hash)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        self._link(blob, dest, file_hash)
+        return file_hash
+
+    def _link(self, blob: Path, dest: Path, file_hash: str) -> None:
+        # Link under a temporary name first, then atomically replace dest
+        fd, tmp_name = tempfile.mkstemp(dir=dest.parent, prefix=".link_")
+        os.close(fd)
+        os.unlink(tmp_name)
+        try:
+            os.link(blob, tmp_name)
+        except OSError:
+            # No hardlinks here (e.g. another volume or a network share): record a copy instead
+            shutil.copyfile(blob, tmp_name)
+            self._remember(Path(tmp_name), file_hash)
+        os.replace(tmp_name, dest)
+
+    def prune(self) -> int:
+        """Remove blobs no extracted path links to anymore. Returns the count removed."""
+        removed = 0
+        with self._lock:
+            for blob in self.objects_dir.glob("*/*"):
+                try:
+                    st = os.stat(blob)
+                    if st.st_nlink > 1:
+                        continue
+                    blob.unlink()
+                except OSError:
+                    continue
+                # The inode may be reused by a new file
+                self._hashes.pop((st.st_dev, st.st_ino), None)
+                removed += 1
+        return removed
+
+
+_content_store: Optional[ContentStore] = None
+_content_store_lock = threading.Lock()
+
+
+def get_content_store() -> ContentStore:
+    """The store next to the assessments in DEST_DIR, so hardlinks stay on one filesystem."""
+    global _content_store
+    with _content_store_lock:
+        if _content_store is None:
+            _content_store = ContentStore(Path(Config.dest_assessment_dir).parent / CONTENT_STORE_DIR_NAME)
+        return _content_store
+
+
+def lookup_hash(st: os.stat_result) -> Optional[str]:
+    """Hash of a file extracted through the store in this process, if any."""
+    if _content_store is None:
+        return None
+    return _content_store.lookup_hash(st)
+
+
+def write_stream(src_f: BinaryIO, dest: Path) -> None:
+    """Write src_f to dest, through the content store if CONTENT_ADDRESSED_EXTRACTION is on."""
+    if Config.content_addressed_extraction:
+        get_content_store().write(src_f, dest)
+        return
+    with open(dest, "wb") as dst_f:
+        shutil.copyfileobj(src_f, dst_f)
+
+
+def copy_file(src_file: Path, dest_file: Path) -> None:
+    """shutil.copy2, or a store write if CONTENT_ADDRESSED_EXTRACTION is on."""
+    if Config.content_addressed_extraction:
+        with open(src_file, "rb") as src_f:
+            get_content_store().write(src_f, dest_file)
+        return
+    shutil.copy2(src_file, dest_file)
@@ -0,0 +1,178 @@
+from configuration import Configuration as Config
+from loggers.assessment_extractor_logger import assessment_extractor_logger as logger
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+MANIFEST_VERSION = 1
+
+MANIFEST_SUFFIX = ".extraction_manifest.jsonl"
+
+# Bytes hashed at each end of a source file for its fingerprint
+_FINGERPRINT_CHUNK_SIZE = 1024 * 1024
+
+
+def get_manifest_path(dest_root: Path) -> Path:
+    """The manifest sits next to the assessment directory so the reader never sees it."""
+    dest_root = Path(dest_root)
+    return dest_root.with_name(dest_root.name + MANIFEST_SUFFIX)
+
+
+def compute_source_fingerprint(path: Path) -> Optional[str]:
+    """
+    Hash of a source file's size, first and last MiB. Files up to 2 MiB are
+    hashed whole; for bigger ones this avoids reading e.g. a 40 GB image a
+    second time just to journal it. None for directories.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return None
+
+    h = hashlib.new(Config.file_hash_algorithm)
+    size = path.stat().st_size
+    h.update(str(size).encode("ascii"))
+    with open(path, "rb") as f:
+        if size <= 2 * _FINGERPRINT_CHUNK_SIZE:
+            h.update(f.read())
+        else:
+            h.update(f.read(_FINGERPRINT_CHUNK_SIZE))
+            f.seek(-_FINGERPRINT_CHUNK_SIZE, os.SEEK_END)
+            h.update(f.read(_FINGERPRINT_CHUNK_SIZE))
+    return h.hexdigest()
+
+
+def _source_stat(path: Path) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class ExtractionManifest:
+    """
+    Append-only journal of an extraction into dest_root. Every top-level
+    source file (and everything nested in it) is journaled once it is fully
+    extracted, with the source's size, mtime and fingerprint and the files it
+    produced; a final record marks the whole extraction complete.
+
+    Restarting an incomplete extraction skips sources that are journaled and
+    unchanged (same size and mtime) and redoes the rest. A torn last line
+    from a crash is ignored.
+    """
+
+    def __init__(self, dest_root: Path, source: Path, fresh: bool = False):
+        self.dest_root = Path(dest_root).resolve()
+        self.source = Path(source)
+        self.path = get_manifest_path(self.dest_root)
+        self.entries: Dict[str, dict] = {}
+        self.complete = False
+
+        header = None
+        # A manifest without its assessment directory is stale
+        if not fresh and self.dest_root.is_dir() and self.path.is_file():
+            header, self.entries, self.complete = _read_journal(self.path)
+        if header is None or header.get("version") != MANIFEST_VERSION or header.get("source") != str(self.source):
+            self.entries = {}
+            self.complete = False
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.path, "w", encoding="utf-8", buffering=1)
+            self._append({"type": "header", "version": MANIFEST_VERSION, "source": str(self.source)})
+        else:
+            self._f = open(self.path, "a", encoding="utf-8", buffering=1)
+            if self.complete:
+                # Extracting again, e.g. a newer source: journal on top of the finished run
+                self.complete = False
+                self._append({"type": "incomplete"})
+
+    def __enter__(self) -> "ExtractionManifest":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def _append(self, record: dict) -> None:
+        # Line buffered: every record is written out as soon as it is complete,
+        # so it survives the process dying
+        self._f.write(json.dumps(record) + "\n")
+
+    def is_done(self, src_file: Path, rel_path: Path) -> bool:
+        """True if src_file was extracted completely and hasn't changed since."""
+        entry = self.entries.get(Path(rel_path).as_posix())
+        if entry is None:
+            return False
+        try:
+            stat = _source_stat(src_file)
+        except OSError:
+            return False
+        return entry["size"] == stat["size"] and entry["mtime_ns"] == stat["mtime_ns"]
+
+    def record(self, src_file: Path, rel_path: Path, produced: List[Path]) -> None:
+        """Journal src_file as fully extracted into `produced`."""
+        entry = {
+            "type": "source",
+            "path": Path(rel_path).as_posix(),
+            **_source_stat(src_file),
+            "hash": compute_source_fingerprint(src_file),
+            "files": [Path(p).relative_to(self.dest_root).as_posix() for p in produced],
+        }
+        self._append(entry)
+        self.entries[entry["path"]] = entry
+
+    def mark_complete(self) -> None:
+        self._append({"type": "complete", "file_count": sum(len(e["files"]) for e in self.entries.values())})
+        self.complete = True
+
+
+def _read_journal(path: Path):
+    header = None
+    entries: Dict[str, dict] = {}
+    complete = False
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.info(f"[manifest] Ignoring torn line in {path}")
+                continue
+            record_type = record.get("type")
+            if record_type == "header":
+                header = record
+            elif record_type == "source":
+                entries[record["path"]] = record
+            elif record_type == "complete":
+                complete = True
+            elif record_type == "incomplete":
+                complete = False
+
+    return header, entries, complete
+
+
+def is_extraction_incomplete(dest_root: Path) -> bool:
+    """True if an extraction into dest_root was started but never finished."""
+    path = get_manifest_path(Path(dest_root).resolve())
+    if not path.is_file():
+        return False
+    header, entries, complete = _read_journal(path)
+    return not complete
+
+
+def load_file_listing(dest_root: Path) -> Optional[List[Path]]:
+    """
+    The files of a completed extraction as recorded in its manifest, rooted
+    at dest_root, or None if there is no complete manifest.
+    """
+    dest_root = Path(dest_root)
+    path = get_manifest_path(dest_root.resolve())
+    if not path.is_file():
+        return None
+    header, entries, complete = _read_journal(path)
+    if not complete:
+        return None
+    # Sources extracting into the same directory may list a file twice
+    names = dict.fromkeys(name for entry in entries.values() for name in entry["files"])
+    return [Path(dest_root, name) for name in names]
@@ -1,8 +1,11 @@
 import utils
 import re
+from array import array
 from pathlib import Path
 from typing import List, Dict, Tuple, Any, Union, Optional
+from collections import defaultdict
 from dataclasses import dataclass
+from optimized import token_vocabulary
 
 
 WORD_RE = re.compile(r"\S+")
@@ -21,8 +24,19 @@ class PatternIndex:
     source_path: Path  # the key from Dict[Path, str]
     text: str          # the pattern string (stringB)
     tokens: List[str]
-    anchor_positions: Dict[Tuple[str, str, str, str], List[int]]
+    token_ids: array   # tokens interned in token_vocabulary.VOCABULARY
+    anchor_positions: Dict[int, List[int]]  # packed anchor key -> positions
     anchor_keys: set
+    license_name: Optional[str] = None             # from utils.get_file_name_from_path_without_extension
+    expected_versions: Optional[List[str]] = None  # from utils.extract_versions_from_name(license_name)
+
+
+@dataclass
+class AnchorPostings:
+    # packed anchor key -> [(pattern id, position in pattern)], pattern id indexes `patterns`
+    postings: Dict[int, List[Tuple[int, int]]]
+    patterns: List[PatternIndex]
+    anchor_size: int
 
 
 @dataclass
@@ -99,6 +113,9 @@ def build_pattern_indexes_from_dict(
         text = _ensure_text(content)
         raw_tokens = [m.group(0) for m in WORD_RE.finditer(text)]
         tokens = [w.lower() for w in raw_tokens]
+        token_ids = token_vocabulary.VOCABULARY.intern_all(tokens)
+        license_name = utils.get_file_name_from_path_without_extension(path)
+        expected_versions = utils.extract_versions_from_name(license_name)
 
         if len(tokens) < anchor_size:
             pattern_indexes.append(
@@ -106,25 +123,54 @@ def build_pattern_indexes_from_dict(
                     source_path=path,
                     text=text,
                     tokens=tokens,
+                    token_ids=token_ids,
                     anchor_positions={},
                     anchor_keys=set(),
+                    license_name=license_name,
+                    expected_versions=expected_versions,
                 )
             )
             continue
 
-        anchor_positions: Dict[Tuple[str, str, str, str], List[int]] = {}
-        for j in range(len(tokens) - anchor_size + 1):
-            anchor = tuple(tokens[j + k] for k in range(anchor_size))
-            anchor_positions.setdefault(anchor, []).append(j)
+        anchor_positions = dict(token_vocabulary.pack_anchor_positions(token_ids, anchor_size))
 
         pattern_indexes.append(
             PatternIndex(
                 source_path=path,
                 text=text,
                 tokens=tokens,
+                token_ids=token_ids,
                 anchor_positions=anchor_positions,
                 anchor_keys=set(anchor_positions.keys()),
+                license_name=license_name,
+                expected_versions=expected_versions,
             )
         )
 
     return pattern_indexes
+
+
+def build_anchor_postings(
+    pattern_indexes: List[PatternIndex],
+    anchor_size: int = 3,
+) -> AnchorPostings:
+    """
+    Build one inverted index over all pattern anchors:
+        anchor -> [(pattern_id, position), ...]
+
+    A file's anchors can then be probed once against every pattern instead of
+    intersecting the file's anchor set with each pattern's anchor set.
+    """
+    postings: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+
+    for pattern_id, p in enumerate(pattern_indexes):
+        for anchor, positions in p.anchor_positions.items():
+            posting_list = postings[anchor]
+            for j in positions:
+                posting_list.append((pattern_id, j))
+
+    return AnchorPostings(
+        postings=dict(postings),
+        patterns=pattern_indexes,
+        anchor_size=anchor_size,
+    )
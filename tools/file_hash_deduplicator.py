@@ -0,0 +1,64 @@
+from configuration import Configuration as Config
+from models.FileData import FileData
+from typing import Dict, Iterable, List
+
+
+def group_file_data_by_hash(file_data_list: Iterable[FileData]) -> Dict[str, List[FileData]]:
+    """
+    Groups FileData items by file_hash, keeping the first item seen for each
+    hash first in its group. Items without a hash are grouped by their path so
+    they are always analyzed on their own.
+    """
+    groups: Dict[str, List[FileData]] = {}
+
+    for fd in file_data_list:
+        key = fd.file_hash or f"path:{fd.file_path}"
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [fd]
+        else:
+            group.append(fd)
+
+    return groups
+
+
+def get_unique_file_data(groups: Dict[str, List[FileData]]) -> List[FileData]:
+    """Returns one representative FileData per unique content."""
+    return [group[0] for group in groups.values()]
+
+
+def copy_analysis_results(source: FileData, target: FileData) -> None:
+    """
+    Copies everything the license/keyword searches produce from `source` to
+    `target`. Lists are copied so later per-path edits don't leak across files.
+    """
+    target.license_matches = list(source.license_matches)
+    target.license_names = list(source.license_names)
+    target.license_match_strength = source.license_match_strength
+    target.has_full_license = source.has_full_license
+    target.fuzzy_license_matches = list(source.fuzzy_license_matches)
+    target.fuzzy_license_match = source.fuzzy_license_match
+    target.fuzzy_license_match_location = source.fuzzy_license_match_location
+    target.fuzzy_search_windowed = source.fuzzy_search_windowed
+    target.keyword_matches = source.keyword_matches
+
+
+def fan_out_analysis_results(groups: Dict[str, List[FileData]]) -> int:
+    """
+    Copies the results of each group's representative to the rest of the
+    group. Returns the number of duplicate files that were filled in.
+    """
+    duplicate_count = 0
+
+    for group in groups.values():
+        source = group[0]
+        for duplicate in group[1:]:
+            copy_analysis_results(source, duplicate)
+            duplicate_count += 1
+
+    return duplicate_count
+
+
+if __name__ == "__main__":
+    file_data_groups = group_file_data_by_hash(Config.file_data_manager.get_all_file_data())
+    print(f"Unique file contents: {len(file_data_groups)}")
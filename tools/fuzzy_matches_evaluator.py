@@ -1,7 +1,8 @@
 from configuration import Configuration as Config
 from search.fuzzy_license_search import MatchResult
 from collections import defaultdict, Counter
-from typing import Dict, List
+from models.FileData import FileData
+from typing import Dict, List, Optional
 
 
 def is_match_percent_greater_than_all(fuzzy_license_match, best_fuzzy_matches):
@@ -12,8 +13,10 @@ def is_match_percent_greater_than_all(fuzzy_license_match, best_fuzzy_matches):
 
     return match_percent_is_greater_than_all
 
-def determine_best_fuzzy_matches_from_file_data():
-    for file_data in Config.file_data_manager.get_all_file_data():
+def determine_best_fuzzy_matches_from_file_data(file_data_list: Optional[List[FileData]] = None):
+    if file_data_list is None:
+        file_data_list = Config.file_data_manager.get_all_file_data()
+    for file_data in file_data_list:
         all_version_matches = []
         common_version_matches = []
         no_version_matches = []
@@ -101,6 +104,10 @@ def determine_best_fuzzy_matches_from_file_data():
             #file_data.fuzzy_license_match.append(best_no_version_match)
             file_data.fuzzy_license_match = best_no_version_match
 
+        if Config.offset_maps and file_data.fuzzy_license_match is not None:
+            # Located once, while the content is at hand; only the span is kept
+            file_data.fuzzy_license_match_location = file_data.locate_fuzzy_license_match()
+
 
 
 
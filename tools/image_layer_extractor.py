@@ -0,0 +1,293 @@
+from configuration import Configuration as Config
+from loggers.assessment_extractor_logger import assessment_extractor_logger as logger
+from tools import content_store
+import json
+import os
+import posixpath
+import tarfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+
+WHITEOUT_PREFIX = ".wh."
+OPAQUE_WHITEOUT = ".wh..wh..opq"
+
+_OCI_INDEX_MEDIA_TYPES = {
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+}
+
+
+class ImageLayout:
+    """
+    A docker-save or OCI image layout, either as a directory or as a tar
+    file. Blobs are opened in place, nothing is extracted.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._tar: Optional[tarfile.TarFile] = None
+        # Tar members by normalized name, so "./manifest.json" is found as "manifest.json"
+        self._members: Dict[str, tarfile.TarInfo] = {}
+        if not self.path.is_dir():
+            self._tar = tarfile.open(self.path, mode="r:*")
+            for member in self._tar.getmembers():
+                name = _normalize_member_name(member.name)
+                if name is not None:
+                    self._members[name] = member
+
+    def __enter__(self) -> "ImageLayout":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+
+    def exists(self, name: str) -> bool:
+        if self._tar is None:
+            return Path(self.path, name).is_file()
+        member = self._members.get(_normalize_member_name(name))
+        return member is not None and member.isreg()
+
+    def open(self, name: str) -> BinaryIO:
+        if self._tar is None:
+            return open(Path(self.path, name), "rb")
+        member = self._members.get(_normalize_member_name(name))
+        f = self._tar.extractfile(member) if member is not None else None
+        if f is None:
+            raise FileNotFoundError(f"{name} is not a file in {self.path}")
+        return f
+
+    def read_json(self, name: str):
+        with self.open(name) as f:
+            return json.load(f)
+
+    def layer_names(self) -> List[str]:
+        """
+        Layer blob names from bottom to top, from manifest.json (docker save)
+        or else index.json (OCI). Only the first image is used.
+        """
+        if self.exists("manifest.json"):
+            manifest = self.read_json("manifest.json")
+            if len(manifest) > 1:
+                logger.info(f"[image] {self.path} has {len(manifest)} images, using the first")
+            names = (_normalize_member_name(name) for name in manifest[0].get("Layers", []))
+            return [name for name in names if name is not None]
+
+        if self.exists("index.json"):
+            manifest = self.read_json("index.json")
+            # Follow nested indexes down to the first image manifest
+            while "layers" not in manifest:
+                manifests = manifest.get("manifests") or []
+                if not manifests:
+                    return []
+                descriptor = manifests[0]
+                manifest = self.read_json(_blob_name(descriptor["digest"]))
+                if descriptor.get("mediaType") not in _OCI_INDEX_MEDIA_TYPES and "layers" not in manifest:
+                    return []
+            return [_blob_name(layer["digest"]) for layer in manifest["layers"]]
+
+        return []
+
+
+def _blob_name(digest: str) -> str:
+    algorithm, _, encoded = digest.partition(":")
+    return f"blobs/{algorithm}/{encoded}"
+
+
+def is_image(path: Path) -> bool:
+    """
+    True if `path` is a docker-save/OCI image directory or uncompressed tar
+    whose manifest lists at least one layer. Anything else, including an
+    image without layers, is left to normal extraction. Compressed tars are
+    not probed, that would mean decompressing them.
+    """
+    path = Path(path)
+    if path.is_dir():
+        if not (Path(path, "manifest.json").is_file() or Path(path, "index.json").is_file()):
+            return False
+    elif path.suffix.lower() != ".tar" or not path.is_file() or not _has_image_manifest(path):
+        return False
+
+    try:
+        with ImageLayout(path) as layout:
+            if layout.layer_names():
+                return True
+    except (tarfile.TarError, OSError, ValueError, LookupError, TypeError) as e:
+        logger.error(f"[image] Could not read the manifest of {path}: {e}")
+        return False
+    logger.info(f"[image] {path} has an image manifest but no layers, extracting it as a plain tar")
+    return False
+
+
+def _has_image_manifest(path: Path) -> bool:
+    try:
+        with tarfile.open(path, mode="r:") as tf:
+            for member in tf:
+                if _normalize_member_name(member.name) in ("manifest.json", "index.json"):
+                    return True
+    except (tarfile.TarError, OSError) as e:
+        logger.error(f"[image] Could not probe {path}: {e}")
+    return False
+
+
+def _normalize_member_name(name: str) -> Optional[str]:
+    """Pure string normalization of a layer member path; None if it leaves the root."""
+    name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if not name or name == "." or name == ".." or name.startswith("../"):
+        return None
+    return name
+
+
+def _ancestors(path: str) -> Iterator[str]:
+    """Parent directories of a normalized path, nearest first."""
+    while True:
+        path = posixpath.dirname(path)
+        if not path:
+            return
+        yield path
+
+
+def iter_visible_files(image_path: Path) -> Iterator[Tuple[int, str, BinaryIO, tarfile.TarInfo]]:
+    """
+    Yield (layer index, path, file object, member) for every regular file of
+    the image's final filesystem, i.e. the layers applied bottom to top with
+    later files replacing earlier ones and `.wh.` whiteouts deleting them.
+
+    Layers are walked top to bottom, so each layer is decompressed once and
+    a file is yielded only if no higher layer replaced or deleted it.
+    """
+    with ImageLayout(image_path) as layout:
+        layer_names = layout.layer_names()
+        logger.info(f"[image] {image_path}: {len(layer_names)} layers")
+
+        # Paths defined by higher layers, the non-directories among them (which
+        # hide anything below them), and what their whiteouts delete
+        defined: Set[str] = set()
+        non_dirs: Set[str] = set()
+        deleted: Set[str] = set()
+        opaque_dirs: Set[str] = set()
+
+        for layer_index in range(len(layer_names) - 1, -1, -1):
+            layer_name = layer_names[layer_index]
+            layer_deleted: Set[str] = set()
+            layer_opaque: Set[str] = set()
+            layer_defined: Set[str] = set()
+            layer_non_dirs: Set[str] = set()
+
+            try:
+                blob = layout.open(layer_name)
+            except (KeyError, OSError) as e:
+                logger.error(f"[image] Missing layer {layer_name} in {image_path}: {e}")
+                continue
+
+            with blob, tarfile.open(fileobj=blob, mode="r|*") as layer_tar:
+                for member in layer_tar:
+                    name = _normalize_member_name(member.name)
+                    if name is None:
+                        continue
+
+                    base = posixpath.basename(name)
+                    parent = posixpath.dirname(name)
+                    if base == OPAQUE_WHITEOUT:
+                        layer_opaque.add(parent)
+                        continue
+                    if base.startswith(WHITEOUT_PREFIX):
+                        layer_deleted.add(posixpath.join(parent, base[len(WHITEOUT_PREFIX):]))
+                        continue
+
+                    if _is_hidden(name, defined, non_dirs, deleted, opaque_dirs):
+                        continue
+                    layer_defined.add(name)
+                    if not member.isdir():
+                        layer_non_dirs.add(name)
+
+                    if member.isreg():
+                        src_f = layer_tar.extractfile(member)
+                        if src_f is not None:
+                            yield layer_index, name, src_f, member
+
+            # A layer's whiteouts and files only affect the layers below it
+            defined |= layer_defined
+            non_dirs |= layer_non_dirs
+            deleted |= layer_deleted
+            opaque_dirs |= layer_opaque
+
+
+def _is_hidden(name: str, defined: Set[str], non_dirs: Set[str], deleted: Set[str], opaque_dirs: Set[str]) -> bool:
+    if name in defined or name in deleted:
+        return True
+    for ancestor in _ancestors(name):
+        if ancestor in deleted or ancestor in opaque_dirs or ancestor in non_dirs:
+            return True
+    return False
+
+
+def iter_layer_files(image_path: Path) -> Iterator[Tuple[int, str, BinaryIO, tarfile.TarInfo]]:
+    """Yield (layer index, path, file object, member) for every regular file of every layer."""
+    with ImageLayout(image_path) as layout:
+        for layer_index, layer_name in enumerate(layout.layer_names()):
+            with layout.open(layer_name) as blob, tarfile.open(fileobj=blob, mode="r|*") as layer_tar:
+                for member in layer_tar:
+                    name = _normalize_member_name(member.name)
+                    if name is None or not member.isreg():
+                        continue
+                    if posixpath.basename(name).startswith(WHITEOUT_PREFIX):
+                        continue
+                    src_f = layer_tar.extractfile(member)
+                    if src_f is not None:
+                        yield layer_index, name, src_f, member
+
+
+def _write_member(src_f: BinaryIO, member: tarfile.TarInfo, dest: Path) -> Optional[Path]:
+    try:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with src_f:
+            content_store.write_stream(src_f, dest)
+    except (OSError, ValueError) as e:
+        logger.error(f"[image] Failed writing {dest}: {e}")
+        return None
+    if Config.content_addressed_extraction:
+        return dest
+    try:
+        os.chmod(dest, member.mode & 0o777)
+    except PermissionError:
+        logger.error(f"[image] chmod failed for {dest}")
+    return dest
+
+
+def extract_image(image_path: Path, dest_root: Path, rel_path: Path, layer_view: Optional[bool] = None) -> List[Path]:
+    """
+    Extract the final visible filesystem of an image to
+    dest_root/<image name without .tar>, and with layer_view (default
+    Config.image_layer_view) every layer as is to
+    dest_root/<image name>_layers/<index>. Returns the files written.
+    """
+    if layer_view is None:
+        layer_view = Config.image_layer_view
+    image_dir = dest_root / (rel_path.with_suffix("") if rel_path.suffix.lower() == ".tar" else rel_path)
+    invalid_chars = '<>:"|?*' if os.name == "nt" else ""
+
+    written: List[Path] = []
+    for layer_index, name, src_f, member in iter_visible_files(image_path):
+        if invalid_chars and any(ch in name for ch in invalid_chars):
+            logger.info(f"[image] Skipping invalid Windows name: {name}")
+            continue
+        dest = _write_member(src_f, member, image_dir / name)
+        if dest is not None:
+            written.append(dest)
+    logger.info(f"[image] {image_path}: {len(written)} visible files")
+
+    if layer_view:
+        layers_dir = image_dir.with_name(image_dir.name + "_layers")
+        for layer_index, name, src_f, member in iter_layer_files(image_path):
+            if invalid_chars and any(ch in name for ch in invalid_chars):
+                continue
+            dest = _write_member(src_f, member, layers_dir / f"{layer_index:03d}" / name)
+            if dest is not None:
+                written.append(dest)
+
+    return written
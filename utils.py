@@ -1,8 +1,10 @@
 import os
 import re
 import string
+import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Dict, Union
+from typing import Optional, List, Dict, NamedTuple, Union
 
 import unicodedata
 
@@ -90,6 +92,97 @@ def normalize_number_strings(values: Optional[List[str]]) -> list[str] | None:
     return normalized_strings
 
 
+# One or more control chars (except \n, \r, \t)
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0B-\x0C\x0E-\x1F]+')
+
+# Literal "\xNN" escape sequences
+_HEX_ESCAPE_RE = re.compile(r'(?:\\x[0-9A-Fa-f]{2})+')
+
+
+def _spaces(match: re.Match) -> str:
+    return " " * len(match.group())
+
+
+def clean_decoded_binary_text(text: str, keep_length: bool = False) -> str:
+    """
+    Replace runs of binary-like/control characters in text with a single space.
+
+    This targets:
+      - Actual control characters (NUL, BEL, etc.) in the decoded string.
+      - Literal '\\xNN' escape sequences, if they appear as text.
+
+    Newlines and tabs are preserved. With keep_length, every replaced
+    character becomes a space instead, so positions still line up with
+    `text`; normalizing either result gives the same text.
+    """
+    replacement = _spaces if keep_length else ' '
+
+    # Remove actual control characters (not visible but still in the string)
+    text = _CONTROL_CHARS_RE.sub(replacement, text)
+
+    # If decoding ever produces literal backslash-x sequences like "\x00"
+    # as real characters, this cleans those too.
+    text = _HEX_ESCAPE_RE.sub(replacement, text)
+
+    return text
+
+
+# Literal LaTeX-escaped dots, '\\&.'
+_LATEX_DOT_RE = re.compile(r'\\&\.')
+
+# Delete all punctuation except '.', which follows the decimal-dot rule.
+# str.translate is fastest on ASCII text, the regex on anything else
+_PUNCTUATION_EXCEPT_DOT_TABLE = str.maketrans("", "", string.punctuation.replace(".", ""))
+_PUNCTUATION_EXCEPT_DOT_RE = re.compile("[" + re.escape(string.punctuation.replace(".", "")) + "]+")
+
+# A '.' that doesn't have a digit on both sides, for ASCII text. Starting
+# with the literal '.' lets the regex engine skip straight to the dots
+_ASCII_NON_DECIMAL_DOT_RE = re.compile(r'\.(?:(?<![0-9]\.)|(?![0-9]))')
+
+
+class _UnicodeNormalizationTables(NamedTuple):
+    # Runs of characters from the first combining mark up, where marks can occur
+    mark_candidates_re: re.Pattern
+    # str.translate table deleting every combining mark
+    delete_marks_table: Dict[int, None]
+
+
+@lru_cache(maxsize=1)
+def _unicode_normalization_tables() -> _UnicodeNormalizationTables:
+    """
+    Combining mark tables, built from this Python's unicodedata the first
+    time non-ASCII text is normalized. Marks are every category M char.
+    """
+    marks = [cp for cp in range(sys.maxunicode + 1) if unicodedata.category(chr(cp)).startswith("M")]
+
+    return _UnicodeNormalizationTables(
+        mark_candidates_re=re.compile(f"[{re.escape(chr(marks[0]))}-{re.escape(chr(sys.maxunicode))}]+"),
+        delete_marks_table=dict.fromkeys(marks),
+    )
+
+
+def _remove_non_decimal_dots(text: str) -> str:
+    """
+    Drop every '.' that doesn't have a digit on both sides, for any text.
+    str.isdigit() is wider than the regex \\d (it includes e.g.
+    superscripts), so neighbours are checked around each dot instead.
+    """
+    pieces = text.split(".")
+    kept = [pieces[0]]
+    for before, after in zip(pieces, pieces[1:]):
+        # Consecutive dots leave an empty piece, and '' is not a digit
+        if before[-1:].isdigit() and after[:1].isdigit():
+            kept.append(".")
+        kept.append(after)
+    return "".join(kept)
+
+
+def _remove_combining_marks(value: str) -> str:
+    tables = _unicode_normalization_tables()
+    delete_marks_table = tables.delete_marks_table
+    return tables.mark_candidates_re.sub(lambda m: m.group().translate(delete_marks_table), value)
+
+
 def remove_punctuation_keep_decimal_dots(text: str) -> str:
     """
     Remove all punctuation from `text`, except for '.' characters that are part
@@ -101,33 +194,17 @@ def remove_punctuation_keep_decimal_dots(text: str) -> str:
     """
     # Normalize '\&.' sequences to a plain dot
     # "v\\&. 2\\&.0\\&." -> "v. 2.0."
-    text = re.sub(r'\\&\.', '.', text)
-
-    punctuation = set(string.punctuation)
-    result_chars = []
-    n = len(text)
-
-    for i, ch in enumerate(text):
-        # Not punctuation? Always keep it.
-        if ch not in punctuation:
-            result_chars.append(ch)
-            continue
-
-        # Special handling for dots
-        if ch == '.':
-            prev_ch = text[i - 1] if i > 0 else ''
-            next_ch = text[i + 1] if i + 1 < n else ''
+    text = _LATEX_DOT_RE.sub('.', text)
 
-            # Keep '.' only if it's between digits (e.g., 1.0, 1.0.0)
-            if prev_ch.isdigit() and next_ch.isdigit():
-                result_chars.append(ch)
-            # else: skip this dot
-            continue
-
-        # Any other punctuation: remove it (skip)
-        continue
+    # Dots are judged by their neighbours before any other punctuation is removed
+    if text.isascii():
+        if "." in text:
+            text = _ASCII_NON_DECIMAL_DOT_RE.sub('', text)
+        return text.translate(_PUNCTUATION_EXCEPT_DOT_TABLE)
 
-    return ''.join(result_chars)
+    if "." in text:
+        text = _remove_non_decimal_dots(text)
+    return _PUNCTUATION_EXCEPT_DOT_RE.sub('', text)
 
 
 def remove_punctuation_and_normalize_text(value: Union[str, bytes, None]) -> str:
@@ -152,24 +229,24 @@ def remove_punctuation_and_normalize_text(value: Union[str, bytes, None]) -> str
 
     value = remove_punctuation_keep_decimal_dots(value)
 
-    # Normalize Unicode (compatibility decomposition + recomposition)
-    value = unicodedata.normalize("NFKC", value)
-
-    # Remove diacritics (accents)
-    # e.g., "café" → "cafe"
-    value = "".join(
-        ch for ch in value
-        if not unicodedata.category(ch).startswith("M")
-    )
+    if value.isascii():
+        # NFKC and removing marks leave ASCII as is, and casefold is lower
+        value = value.lower()
+    else:
+        # Normalize Unicode (compatibility decomposition + recomposition)
+        value = unicodedata.normalize("NFKC", value)
 
-    # Case-insensitive
-    value = value.casefold()
+        # Remove diacritics (accents)
+        # e.g., "café" → "cafe"
+        value = _remove_combining_marks(value)
 
-    # Collapse any whitespace (spaces, tabs, newlines) into a single space
-    value = re.sub(r"\s+", " ", value)
+        # Case-insensitive
+        value = value.casefold()
 
-    # Strip leading/trailing spaces
-    return value.strip()
+    # Collapse any whitespace (spaces, tabs, newlines) into a single space and
+    # strip leading/trailing spaces; str.split() and the regex \s agree on
+    # what whitespace is
+    return " ".join(value.split())
 
 
 def load_file_contents_from_directory(license_dirs: List[Path]) -> Dict[Path, str]: